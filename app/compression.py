@@ -0,0 +1,71 @@
+"""
+Compression codecs for stored clip content
+"""
+
+import zlib
+from typing import Optional, Tuple
+
+from app.config import settings
+
+try:
+    import zstandard  # optional, better ratio and speed than zlib
+except ImportError:
+    zstandard = None
+
+
+def default_codec() -> str:
+    """Codec used for new content: `clip_compression_codec`, with auto preferring zstd"""
+    codec = settings.clip_compression_codec
+    if codec == "auto":
+        return "zstd" if zstandard is not None else "zlib"
+    if codec == "zstd" and zstandard is None:
+        raise ImportError(
+            "zstd compression requires the zstandard package:\n"
+            "  pip install zstandard"
+        )
+    if codec != "zlib":
+        raise ValueError(f"Unknown compression codec: {codec}")
+    return codec
+
+
+def compress(text: str, codec: str) -> bytes:
+    """Compress text with the given codec"""
+    data = text.encode("utf-8")
+    if codec == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    return zlib.compress(data)
+
+
+def decompress(data: bytes, codec: str) -> str:
+    """Decompress data written by `compress`"""
+    if codec == "zstd":
+        if zstandard is None:
+            raise ImportError("Clip content is zstd compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    if codec == "zlib":
+        return zlib.decompress(data).decode("utf-8")
+    raise ValueError(f"Unknown compression codec: {codec}")
+
+
+def maybe_compress(text: str, size: int, dialect: str) -> Optional[Tuple[str, bytes]]:
+    """(codec, data) when text of `size` UTF-8 bytes should be stored compressed.
+
+    Only text of at least `clip_compression_threshold` bytes is compressed,
+    and only if that actually saves space. Compression is limited to SQLite:
+    the PostgreSQL and MySQL full-text indexes read the plain column.
+    PostgreSQL compresses large values itself (TOAST); InnoDB doesn't by
+    default, so MySQL tables need ROW_FORMAT=COMPRESSED or page compression
+    to save the space.
+    """
+    if not text or not settings.clip_compression_enabled:
+        return None
+    if dialect != "sqlite":
+        return None
+    if size < settings.clip_compression_threshold:
+        return None
+
+    codec = default_codec()
+    data = compress(text, codec)
+    if len(data) >= size:
+        return None
+    return codec, data
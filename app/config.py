@@ -14,6 +14,49 @@ class Settings(BaseSettings):
     max_file_size: int = 100 * 1024 * 1024  # 100MB
     lru_max_items_per_user: int = 1000
     lru_cleanup_interval: int = 3600  # 1 hour in seconds
+    lru_dirty_cleanup_interval: int = 60  # Cleanup of users who recently created clips
+    expired_cleanup_interval: int = 3600  # Fallback sweep for expired clips the expiry queue missed
+    expiry_tick_interval: int = 5  # How often due clips are taken off the expiry queue
+    expiry_horizon: int = 3600  # Deadlines loaded into the expiry queue ahead of time, in seconds
+    expiry_batch_size: int = 200  # Clips deleted per expiry batch
+    anonymous_cleanup_interval: int = 3600  # 1 hour in seconds
+    counter_reconcile_interval: int = 86400  # Repair drift in per-user counters daily
+    cleanup_scheduler_enabled: bool = True  # Run cleanup jobs in a background thread
+    cleanup_jitter: float = 0.1  # Random +/- fraction applied to each cleanup interval
+    cleanup_max_runtime: int = 300  # Runtime budget per cleanup job run, in seconds
+    purge_batch_size: int = 500  # Rows deleted per transaction by purge jobs
+    purge_batch_sleep: float = 0.05  # Pause between purge batches so writers can take the lock
+    access_buffer_enabled: bool = False  # Batch clip access / file download counter writes
+    access_buffer_flush_interval: int = 1000  # Flush buffered counters every N milliseconds
+    access_buffer_max_events: int = 1000  # ...or as soon as this many accesses are pending
+    lru_eviction_policy: str = "lru"  # Default eviction policy: lru, lfu, 2q or gdsf
+    lru_2q_promote_after: int = 2  # 2Q: reads needed to leave the probationary queue
+    lru_gdsf_aging_days: float = 1.0  # GDSF: days of recency worth one read of a 1 KB clip
+    lru_index_enabled: bool = False  # In-process recency index for eviction decisions
+    lru_index_ttl: int = 300  # Re-warm a user's index entry after this many seconds
+    lru_index_max_users: int = 10000  # Maximum number of users kept in the index
+    lru_byte_budget_enabled: bool = False  # Also evict clips to keep users within storage_quota
+    lru_quota_high_watermark: float = 1.0  # Start byte eviction above this fraction of the quota
+    lru_quota_low_watermark: float = 0.9  # Evict down to this fraction of the quota
+    share_cache_enabled: bool = False  # Answer shared clip lookups from an in-process cache
+    share_cache_ttl: int = 60  # Seconds a resolved share token is served from the cache
+    share_cache_negative_ttl: int = 30  # Seconds an unknown share token is remembered
+    share_cache_max_entries: int = 10000  # Maximum cached tokens (and, separately, unknown tokens)
+    share_cache_max_bytes: int = 64 * 1024 * 1024  # Maximum clip content held by cached tokens
+    share_cache_max_entry_bytes: int = 256 * 1024  # Larger shared clips are loaded per request
+    shared_clip_max_age: int = 60  # Cache-Control max-age of public shared clips, in seconds
+    clip_stream_keepalive: int = 15  # Seconds between pings on idle /api/clips/stream connections
+    clip_stream_queue_size: int = 100  # Events buffered per stream before the client is told to resync
+    clip_stream_ticket_ttl: int = 60  # Seconds a ticket from POST /api/clips/stream/ticket can open a stream
+    clip_stream_auth_timeout: int = 10  # Seconds a WebSocket without auth headers has to send its credentials
+    clip_change_retention_days: int = 30  # Delta sync history kept for GET /api/clips/changes
+    clip_change_prune_interval: int = 86400  # Prune the change log daily
+    clip_change_settle_seconds: int = 5  # Hold back changes this recent from delta sync, except on SQLite
+    clip_blob_threshold: int = 256  # Store bodies of at least this many bytes once per SHA-256
+    clip_spill_threshold: int = 1024 * 1024  # Keep bodies this large as files in storage_path (SQLite only, 0 disables)
+    clip_compression_enabled: bool = False  # Store large clip bodies compressed (SQLite only)
+    clip_compression_threshold: int = 4096  # Compress bodies of at least this many bytes
+    clip_compression_codec: str = "auto"  # zlib, zstd (needs zstandard) or auto
 
     # Anonymous user settings
     allow_anonymous: bool = True
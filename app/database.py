@@ -1,13 +1,69 @@
 """
 Database configuration and session management for CLIP.LRU
 """
-from sqlalchemy import create_engine, orm
+import importlib
+import importlib.util
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, inspect, orm
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
 
+# Async drivers, with their package and the sync URL schemes (and the module
+# each needs) used next to them for table creation, background jobs and the
+# remaining sync routes, in order of preference
+ASYNC_DRIVERS = {
+    "sqlite+aiosqlite": ("aiosqlite", [("sqlite", "sqlite3")]),
+    "postgresql+asyncpg": ("asyncpg", [("postgresql", "psycopg2")]),
+    # mysqlclient, as for mysql:// URLs; else PyMySQL, which aiomysql depends on
+    "mysql+aiomysql": ("aiomysql", [("mysql", "MySQLdb"), ("mysql+pymysql", "pymysql")]),
+}
+
+
+def is_async_url(database_url: str) -> bool:
+    """Whether the URL names an async driver"""
+    return database_url.split("://", 1)[0] in ASYNC_DRIVERS
+
+
+@lru_cache(maxsize=None)
+def sync_scheme(async_scheme: str) -> str:
+    """First sync scheme for an async driver whose module is installed"""
+    candidates = ASYNC_DRIVERS[async_scheme][1]
+    for scheme, module in candidates:
+        if importlib.util.find_spec(module) is not None:
+            return scheme
+    # Reported by check_database_dependencies
+    return candidates[0][0]
+
+
+def sync_database_url(database_url: str) -> str:
+    """The URL with an async driver replaced by its sync counterpart"""
+    scheme, separator, rest = database_url.partition("://")
+    if scheme in ASYNC_DRIVERS:
+        return sync_scheme(scheme) + separator + rest
+    return database_url
+
 
 def check_database_dependencies(database_url: str):
     """Check if required database dependencies are installed"""
+    scheme = database_url.split("://", 1)[0]
+    if scheme in ASYNC_DRIVERS:
+        package = ASYNC_DRIVERS[scheme][0]
+        try:
+            importlib.import_module(package)
+        except ImportError:
+            raise ImportError(
+                f"Async database driver not found. Please install {package}:\n"
+                f"  pip install {package}"
+            )
+        # The sync driver is needed as well
+        database_url = sync_database_url(database_url)
+
     if database_url.startswith("mysql"):
         try:
             import MySQLdb  # mysqlclient
@@ -65,15 +121,31 @@ check_database_dependencies(settings.database_url)
 
 # Create database engine with optimized configuration
 engine_config = get_engine_config(settings.database_url)
-engine = create_engine(settings.database_url, **engine_config)
+engine = create_engine(sync_database_url(settings.database_url), **engine_config)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine and session factory, when database_url names an async driver
+async_engine = None
+AsyncSessionLocal = None
+if is_async_url(settings.database_url):
+    async_engine = create_async_engine(settings.database_url, **engine_config)
+    AsyncSessionLocal = async_sessionmaker(autoflush=False, bind=async_engine)
+
 # Create base class for models
 Base = orm.declarative_base()
 
 
+def utcnow() -> datetime:
+    """Python-side default for sort and paging columns.
+
+    SQLite keeps datetimes as text; CURRENT_TIMESTAMP has no fraction while
+    bound datetimes do, so values written both ways wouldn't compare in time order.
+    """
+    return datetime.now(timezone.utc)
+
+
 def get_db():
     """Dependency to get database session"""
     db = SessionLocal()
@@ -83,9 +155,71 @@ def get_db():
         db.close()
 
 
-def create_tables():
-    """Create all tables"""
-    Base.metadata.create_all(bind=engine)
+class SessionRunner:
+    """Runs sync session code (e.g. service methods) from async routes.
+
+    With an async engine the code runs on the event loop in a greenlet and
+    each statement is awaited, so a request waiting on the database holds
+    no worker thread. Otherwise it runs in the threadpool with a regular
+    Session, as sync routes do.
+    """
+
+    def __init__(self, session):
+        self.session = session  # Session or AsyncSession
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Call fn(session, *args, **kwargs); returned ORM objects must not lazy load afterwards"""
+        if isinstance(self.session, AsyncSession):
+            return await self.session.run_sync(fn, *args, **kwargs)
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+
+async def get_session_runner():
+    """Dependency to get a session runner for async routes"""
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            yield SessionRunner(session)
+        return
+
+    db = SessionLocal()
+    try:
+        yield SessionRunner(db)
+    finally:
+        await run_in_threadpool(db.close)
+
+
+# Revision of the schema create_all built before migrations existed
+BASELINE_REVISION = "0001"
+
+
+def migration_config(connection=None):
+    """Alembic configuration for app/migrations, running on `connection` if given"""
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", str(Path(__file__).parent / "migrations"))
+    config.attributes["connection"] = connection
+    return config
+
+
+def create_tables(bind=None):
+    """Create all tables on a new database, or migrate an existing one to the current schema"""
+    from alembic import command
+
+    with (bind or engine).begin() as connection:
+        tables = set(inspect(connection).get_table_names())
+        config = migration_config(connection)
+        if "users" not in tables:
+            Base.metadata.create_all(bind=connection)
+            command.stamp(config, "head")
+            return
+
+        if "alembic_version" not in tables:
+            # Built by create_all before migrations existed
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
+        # Adds what migrations don't manage, such as the full-text index
+        Base.metadata.create_all(bind=connection)
 
 
 def drop_tables():
@@ -10,9 +10,11 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
-from app.database import create_tables, settings
+from app.database import async_engine, create_tables, settings
 from app.frontend import setup_frontend, get_frontend_info, validate_frontend_setup
 from app.routers import auth_router, clips_router, files_router, admin_router
+from app.services.scheduler import cleanup_scheduler
+from app.services.access_buffer import access_buffer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -49,11 +51,23 @@ async def lifespan(app: FastAPI):
     # Log frontend info
     frontend_info = get_frontend_info()
     logger.info(f"Frontend info: {frontend_info}")
+
+    # Start background cleanup jobs
+    if settings.cleanup_scheduler_enabled:
+        cleanup_scheduler.start()
+
+    # Start flushing buffered access counters
+    if settings.access_buffer_enabled:
+        access_buffer.start()
     
     yield
     
     # Shutdown
     logger.info("Shutting down CLIP.LRU application...")
+    cleanup_scheduler.stop()
+    access_buffer.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 
 # Create FastAPI app
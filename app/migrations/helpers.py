@@ -0,0 +1,46 @@
+"""
+Idempotent schema steps for migrations.
+
+Databases created before migrations existed were built by create_all at
+whatever revision the code was at, so they are stamped at the baseline
+and each later step skips what is already there.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+def has_table(table: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(table)
+
+
+def has_column(table: str, column: str) -> bool:
+    return column in {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def has_index(table: str, index: str) -> bool:
+    return index in {i["name"] for i in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def add_column(table: str, column: sa.Column) -> bool:
+    """Add a column unless it exists, returns whether it was added"""
+    if has_column(table, column.name):
+        return False
+    op.add_column(table, column)
+    return True
+
+
+def create_index(name: str, table: str, columns: list, **kw):
+    if not has_index(table, name):
+        op.create_index(name, table, columns, **kw)
+
+
+def drop_index(name: str, table: str):
+    if has_index(table, name):
+        op.drop_index(name, table_name=table)
+
+
+def drop_column(table: str, column: str):
+    if has_column(table, column):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column(column)
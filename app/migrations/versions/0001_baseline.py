@@ -0,0 +1,95 @@
+"""Baseline schema: users, clips and files
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+CLIP_TYPES = ("TEXT", "MARKDOWN", "FILE", "IMAGE", "VIDEO", "AUDIO")
+ACCESS_LEVELS = ("PRIVATE", "PUBLIC", "ENCRYPTED")
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String(50), nullable=True),
+        sa.Column("email", sa.String(100), nullable=True),
+        sa.Column("hashed_password", sa.String(255), nullable=True),
+        sa.Column("full_name", sa.String(100), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("is_admin", sa.Boolean(), nullable=True),
+        sa.Column("is_anonymous", sa.Boolean(), nullable=True),
+        sa.Column("session_id", sa.String(64), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_login", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("max_clips", sa.Integer(), nullable=True),
+        sa.Column("storage_quota", sa.Integer(), nullable=True),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_session_id", "users", ["session_id"], unique=True)
+
+    op.create_table(
+        "clips",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(200), nullable=True),
+        sa.Column("content", sa.Text(), nullable=True),
+        sa.Column("clip_type", sa.Enum(*CLIP_TYPES, name="cliptype"), nullable=False),
+        sa.Column("access_level", sa.Enum(*ACCESS_LEVELS, name="accesslevel"), nullable=False),
+        sa.Column("is_markdown", sa.Boolean(), nullable=True),
+        sa.Column("password_hash", sa.String(255), nullable=True),
+        sa.Column("share_token", sa.String(64), nullable=True),
+        sa.Column("is_pinned", sa.Boolean(), nullable=True),
+        sa.Column("access_count", sa.Integer(), nullable=True),
+        sa.Column("last_accessed", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+    )
+    op.create_index("ix_clips_id", "clips", ["id"])
+    op.create_index("ix_clips_share_token", "clips", ["share_token"], unique=True)
+
+    op.create_table(
+        "files",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("filename", sa.String(255), nullable=False),
+        sa.Column("original_filename", sa.String(255), nullable=False),
+        sa.Column("file_path", sa.String(500), nullable=False),
+        sa.Column("file_size", sa.BigInteger(), nullable=False),
+        sa.Column("mime_type", sa.String(100), nullable=False),
+        sa.Column("file_hash", sa.String(64), nullable=False),
+        sa.Column("is_image", sa.Boolean(), nullable=True),
+        sa.Column("is_video", sa.Boolean(), nullable=True),
+        sa.Column("is_audio", sa.Boolean(), nullable=True),
+        sa.Column("width", sa.Integer(), nullable=True),
+        sa.Column("height", sa.Integer(), nullable=True),
+        sa.Column("duration", sa.Integer(), nullable=True),
+        sa.Column("download_count", sa.Integer(), nullable=True),
+        sa.Column("last_downloaded", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("clip_id", sa.Integer(), sa.ForeignKey("clips.id"), nullable=True),
+    )
+    op.create_index("ix_files_id", "files", ["id"])
+    op.create_index("ix_files_file_hash", "files", ["file_hash"])
+
+
+def downgrade():
+    op.drop_table("files")
+    op.drop_table("clips")
+    op.drop_table("users")
+    sa.Enum(name="cliptype").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="accesslevel").drop(op.get_bind(), checkfirst=True)
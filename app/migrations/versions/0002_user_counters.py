@@ -0,0 +1,42 @@
+"""Denormalized per-user clip and storage counters
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migrations.helpers import add_column, drop_column
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+users = sa.table("users", sa.column("id"), sa.column("clip_count"), sa.column("pinned_count"), sa.column("storage_used"))
+clips = sa.table("clips", sa.column("owner_id"), sa.column("is_pinned"))
+files = sa.table("files", sa.column("owner_id"), sa.column("file_size"))
+
+
+def upgrade():
+    add_column("users", sa.Column("clip_count", sa.Integer(), nullable=False, server_default="0"))
+    add_column("users", sa.Column("pinned_count", sa.Integer(), nullable=False, server_default="0"))
+    add_column("users", sa.Column("storage_used", sa.BigInteger(), nullable=False, server_default="0"))
+
+    # Counters are kept up to date from now on; count what is already there
+    op.execute(users.update().values(
+        clip_count=sa.select(sa.func.count()).where(clips.c.owner_id == users.c.id).scalar_subquery(),
+        pinned_count=sa.select(sa.func.count()).where(
+            clips.c.owner_id == users.c.id, clips.c.is_pinned == sa.true()
+        ).scalar_subquery(),
+        storage_used=sa.select(sa.func.coalesce(sa.func.sum(files.c.file_size), 0)).where(
+            files.c.owner_id == users.c.id
+        ).scalar_subquery(),
+    ))
+
+
+def downgrade():
+    for column in ("storage_used", "pinned_count", "clip_count"):
+        drop_column("users", column)
@@ -0,0 +1,23 @@
+"""Per-user eviction policy
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+
+import sqlalchemy as sa
+
+from app.migrations.helpers import add_column, drop_column
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    add_column("users", sa.Column("eviction_policy", sa.String(20), nullable=True))
+
+
+def downgrade():
+    drop_column("users", "eviction_policy")
@@ -0,0 +1,40 @@
+"""Clip content sizes and per-user content usage for byte budgets
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migrations.helpers import add_column, drop_column
+from app.utils.sql import octet_length
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+users = sa.table("users", sa.column("id"), sa.column("content_used"))
+clips = sa.table("clips", sa.column("owner_id"), sa.column("content"), sa.column("content_size"))
+
+
+def upgrade():
+    add_column("clips", sa.Column("content_size", sa.Integer(), nullable=True))
+    add_column("users", sa.Column("content_used", sa.BigInteger(), nullable=False, server_default="0"))
+
+    # UTF-8 bytes, as Clip's content validator stores them
+    op.execute(clips.update().where(
+        clips.c.content_size.is_(None), clips.c.content.isnot(None)
+    ).values(content_size=octet_length(clips.c.content)))
+    op.execute(users.update().values(
+        content_used=sa.select(sa.func.coalesce(sa.func.sum(clips.c.content_size), 0)).where(
+            clips.c.owner_id == users.c.id
+        ).scalar_subquery()
+    ))
+
+
+def downgrade():
+    drop_column("users", "content_used")
+    drop_column("clips", "content_size")
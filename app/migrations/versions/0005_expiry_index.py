@@ -0,0 +1,21 @@
+"""Index clips by expiry time
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+
+from app.migrations.helpers import create_index, drop_index
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    create_index("ix_clips_expires_at", "clips", ["expires_at"])
+
+
+def downgrade():
+    drop_index("ix_clips_expires_at", "clips")
@@ -0,0 +1,34 @@
+"""Stored clip previews for summary lists, and files indexed by clip
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migrations.helpers import add_column, create_index, drop_column, drop_index
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# Clip.PREVIEW_LENGTH at this revision
+PREVIEW_LENGTH = 200
+
+clips = sa.table("clips", sa.column("content"), sa.column("preview"))
+
+
+def upgrade():
+    add_column("clips", sa.Column("preview", sa.String(PREVIEW_LENGTH), nullable=True))
+    op.execute(clips.update().where(
+        clips.c.preview.is_(None), clips.c.content.isnot(None)
+    ).values(preview=sa.func.substr(clips.c.content, 1, PREVIEW_LENGTH)))
+    create_index("ix_files_clip_id", "files", ["clip_id"])
+
+
+def downgrade():
+    drop_index("ix_files_clip_id", "files")
+    drop_column("clips", "preview")
@@ -0,0 +1,43 @@
+"""Content-addressed blob table for large clip bodies, some spilled to files
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migrations.helpers import add_column, create_index, drop_column, drop_index, has_table
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_table("clip_blobs"):
+        op.create_table(
+            "clip_blobs",
+            sa.Column("hash", sa.String(64), primary_key=True),
+            sa.Column("content", sa.Text(), nullable=True),
+            sa.Column("content_codec", sa.String(16), nullable=True),
+            sa.Column("content_data", sa.LargeBinary(), nullable=True),
+            sa.Column("file_path", sa.String(500), nullable=True),
+            sa.Column("size", sa.BigInteger(), nullable=False),
+            sa.Column("ref_count", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+
+    # Existing clips keep their content inline; bodies move to blobs when rewritten
+    if add_column("clips", sa.Column("content_hash", sa.String(64), nullable=True)):
+        if op.get_bind().dialect.name != "sqlite":
+            op.create_foreign_key("fk_clips_content_hash", "clips", "clip_blobs", ["content_hash"], ["hash"])
+    create_index("ix_clips_content_hash", "clips", ["content_hash"])
+
+
+def downgrade():
+    drop_index("ix_clips_content_hash", "clips")
+    drop_column("clips", "content_hash")
+    op.drop_table("clip_blobs")
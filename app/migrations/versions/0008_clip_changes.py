@@ -0,0 +1,37 @@
+"""Clip change log for delta sync
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migrations.helpers import has_table
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if has_table("clip_changes"):
+        return
+    op.create_table(
+        "clip_changes",
+        sa.Column("seq", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("clip_id", sa.Integer(), nullable=False),
+        sa.Column("change", sa.Enum("CREATED", "UPDATED", "DELETED", "EVICTED", name="changetype"), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sqlite_autoincrement=True,
+    )
+    op.create_index("ix_clip_changes_created_at", "clip_changes", ["created_at"])
+    op.create_index("ix_clip_changes_user_seq", "clip_changes", ["user_id", "seq"])
+
+
+def downgrade():
+    op.drop_table("clip_changes")
+    sa.Enum(name="changetype").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,35 @@
+"""Index the keyset paging order of clip and file lists
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migrations.helpers import create_index, drop_index
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+# Paging compares the stored text on SQLite, where CURRENT_TIMESTAMP wrote
+# no fraction and the app writes microseconds
+SORT_COLUMNS = [("clips", "last_accessed"), ("clips", "created_at"), ("files", "created_at")]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        for table, column in SORT_COLUMNS:
+            op.execute(sa.text(
+                f"UPDATE {table} SET {column} = {column} || '.000000' WHERE length({column}) = 19"
+            ))
+    create_index("ix_clips_owner_last_accessed", "clips", ["owner_id", "last_accessed", "id"])
+    create_index("ix_files_owner_created", "files", ["owner_id", "created_at", "id"])
+
+
+def downgrade():
+    drop_index("ix_files_owner_created", "files")
+    drop_index("ix_clips_owner_last_accessed", "clips")
@@ -0,0 +1,31 @@
+"""Persist checkpoints of batched background jobs
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migrations.helpers import has_table
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if has_table("job_checkpoints"):
+        return
+    op.create_table(
+        "job_checkpoints",
+        sa.Column("job", sa.String(64), primary_key=True),
+        sa.Column("last_id", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+
+
+def downgrade():
+    op.drop_table("job_checkpoints")
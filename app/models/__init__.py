@@ -3,7 +3,12 @@ Database models for CLIP.LRU
 """
 
 from .user import User
+from .blob import ClipBlob
 from .clip import Clip
 from .file import File
+from .change import ClipChange
+from .checkpoint import JobCheckpoint
+from . import events  # noqa: F401  (registers counter listeners)
+from . import search  # noqa: F401  (registers full-text index DDL)
 
-__all__ = ["User", "Clip", "File"]
+__all__ = ["User", "ClipBlob", "Clip", "File", "ClipChange", "JobCheckpoint"]
@@ -0,0 +1,190 @@
+"""
+Content-addressed storage for clip bodies
+"""
+
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import (
+    Column, Integer, String, DateTime, Text, BigInteger, LargeBinary, and_, bindparam, delete, insert, select,
+    update
+)
+from sqlalchemy.orm import deferred
+from sqlalchemy.sql import func
+
+from app.compression import maybe_compress, decompress
+from app.config import settings
+from app.database import Base
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of the UTF-8 text, the key of its blob"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ClipBlob(Base):
+    """Clip body stored once per content hash, shared by reference-counted clips"""
+    __tablename__ = "clip_blobs"
+
+    hash = Column(String(64), primary_key=True)  # SHA-256 of the UTF-8 text
+    content = Column(Text, nullable=True)  # NULL when compressed or spilled to a file
+    content_codec = Column(String(16), nullable=True)
+    content_data = deferred(Column(LargeBinary, nullable=True))
+    file_path = Column(String(500), nullable=True)  # Very large bodies, kept under storage_path
+    size = Column(BigInteger, nullable=False)  # UTF-8 bytes of the text
+    ref_count = Column(Integer, nullable=False, default=0)  # Clips pointing at this blob
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<ClipBlob(hash='{self.hash[:12]}', size={self.size}, refs={self.ref_count})>"
+
+    @property
+    def text(self) -> str:
+        """Plain text, decompressed or read from disk on access"""
+        return blob_text(self.content, self.content_codec, self.content_data, self.file_path)
+
+
+def blob_text(content: Optional[str], codec: Optional[str], data: Optional[bytes], file_path: Optional[str]) -> str:
+    """Plain text of a blob from its columns, compressed, spilled or not"""
+    if file_path:
+        return read_spill_file(file_path)
+    if codec:
+        return decompress(data, codec)
+    return content
+
+
+def spills(size: int, dialect: str) -> bool:
+    """Whether a new body of `size` UTF-8 bytes is kept as a file.
+
+    Limited to SQLite, like compression: the PostgreSQL and MySQL
+    full-text indexes and LIKE search read the plain content column.
+    """
+    return dialect == "sqlite" and bool(settings.clip_spill_threshold) and size >= settings.clip_spill_threshold
+
+
+def write_spill_file(blob_hash: str, text: str) -> str:
+    """Write a body to the content-addressed store under storage_path, returns its path.
+
+    Every write gets its own name, so a body being deleted by one
+    transaction never collides with the same body written by another.
+    """
+    directory = Path(settings.storage_path) / "blobs" / blob_hash[:2]
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{blob_hash}-{uuid.uuid4().hex[:12]}"
+    temp_path = path.with_suffix(".tmp")
+    temp_path.write_bytes(text.encode("utf-8"))
+    os.replace(temp_path, path)
+    return str(path)
+
+
+def read_spill_file(file_path: str) -> str:
+    """Decode a spilled body; the content endpoints stream the file instead"""
+    return Path(file_path).read_bytes().decode("utf-8")
+
+
+def remove_spill_files(paths):
+    """Delete spilled body files, ignoring ones already gone"""
+    for path in paths:
+        Path(path).unlink(missing_ok=True)
+
+
+def _insert_or_reference(connection, values: dict):
+    """INSERT a new blob, or take a reference if another transaction just created it"""
+    table = ClipBlob.__table__
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        statement = dialect_insert(table).values(**values).on_conflict_do_update(
+            index_elements=[table.c.hash], set_={"ref_count": table.c.ref_count + 1}
+        )
+    elif dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        statement = dialect_insert(table).values(**values).on_duplicate_key_update(
+            ref_count=table.c.ref_count + 1
+        )
+    else:
+        statement = insert(table).values(**values)
+    connection.execute(statement)
+
+
+def acquire_blob(connection, blob_hash: str, text: Optional[str]) -> Optional[str]:
+    """Take a reference to the blob for `text`, writing the body only if it's new.
+
+    Bodies of at least `clip_spill_threshold` bytes are written to a file
+    on SQLite.
+    Returns the path of a file written for this transaction, to be removed
+    if it rolls back.
+    """
+    from app.models.search import index_blob
+
+    table = ClipBlob.__table__
+    result = connection.execute(
+        update(table).where(table.c.hash == blob_hash).values(ref_count=table.c.ref_count + 1)
+    )
+    if result.rowcount or text is None:
+        return None
+
+    size = len(text.encode("utf-8"))
+    values = {"hash": blob_hash, "content": text, "size": size, "ref_count": 1}
+    spilled = None
+    if spills(size, connection.dialect.name):
+        spilled = write_spill_file(blob_hash, text)
+        values.update(content=None, file_path=spilled)
+    else:
+        compressed = maybe_compress(text, size, connection.dialect.name)
+        if compressed:
+            codec, data = compressed
+            values.update(content=None, content_codec=codec, content_data=data)
+    _insert_or_reference(connection, values)
+    index_blob(connection, blob_hash, text)
+
+    if spilled:
+        stored = connection.execute(select(table.c.file_path).where(table.c.hash == blob_hash)).scalar()
+        if stored != spilled:
+            # Another transaction created the blob first
+            remove_spill_files([spilled])
+            return None
+    return spilled
+
+
+def release_blobs(connection, references: Dict[str, int]) -> List[str]:
+    """Drop references to blobs and delete the ones no clip points at anymore.
+
+    Returns the spilled files of deleted blobs, to be removed once the
+    transaction commits.
+    """
+    table = ClipBlob.__table__
+    references = {blob_hash: count for blob_hash, count in references.items() if blob_hash and count}
+    if not references:
+        return []
+
+    connection.execute(
+        update(table).where(table.c.hash == bindparam("blob_hash")).values(
+            ref_count=table.c.ref_count - bindparam("refs")
+        ),
+        [{"blob_hash": blob_hash, "refs": count} for blob_hash, count in references.items()]
+    )
+    return delete_unused_blobs(connection, table.c.hash.in_(list(references)))
+
+
+def delete_unused_blobs(connection, condition) -> List[str]:
+    """Delete blobs matching `condition` that no clip references, with their index entries.
+
+    Returns their spilled files, to be removed once the transaction commits.
+    """
+    from app.models.search import unindex_blobs
+
+    table = ClipBlob.__table__
+    unused = and_(condition, table.c.ref_count <= 0)
+    rows = connection.execute(select(table.c.hash, table.c.file_path).where(unused)).all()
+    if not rows:
+        return []
+    unindex_blobs(connection, [blob_hash for blob_hash, _ in rows])
+    connection.execute(delete(table).where(unused))
+    return [file_path for _, file_path in rows if file_path]
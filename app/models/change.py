@@ -0,0 +1,48 @@
+"""
+Change log of clip mutations for delta sync
+"""
+
+import enum
+from typing import Iterable
+
+from sqlalchemy import Column, Integer, BigInteger, DateTime, Enum, ForeignKey, Index, insert
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class ChangeType(enum.Enum):
+    """Kinds of clip changes"""
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"  # Deleted by its owner
+    EVICTED = "evicted"  # Removed by LRU, expiry or anonymous cleanup
+
+
+# Changes that leave only a tombstone behind
+TOMBSTONES = (ChangeType.DELETED, ChangeType.EVICTED)
+
+
+class ClipChange(Base):
+    """One committed change to a clip; seq grows monotonically across all users"""
+    __tablename__ = "clip_changes"
+    __table_args__ = (
+        Index("ix_clip_changes_user_seq", "user_id", "seq"),
+        {"sqlite_autoincrement": True},  # Never reuse a seq, even after pruning
+    )
+
+    seq = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    clip_id = Column(Integer, nullable=False)  # No foreign key: tombstones outlive their clip
+    change = Column(Enum(ChangeType), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    def __repr__(self):
+        return f"<ClipChange(seq={self.seq}, clip_id={self.clip_id}, change={self.change.value})>"
+
+
+def record_changes(connection, user_id: int, clip_ids: Iterable[int], change: ChangeType):
+    """Append changes within the current transaction"""
+    rows = [{"user_id": user_id, "clip_id": clip_id, "change": change} for clip_id in clip_ids]
+    if rows and user_id is not None:
+        connection.execute(insert(ClipChange.__table__), rows)
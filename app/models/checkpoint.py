@@ -0,0 +1,19 @@
+"""
+Progress of batched background jobs
+"""
+
+from sqlalchemy import Column, String, BigInteger, DateTime
+
+from app.database import Base, utcnow
+
+
+class JobCheckpoint(Base):
+    """Last id a batched job finished; the row is removed when a pass completes"""
+    __tablename__ = "job_checkpoints"
+
+    job = Column(String(64), primary_key=True)
+    last_id = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
+
+    def __repr__(self):
+        return f"<JobCheckpoint(job='{self.job}', last_id={self.last_id})>"
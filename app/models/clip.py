@@ -2,13 +2,19 @@
 Clip model for storing clipboard content
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Enum, Index
+from sqlalchemy.orm import relationship, validates, column_property, query_expression
 from sqlalchemy.sql import func
-from app.database import Base
+from app.config import settings
+from app.database import Base, utcnow
+from .blob import content_hash
 import enum
 
 
+# Characters of content kept in Clip.preview for list views
+PREVIEW_LENGTH = 200
+
+
 class ClipType(enum.Enum):
     """Types of clip content"""
     TEXT = "text"
@@ -29,10 +35,22 @@ class AccessLevel(enum.Enum):
 class Clip(Base):
     """Clip model for storing clipboard content"""
     __tablename__ = "clips"
+    __table_args__ = (
+        # Keyset pages of a user's clips, most recently accessed first
+        Index("ix_clips_owner_last_accessed", "owner_id", "last_accessed", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=True)
-    content = Column(Text, nullable=True)  # For text/markdown content
+    content = Column(Text, nullable=True)  # For text/markdown content, NULL when stored in a blob
+    # Larger bodies live once per hash in clip_blobs; read them through content_text
+    content_hash = column_property(
+        Column(String(64), ForeignKey("clip_blobs.hash"), nullable=True, index=True), active_history=True
+    )
+    # UTF-8 bytes of content, kept in sync on assignment; active history lets
+    # the counter listeners see the previous value of expired attributes
+    content_size = column_property(Column(Integer, nullable=True), active_history=True)
+    preview = Column(String(PREVIEW_LENGTH), nullable=True)  # Start of content, for list views
     clip_type = Column(Enum(ClipType), nullable=False, default=ClipType.TEXT)
     access_level = Column(Enum(AccessLevel), nullable=False, default=AccessLevel.PRIVATE)
     is_markdown = Column(Boolean, default=False)  # Whether content should be rendered as markdown
@@ -42,14 +60,14 @@ class Clip(Base):
     share_token = Column(String(64), unique=True, index=True, nullable=True)  # For sharing
     
     # LRU management
-    is_pinned = Column(Boolean, default=False)
+    is_pinned = column_property(Column(Boolean, default=False), active_history=True)
     access_count = Column(Integer, default=0)
-    last_accessed = Column(DateTime(timezone=True), server_default=func.now())
+    last_accessed = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
     
     # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    expires_at = Column(DateTime(timezone=True), nullable=True)  # Optional expiration
+    expires_at = Column(DateTime(timezone=True), nullable=True, index=True)  # Optional expiration
     
     # Foreign keys
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -57,11 +75,43 @@ class Clip(Base):
     # Relationships
     owner = relationship("User", back_populates="clips")
     files = relationship("File", back_populates="clip", cascade="all, delete-orphan")
+    # Reference counts are kept by the listeners in events.py, not the ORM
+    blob = relationship("ClipBlob", viewonly=True)
+
+    # Number of attached files, only populated by queries that ask for it
+    file_count = query_expression()
     
     def __repr__(self):
         return f"<Clip(id={self.id}, title='{self.title}', type={self.clip_type.value})>"
     
+    @property
+    def content_text(self):
+        """Plain content, whether stored inline or in a blob"""
+        if not self.content_hash:
+            return self.content
+        # Text assigned in this session, possibly not written to its blob yet
+        pending = self.__dict__.get("_pending_blob")
+        if pending and pending[0] == self.content_hash:
+            return pending[1]
+        return self.blob.text
+
+    @validates("content")
+    def _track_content_size(self, key, value):
+        """Keep content_size, preview and the blob reference in sync with content"""
+        self.content_size = len(value.encode("utf-8")) if value else 0
+        self.preview = value[:PREVIEW_LENGTH] if value else value
+
+        if value and self.content_size >= settings.clip_blob_threshold:
+            # Stored by reference; events.py writes the blob on flush
+            self.content_hash = content_hash(value)
+            self._pending_blob = (self.content_hash, value)
+            return None
+        self.content_hash = None
+        return value
+    
     def update_access(self):
         """Update last accessed time and increment access count"""
-        self.last_accessed = func.now()
+        self.last_accessed = utcnow()
         self.access_count += 1
+        # Reads aren't edits: keep updated_at (and ETags) as they are
+        self.updated_at = Clip.updated_at
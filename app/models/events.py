@@ -0,0 +1,179 @@
+"""
+ORM event listeners keeping denormalized User counters, blob references and the
+clip change log in sync
+"""
+
+from sqlalchemy import event, inspect, update
+from sqlalchemy.orm import Session, object_session
+
+from app.database import utcnow
+from .user import User
+from .blob import acquire_blob, release_blobs, remove_spill_files
+from .clip import Clip
+from .file import File
+from .change import ChangeType, record_changes
+
+
+def _adjust_user_counters(connection, user_id: int, **deltas):
+    """Apply counter deltas to a user row within the current transaction"""
+    values = {
+        name: getattr(User.__table__.c, name) + delta
+        for name, delta in deltas.items()
+        if delta
+    }
+    if values and user_id is not None:
+        connection.execute(
+            update(User.__table__).where(User.__table__.c.id == user_id).values(**values)
+        )
+
+
+def _previous_value(target, key: str):
+    """Value of an attribute before the pending change"""
+    history = inspect(target).attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else None
+
+
+# Columns written by reads; changing only these isn't an edit worth syncing
+_READ_COLUMNS = {"access_count", "last_accessed", "updated_at"}
+
+
+def _is_edited(target) -> bool:
+    """Whether a flush changes anything clients sync, not just access counters"""
+    state = inspect(target)
+    return any(
+        state.attrs[attr.key].history.has_changes()
+        for attr in state.mapper.column_attrs
+        if attr.key not in _READ_COLUMNS
+    )
+
+
+def _track_spill_files(target, key: str, paths):
+    """Remember spilled body files to clean up when the transaction ends"""
+    session = object_session(target)
+    if paths and session is not None:
+        session.info.setdefault(key, []).extend(paths)
+
+
+def _acquire_clip_blob(connection, target):
+    """Reference (or write) the blob of a clip's new content"""
+    pending = target.__dict__.get("_pending_blob")
+    text = pending[1] if pending and pending[0] == target.content_hash else None
+    written = acquire_blob(connection, target.content_hash, text)
+    _track_spill_files(target, "spill_files_written", [written] if written else [])
+
+
+def _release_clip_blob(connection, target, blob_hash):
+    _track_spill_files(target, "spill_files_released", release_blobs(connection, {blob_hash: 1}))
+
+
+def call_after_commit(session: Session, callback):
+    """Run `callback` once the session's transaction commits; dropped on rollback"""
+    session.info.setdefault("after_commit_callbacks", []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _spill_files_committed(session):
+    session.info.pop("spill_files_written", None)
+    remove_spill_files(session.info.pop("spill_files_released", []))
+    for callback in session.info.pop("after_commit_callbacks", []):
+        callback()
+
+
+@event.listens_for(Session, "after_rollback")
+def _spill_files_rolled_back(session):
+    session.info.pop("spill_files_released", None)
+    session.info.pop("after_commit_callbacks", None)
+    remove_spill_files(session.info.pop("spill_files_written", []))
+
+
+# Blobs are referenced before the clip row is written and released after,
+# so the full-text triggers on clips can still read the old body
+
+@event.listens_for(Clip, "before_insert")
+def _clip_inserting(mapper, connection, target):
+    if target.content_hash:
+        _acquire_clip_blob(connection, target)
+
+
+@event.listens_for(Clip, "before_update")
+def _clip_updating(mapper, connection, target):
+    if target.content_hash and target.content_hash != _previous_value(target, "content_hash"):
+        _acquire_clip_blob(connection, target)
+
+
+@event.listens_for(Clip, "after_insert")
+def _clip_inserted(mapper, connection, target):
+    _adjust_user_counters(
+        connection, target.owner_id,
+        clip_count=1,
+        pinned_count=1 if target.is_pinned else 0,
+        content_used=target.content_size or 0
+    )
+    record_changes(connection, target.owner_id, [target.id], ChangeType.CREATED)
+
+
+@event.listens_for(Clip, "after_update")
+def _clip_updated(mapper, connection, target):
+    deltas = {}
+
+    if inspect(target).attrs.is_pinned.history.has_changes():
+        was_pinned = bool(_previous_value(target, "is_pinned"))
+        is_pinned = bool(target.is_pinned)
+        if was_pinned != is_pinned:
+            deltas["pinned_count"] = 1 if is_pinned else -1
+
+    if inspect(target).attrs.content_size.history.has_changes():
+        deltas["content_used"] = (target.content_size or 0) - (_previous_value(target, "content_size") or 0)
+
+    _adjust_user_counters(connection, target.owner_id, **deltas)
+    if _is_edited(target):
+        record_changes(connection, target.owner_id, [target.id], ChangeType.UPDATED)
+
+    previous_hash = _previous_value(target, "content_hash")
+    if previous_hash and previous_hash != target.content_hash:
+        _release_clip_blob(connection, target, previous_hash)
+
+
+@event.listens_for(Clip, "after_delete")
+def _clip_deleted(mapper, connection, target):
+    _adjust_user_counters(
+        connection, target.owner_id,
+        clip_count=-1,
+        pinned_count=-1 if target.is_pinned else 0,
+        content_used=-(target.content_size or 0)
+    )
+    _release_clip_blob(connection, target, target.content_hash)
+    record_changes(connection, target.owner_id, [target.id], ChangeType.DELETED)
+
+
+# Attaching or detaching a file changes the clip's file list
+
+def _files_changed(connection, owner_id: int, clip_ids):
+    """Log the clips as updated and move their updated_at, which Last-Modified reports"""
+    clip_ids = sorted(clip_ids)
+    if not clip_ids:
+        return
+    clips = Clip.__table__
+    connection.execute(update(clips).where(clips.c.id.in_(clip_ids)).values(updated_at=utcnow()))
+    record_changes(connection, owner_id, clip_ids, ChangeType.UPDATED)
+
+
+@event.listens_for(File, "after_insert")
+def _file_inserted(mapper, connection, target):
+    _adjust_user_counters(connection, target.owner_id, storage_used=target.file_size or 0)
+    _files_changed(connection, target.owner_id, {target.clip_id} - {None})
+
+
+@event.listens_for(File, "after_update")
+def _file_updated(mapper, connection, target):
+    if inspect(target).attrs.clip_id.history.has_changes():
+        clip_ids = {target.clip_id, _previous_value(target, "clip_id")} - {None}
+        _files_changed(connection, target.owner_id, clip_ids)
+
+
+@event.listens_for(File, "after_delete")
+def _file_deleted(mapper, connection, target):
+    _adjust_user_counters(connection, target.owner_id, storage_used=-(target.file_size or 0))
+    _files_changed(connection, target.owner_id, {target.clip_id} - {None})
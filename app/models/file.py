@@ -2,15 +2,19 @@
 File model for storing uploaded files
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, BigInteger, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, BigInteger, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from app.database import Base
+from app.database import Base, utcnow
 
 
 class File(Base):
     """File model for storing uploaded files"""
     __tablename__ = "files"
+    __table_args__ = (
+        # Keyset pages of a user's files, newest first
+        Index("ix_files_owner_created", "owner_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(255), nullable=False)
@@ -33,12 +37,12 @@ class File(Base):
     last_downloaded = Column(DateTime(timezone=True), nullable=True)
     
     # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Foreign keys
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    clip_id = Column(Integer, ForeignKey("clips.id"), nullable=True)  # Optional association with clip
+    clip_id = Column(Integer, ForeignKey("clips.id"), nullable=True, index=True)  # Optional association with clip
     
     # Relationships
     owner = relationship("User", back_populates="files")
@@ -51,3 +55,4 @@ class File(Base):
         """Update download statistics"""
         self.download_count += 1
         self.last_downloaded = func.now()
+        self.updated_at = File.updated_at  # Downloads aren't edits
@@ -0,0 +1,202 @@
+"""
+Full-text search index DDL for clip titles and content
+"""
+
+import logging
+import sqlite3
+from typing import Iterable, Set
+
+from sqlalchemy import bindparam, event, inspect, select, text
+from sqlalchemy.dialects.sqlite.aiosqlite import AsyncAdapt_aiosqlite_connection
+from sqlalchemy.engine import Engine
+
+from .blob import ClipBlob, blob_text
+from app.database import Base, sync_database_url
+from .clip import Clip
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "clips_fts"
+BLOB_FTS_TABLE = "clip_blobs_fts"
+
+# Must match the expressions used by the PostgreSQL search backend
+POSTGRES_DOCUMENT = "coalesce(title, '') || ' ' || coalesce(content, '')"
+POSTGRES_BLOB_DOCUMENT = "coalesce(content, '')"
+
+_SQLITE_TRIGGERS = ("clips_fts_ai", "clips_fts_ad", "clips_fts_au")
+
+# Plain SQL only, so rows written by any SQLite client keep the index in sync.
+# Blob bodies may be compressed or spilled to files, which SQL can't read:
+# their index keeps its own copy of the text, written where blobs are
+# acquired and released. Its rowid comes from the hash (blob_search_rowid).
+_SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, content, content='clips', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS clips_fts_ai AFTER INSERT ON clips BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS clips_fts_ad AFTER DELETE ON clips BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS clips_fts_au AFTER UPDATE OF title, content ON clips BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {BLOB_FTS_TABLE} USING fts5(
+        hash UNINDEXED, content, tokenize='unicode61 remove_diacritics 2'
+    )""",
+]
+
+# Database URLs whose clips table has a usable full-text index
+_indexed_urls: Set[str] = set()
+
+
+@event.listens_for(Engine, "connect")
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    # The LIKE fallback reads blob bodies, which may be compressed or spilled, with clip_text()
+    if isinstance(dbapi_connection, (sqlite3.Connection, AsyncAdapt_aiosqlite_connection)):
+        dbapi_connection.create_function("clip_text", 4, blob_text, deterministic=True)
+
+
+def _drop_sqlite_index(connection):
+    for trigger in _SQLITE_TRIGGERS:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    connection.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+    connection.execute(text(f"DROP TABLE IF EXISTS {BLOB_FTS_TABLE}"))
+
+
+def _sqlite_index_is_current(connection) -> bool:
+    """Whether the FTS tables and all triggers exist in the current form"""
+    rows = dict(connection.execute(
+        text("SELECT name, sql FROM sqlite_master WHERE name IN :names").bindparams(
+            bindparam("names", expanding=True)
+        ),
+        {"names": [FTS_TABLE, BLOB_FTS_TABLE, *_SQLITE_TRIGGERS]}
+    ).all())
+    if FTS_TABLE not in rows or BLOB_FTS_TABLE not in rows:
+        return False
+    # Rebuilding clips (e.g. a batch migration on SQLite) drops its triggers
+    return all(trigger in rows for trigger in _SQLITE_TRIGGERS)
+
+
+def blob_search_rowid(blob_hash: str) -> int:
+    """Rowid of a blob in the SQLite blob index: the first 60 bits of its hash.
+
+    Lookups also compare the stored hash, so a prefix collision can only
+    leave a blob out of the index, never match the wrong one.
+    """
+    return int(blob_hash[:15], 16)
+
+
+def _insert_blob_text(connection, blobs: Iterable):
+    """Add (hash, text) pairs to the SQLite blob index, skipping ones already there"""
+    params = [
+        {"rowid": blob_search_rowid(blob_hash), "hash": blob_hash, "content": body}
+        for blob_hash, body in blobs
+    ]
+    if params:
+        connection.execute(text(
+            f"INSERT INTO {BLOB_FTS_TABLE}(rowid, hash, content) SELECT :rowid, :hash, :content "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {BLOB_FTS_TABLE} WHERE rowid = :rowid)"
+        ), params)
+
+
+def _index_existing_blobs(connection, batch_size: int = 500):
+    """Fill the SQLite blob index from clip_blobs, reading compressed and spilled bodies"""
+    table = ClipBlob.__table__
+    last_hash = ""
+    while True:
+        rows = connection.execute(
+            select(table.c.hash, table.c.content, table.c.content_codec, table.c.content_data, table.c.file_path)
+            .where(table.c.hash > last_hash).order_by(table.c.hash).limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        blobs = []
+        for blob_hash, content, codec, data, file_path in rows:
+            try:
+                blobs.append((blob_hash, blob_text(content, codec, data, file_path)))
+            except OSError as e:
+                logger.warning(f"Blob {blob_hash[:12]} left out of the search index: {e}")
+        _insert_blob_text(connection, blobs)
+        last_hash = rows[-1].hash
+
+
+def index_blob(connection, blob_hash: str, body: str):
+    """Add a newly stored blob body to the full-text index (SQLite only).
+
+    PostgreSQL and MySQL index the clip_blobs.content column directly.
+    """
+    if connection.dialect.name == "sqlite" and has_search_index(connection):
+        _insert_blob_text(connection, [(blob_hash, body)])
+
+
+def unindex_blobs(connection, blob_hashes: Iterable[str]):
+    """Remove deleted blobs from the full-text index (SQLite only)"""
+    if connection.dialect.name != "sqlite" or not has_search_index(connection):
+        return
+    params = [{"rowid": blob_search_rowid(blob_hash), "hash": blob_hash} for blob_hash in blob_hashes]
+    if params:
+        connection.execute(text(f"DELETE FROM {BLOB_FTS_TABLE} WHERE rowid = :rowid AND hash = :hash"), params)
+
+
+def has_search_index(bind) -> bool:
+    """Whether the full-text index was installed on this database"""
+    # Async engines share the index of the sync engine next to them
+    return sync_database_url(str(bind.engine.url)) in _indexed_urls
+
+
+def install_search_index(connection):
+    """Create the full-text index for the connection's dialect, if missing"""
+    dialect = connection.dialect.name
+    try:
+        if dialect == "sqlite":
+            if not _sqlite_index_is_current(connection):
+                # Missing, built by an older version, or missing triggers
+                _drop_sqlite_index(connection)
+                for statement in _SQLITE_DDL:
+                    connection.execute(text(statement))
+                # Index clips and blobs written while there was no (current) index
+                connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+                _index_existing_blobs(connection)
+        elif dialect == "postgresql":
+            # Savepoint, so a failure doesn't abort the create_all transaction
+            with connection.begin_nested():
+                connection.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_clips_fulltext ON clips "
+                    f"USING GIN (to_tsvector('simple', {POSTGRES_DOCUMENT}))"
+                ))
+                connection.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_clip_blobs_fulltext ON clip_blobs "
+                    f"USING GIN (to_tsvector('simple', {POSTGRES_BLOB_DOCUMENT}))"
+                ))
+        elif dialect in ("mysql", "mariadb"):
+            indexes = {index["name"] for index in inspect(connection).get_indexes("clips")}
+            if "ix_clips_fulltext" not in indexes:
+                connection.execute(text("CREATE FULLTEXT INDEX ix_clips_fulltext ON clips (title, content)"))
+            indexes = {index["name"] for index in inspect(connection).get_indexes("clip_blobs")}
+            if "ix_clip_blobs_fulltext" not in indexes:
+                connection.execute(text("CREATE FULLTEXT INDEX ix_clip_blobs_fulltext ON clip_blobs (content)"))
+        else:
+            return
+    except Exception as e:
+        # e.g. SQLite built without FTS5; search falls back to LIKE
+        logger.warning(f"Full-text search index unavailable, falling back to LIKE search: {e}")
+        return
+
+    _indexed_urls.add(str(connection.engine.url))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _metadata_created(target, connection, **kw):
+    # Runs on every create_all, so databases created before the index get it too
+    if inspect(connection).has_table(Clip.__tablename__):
+        install_search_index(connection)
+
+
+@event.listens_for(Base.metadata, "before_drop")
+def _metadata_dropping(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        _drop_sqlite_index(connection)
+    _indexed_urls.discard(str(connection.engine.url))
@@ -2,7 +2,7 @@
 User model for authentication and user management
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, BigInteger
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -30,6 +30,13 @@ class User(Base):
     # User preferences
     max_clips = Column(Integer, default=1000)  # LRU limit per user
     storage_quota = Column(Integer, default=1024*1024*1024)  # 1GB default
+    eviction_policy = Column(String(20), nullable=True)  # lru, lfu, 2q or gdsf; None uses the global setting
+
+    # Denormalized usage counters (kept in sync by app.models.events)
+    clip_count = Column(Integer, nullable=False, default=0, server_default="0")
+    pinned_count = Column(Integer, nullable=False, default=0, server_default="0")
+    storage_used = Column(BigInteger, nullable=False, default=0, server_default="0")  # Sum of file sizes
+    content_used = Column(BigInteger, nullable=False, default=0, server_default="0")  # Sum of clip content sizes
     
     # Relationships
     clips = relationship("Clip", back_populates="owner", cascade="all, delete-orphan")
@@ -9,7 +9,12 @@ from sqlalchemy.orm import Session
 from app.database import get_db, settings
 from app.services.auth import auth_service
 from app.services.lru import lru_service
+from app.services.scheduler import cleanup_scheduler
+from app.services.access_buffer import access_buffer
+from app.services.share_cache import share_cache
+from app.services.clip_events import clip_events
 from app.utils.auth import get_current_admin_user
+from app.utils.singleflight import lookups
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -27,6 +32,59 @@ def run_lru_cleanup(
     }
 
 
+@router.post("/cleanup/counters")
+def reconcile_user_counters(
+    admin_user = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Repair drift in per-user clip and storage counters (admin only)"""
+    users_fixed = lru_service.reconcile_user_counters(db)
+    return {
+        "message": "User counters reconciled",
+        "users_fixed": users_fixed
+    }
+
+
+@router.get("/cleanup/scheduler")
+def get_cleanup_scheduler_stats(
+    admin_user = Depends(get_current_admin_user)
+):
+    """Get background cleanup job statistics (admin only)"""
+    return cleanup_scheduler.get_stats()
+
+
+@router.get("/stats/access-buffer")
+def get_access_buffer_stats(
+    admin_user = Depends(get_current_admin_user)
+):
+    """Get write-behind access buffer statistics (admin only)"""
+    return access_buffer.get_stats()
+
+
+@router.get("/stats/share-cache")
+def get_share_cache_stats(
+    admin_user = Depends(get_current_admin_user)
+):
+    """Get shared clip cache statistics (admin only)"""
+    return share_cache.get_stats()
+
+
+@router.get("/stats/clip-streams")
+def get_clip_stream_stats(
+    admin_user = Depends(get_current_admin_user)
+):
+    """Get live clip stream statistics (admin only)"""
+    return clip_events.get_stats()
+
+
+@router.get("/stats/lookups")
+def get_lookup_stats(
+    admin_user = Depends(get_current_admin_user)
+):
+    """Get shared clip and file lookup coalescing statistics (admin only)"""
+    return lookups.get_stats()
+
+
 @router.get("/stats/storage")
 def get_storage_stats(
     admin_user = Depends(get_current_admin_user),
@@ -48,12 +106,9 @@ def get_storage_stats(
     total_storage = db.query(func.sum(File.file_size)).scalar() or 0
     
     # Get top users by storage
-    top_users = db.query(
-        User.username,
-        func.sum(File.file_size).label('storage_used')
-    ).join(File).group_by(User.id).order_by(
-        func.sum(File.file_size).desc()
-    ).limit(10).all()
+    top_users = db.query(User.username, User.storage_used).filter(
+        User.storage_used > 0
+    ).order_by(User.storage_used.desc()).limit(10).all()
     
     return {
         "users": {
@@ -2,20 +2,45 @@
 Clip management routes
 """
 
+import asyncio
+import json
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect, status, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import SessionRunner, get_db, get_session_runner
 from app.models.clip import ClipType, AccessLevel
 from app.schemas.clip import (
     ClipCreate, ClipUpdate, ClipResponse, ClipListResponse,
-    ClipAccessRequest
+    ClipAccessRequest, ClipChangeResponse, ClipChangesResponse, ClipStreamTicket
 )
-from app.services.clip import clip_service
+from app.services.clip import ChangeLogExpired, clip_service
+from app.services.clip_events import clip_events
 from app.services.lru import lru_service
-from app.utils.auth import get_current_user_or_anonymous
+from app.config import settings
+from app.services.auth import auth_service
+from app.utils.auth import (
+    get_current_user_optional, get_current_user_or_anonymous, get_runner_user_or_anonymous, get_stream_user_id,
+    resolve_stream_user_id
+)
+from app.utils.conditional import (
+    PRIVATE_CACHE_CONTROL, clip_etag, is_not_modified, not_modified_response, public_cache_control,
+    validator_headers
+)
+from app.utils.serialization import FastJSONResponse
+
+TEXT_MEDIA_TYPE = "text/plain; charset=utf-8"
+
+
+def _content_response(clip) -> Response:
+    """Raw clip body, streamed straight from disk when it was spilled to a file"""
+    if clip.blob is not None and clip.blob.file_path:
+        return FileResponse(clip.blob.file_path, media_type=TEXT_MEDIA_TYPE)
+    return Response(clip.content_text or "", media_type=TEXT_MEDIA_TYPE)
+
 
 router = APIRouter(prefix="/clips", tags=["Clips"])
 
@@ -27,9 +52,8 @@ def create_clip(
     db: Session = Depends(get_db)
 ):
     """Create a new clip"""
-    # Check if user has reached clip limit
-    stats = lru_service.get_user_storage_stats(db, current_user)
-    if stats["clips_available"] <= 0:
+    # Check if user has reached clip limit (denormalized counter, no aggregate query)
+    if current_user.clip_count >= current_user.max_clips:
         # Try to clean up old clips first
         deleted = lru_service.cleanup_user_clips(db, current_user)
         if deleted == 0:
@@ -43,48 +67,266 @@ def create_clip(
 
 
 @router.get("/", response_model=ClipListResponse)
-def get_clips(
+async def get_clips(
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(20, ge=1, le=100, description="Items per page"),
     clip_type: Optional[ClipType] = Query(None, description="Filter by clip type"),
     search: Optional[str] = Query(None, description="Search in title and content"),
-    current_user = Depends(get_current_user_or_anonymous),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; replaces page"),
+    include_total: bool = Query(True, description="Count all matching clips (page mode only)"),
+    view: str = Query("full", pattern="^(full|summary)$", description="summary: previews instead of content and files"),
+    current_user = Depends(get_runner_user_or_anonymous),
+    db: SessionRunner = Depends(get_session_runner)
 ):
-    """Get user's clips with pagination and filtering"""
-    clips, total = clip_service.get_user_clips(
+    """Get user's clips with pagination and filtering.
+
+    Without a cursor, pages are numbered and search results are ranked by
+    relevance. With a cursor (an empty one starts at the beginning), pages
+    follow on from the previous one by recency and no total is computed.
+    The summary view never loads clip content.
+    """
+    return await db.run(
+        _list_clips, current_user, page, per_page, clip_type, search, cursor, include_total, view == "summary"
+    )
+
+
+def _list_clips(
+    db: Session,
+    current_user,
+    page: int,
+    per_page: int,
+    clip_type: Optional[ClipType],
+    search: Optional[str],
+    cursor: Optional[str],
+    include_total: bool,
+    summary: bool
+) -> FastJSONResponse:
+    # Rows are read from trusted columns and encoded once, without
+    # validating models against ClipListResponse again
+    if cursor is not None:
+        try:
+            rows, next_cursor = clip_service.get_user_clips_after(
+                db, current_user,
+                cursor=cursor or None,
+                limit=per_page,
+                clip_type=clip_type,
+                search=search,
+                summary=summary
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        return FastJSONResponse({
+            "clips": clip_service.list_items(db, rows, summary),
+            "total": None,
+            "page": None,
+            "per_page": per_page,
+            "has_next": next_cursor is not None,
+            "has_prev": bool(cursor),
+            "next_cursor": next_cursor
+        })
+
+    # One extra row tells whether there is a next page without the count
+    rows, total = clip_service.get_user_clips(
         db, current_user, 
         skip=(page - 1) * per_page, 
-        limit=per_page,
+        limit=per_page + 1,
         clip_type=clip_type,
-        search=search
+        search=search,
+        include_total=include_total,
+        summary=summary
     )
     
-    return ClipListResponse(
-        clips=[ClipResponse.model_validate(clip) for clip in clips],
-        total=total,
-        page=page,
-        per_page=per_page,
-        has_next=page * per_page < total,
-        has_prev=page > 1
+    return FastJSONResponse({
+        "clips": clip_service.list_items(db, rows[:per_page], summary),
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "has_next": len(rows) > per_page,
+        "has_prev": page > 1,
+        "next_cursor": None
+    })
+
+
+@router.get("/changes", response_model=ClipChangesResponse)
+def get_clip_changes(
+    since: Optional[int] = Query(None, ge=0, description="next_since of the previous call; omit to get the current position"),
+    limit: int = Query(100, ge=1, le=500),
+    current_user = Depends(get_current_user_or_anonymous),
+    db: Session = Depends(get_db)
+):
+    """Get clips changed since a sync position, with tombstones for deleted and evicted clips"""
+    try:
+        changes, next_since, has_more = clip_service.get_changes(db, current_user, since, limit)
+    except ChangeLogExpired:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Sync position is no longer available, reload all clips"
+        )
+
+    return ClipChangesResponse(
+        changes=[
+            ClipChangeResponse(
+                seq=change.seq,
+                clip_id=change.clip_id,
+                change=change.change,
+                clip=ClipResponse.model_validate(clip) if clip is not None else None
+            )
+            for change, clip in changes
+        ],
+        next_since=next_since,
+        has_more=has_more
+    )
+
+
+@router.post("/stream/ticket", response_model=ClipStreamTicket)
+def create_stream_ticket(current_user = Depends(get_current_user_optional)):
+    """Issue a short-lived ticket for opening the clip stream without credentials in the URL"""
+    if current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication required",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return ClipStreamTicket(
+        ticket=auth_service.create_stream_ticket(current_user),
+        expires_in=settings.clip_stream_ticket_ttl
+    )
+
+
+async def _authenticate_first_message(websocket: WebSocket, db: Session) -> Optional[int]:
+    """User id from a {"token" | "session_id" | "ticket": ...} first message, or None"""
+    try:
+        message = await asyncio.wait_for(websocket.receive_json(), settings.clip_stream_auth_timeout)
+    except (asyncio.TimeoutError, ValueError, WebSocketDisconnect):
+        return None
+    if not isinstance(message, dict):
+        return None
+    return await run_in_threadpool(
+        resolve_stream_user_id, db, message.get("token"), message.get("session_id"), message.get("ticket")
+    )
+
+
+@router.websocket("/stream")
+async def clip_stream(
+    websocket: WebSocket,
+    user_id: Optional[int] = Depends(get_stream_user_id),
+    db: Session = Depends(get_db)
+):
+    """Push create/update/delete/pin/evict events for the user's clips as JSON messages.
+
+    Clients that can't set headers send their credentials as the first
+    message and get {"type": "subscribed"} once events will be delivered.
+    """
+    if user_id is not None:
+        # Subscribe first so nothing published right after the handshake is missed
+        subscription = clip_events.subscribe(user_id)
+        await websocket.accept()
+    else:
+        await websocket.accept()
+        user_id = await _authenticate_first_message(websocket, db)
+        if user_id is None:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+        subscription = clip_events.subscribe(user_id)
+        await websocket.send_json({"type": "subscribed"})
+
+    try:
+        while True:
+            event = await subscription.get(settings.clip_stream_keepalive)
+            if event is None:
+                await websocket.close()
+                break
+            await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        clip_events.unsubscribe(subscription)
+
+
+@router.get("/stream")
+async def clip_event_stream(
+    request: Request,
+    user_id: Optional[int] = Depends(get_stream_user_id)
+):
+    """Server-Sent Events fallback of the clip stream, for clients without WebSocket"""
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication required",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    subscription = clip_events.subscribe(user_id)
+
+    async def event_source():
+        try:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                event = await subscription.get(settings.clip_stream_keepalive)
+                if event is None:
+                    break
+                if event["type"] == "ping":
+                    yield ": ping\n\n"
+                else:
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            clip_events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
 @router.get("/{clip_id}", response_model=ClipResponse)
-def get_clip(
+async def get_clip(
+    clip_id: int,
+    request: Request,
+    response: Response,
+    current_user = Depends(get_runner_user_or_anonymous),
+    db: SessionRunner = Depends(get_session_runner)
+):
+    """Get a specific clip; honours If-None-Match / If-Modified-Since"""
+    return await db.run(_get_clip, clip_id, current_user, request, response)
+
+
+def _get_clip(db: Session, clip_id: int, current_user, request: Request, response: Response):
+    # The body is only loaded, and the read only counted, once we know the client needs it
+    clip = clip_service.get_clip_by_id(db, clip_id, current_user, with_content=False, track=False)
+    if not clip:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Clip not found"
+        )
+
+    last_modified = clip.updated_at or clip.created_at
+    headers = validator_headers(clip_etag(clip), last_modified, PRIVATE_CACHE_CONTROL)
+    if is_not_modified(request, headers["ETag"], last_modified):
+        return not_modified_response(headers)
+
+    clip_service.track_access(db, clip)
+    response.headers.update(headers)
+    return ClipResponse.model_validate(clip)
+
+
+@router.get("/{clip_id}/content", response_class=Response)
+def get_clip_content(
     clip_id: int,
     current_user = Depends(get_current_user_or_anonymous),
     db: Session = Depends(get_db)
 ):
-    """Get a specific clip"""
+    """Get the raw body of a clip as plain text"""
     clip = clip_service.get_clip_by_id(db, clip_id, current_user)
     if not clip:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Clip not found"
         )
-    
-    return ClipResponse.model_validate(clip)
+
+    return _content_response(clip)
 
 
 @router.put("/{clip_id}", response_model=ClipResponse)
@@ -155,11 +397,41 @@ def unpin_clip(
 
 
 @router.get("/shared/{share_token}", response_model=ClipResponse)
-def get_shared_clip(
+async def get_shared_clip(
     share_token: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: SessionRunner = Depends(get_session_runner)
 ):
-    """Get a shared clip by token"""
+    """Get a shared clip by token; honours If-None-Match / If-Modified-Since.
+
+    Async, so share page viewers don't hold a worker thread while the
+    lookup waits on an async database engine.
+    """
+    shared = await db.run(clip_service.get_shared_clip, share_token)
+    if not shared:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Shared clip not found or expired"
+        )
+
+    # If clip is encrypted, require password authentication
+    if shared.access_level == AccessLevel.ENCRYPTED:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Password required for encrypted clip"
+        )
+
+    headers = validator_headers(shared.etag, shared.last_modified, public_cache_control())
+    if is_not_modified(request, shared.etag, shared.last_modified):
+        return not_modified_response(headers)
+
+    await db.run(clip_service.track_shared_access, shared)
+    response.headers.update(headers)
+    return shared.response
+
+
+def _shared_content_response(db: Session, share_token: str) -> Response:
     clip = clip_service.get_clip_by_share_token(db, share_token)
     if not clip:
         raise HTTPException(
@@ -167,14 +439,23 @@ def get_shared_clip(
             detail="Shared clip not found or expired"
         )
 
-    # If clip is encrypted, require password authentication
     if clip.access_level == AccessLevel.ENCRYPTED:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Password required for encrypted clip"
         )
 
-    return ClipResponse.model_validate(clip)
+    return _content_response(clip)
+
+
+@router.get("/shared/{share_token}/content", response_class=Response)
+async def get_shared_clip_content(
+    share_token: str,
+    db: SessionRunner = Depends(get_session_runner)
+):
+    """Get the raw body of a shared clip as plain text"""
+    # Built in the session: the clip can't load attributes once it returns
+    return await db.run(_shared_content_response, share_token)
 
 
 @router.post("/shared/{share_token}/access", response_model=ClipResponse)
@@ -184,23 +465,24 @@ def access_encrypted_clip(
     db: Session = Depends(get_db)
 ):
     """Access an encrypted shared clip with password"""
-    clip = clip_service.get_clip_by_share_token(db, share_token)
-    if not clip:
+    shared = clip_service.get_shared_clip(db, share_token)
+    if not shared:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Shared clip not found or expired"
         )
     
-    if clip.access_level != AccessLevel.ENCRYPTED:
+    if shared.access_level != AccessLevel.ENCRYPTED:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Clip is not encrypted"
         )
     
-    if not clip_service.verify_clip_password(access_request.password, clip.password_hash):
+    if not clip_service.verify_clip_password(access_request.password, shared.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect password"
         )
     
-    return ClipResponse.model_validate(clip)
+    clip_service.track_shared_access(db, shared)
+    return shared.response
@@ -3,15 +3,19 @@ File management routes
 """
 
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File as FastAPIFile, Query
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, status, UploadFile, File as FastAPIFile, Query
+from fastapi.responses import FileResponse, Response
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import SessionRunner, get_db, get_session_runner
 from app.schemas.file import FileResponse as FileResponseSchema, FileUploadResponse, FileListResponse
 from app.services.file import file_service
 from app.services.clip import clip_service
-from app.utils.auth import get_current_user_or_anonymous
+from app.utils.auth import get_current_user_or_anonymous, get_runner_user_or_anonymous
+from app.utils.serialization import FastJSONResponse
+from app.utils.conditional import (
+    PRIVATE_CACHE_CONTROL, file_etag, is_not_modified, not_modified_response, validator_headers
+)
 
 
 router = APIRouter(prefix="/files", tags=["Files"])
@@ -28,7 +32,7 @@ def upload_file(
     # Validate clip if provided
     clip = None
     if clip_id:
-        clip = clip_service.get_clip_by_id(db, clip_id, current_user)
+        clip = clip_service.get_clip_by_id(db, clip_id, current_user, with_content=False)
         if not clip:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -55,7 +59,7 @@ async def stream_upload_file(
     # Validate clip if provided
     clip = None
     if clip_id:
-        clip = clip_service.get_clip_by_id(db, clip_id, current_user)
+        clip = clip_service.get_clip_by_id(db, clip_id, current_user, with_content=False)
         if not clip:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -75,24 +79,48 @@ async def stream_upload_file(
 def get_files(
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(20, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; replaces page"),
+    include_total: bool = Query(True, description="Count all files (page mode only)"),
     current_user = Depends(get_current_user_or_anonymous),
     db: Session = Depends(get_db)
 ):
-    """Get user's files with pagination"""
+    """Get user's files with pagination, newest first; see get_clips for cursor mode"""
+    if cursor is not None:
+        try:
+            files, next_cursor = file_service.get_user_files_after(
+                db, current_user,
+                cursor=cursor or None,
+                limit=per_page
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        return FastJSONResponse({
+            "files": [row._asdict() for row in files],
+            "total": None,
+            "page": None,
+            "per_page": per_page,
+            "has_next": next_cursor is not None,
+            "has_prev": bool(cursor),
+            "next_cursor": next_cursor
+        })
+
     files, total = file_service.get_user_files(
         db, current_user,
         skip=(page - 1) * per_page,
-        limit=per_page
+        limit=per_page + 1,
+        include_total=include_total
     )
     
-    return FileListResponse(
-        files=[FileResponseSchema.model_validate(f) for f in files],
-        total=total,
-        page=page,
-        per_page=per_page,
-        has_next=page * per_page < total,
-        has_prev=page > 1
-    )
+    return FastJSONResponse({
+        "files": [row._asdict() for row in files[:per_page]],
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "has_next": len(files) > per_page,
+        "has_prev": page > 1,
+        "next_cursor": None
+    })
 
 
 @router.get("/{file_id}", response_model=FileResponseSchema)
@@ -113,13 +141,19 @@ def get_file_info(
 
 
 @router.get("/{file_id}/download")
-def download_file(
+async def download_file(
     file_id: int,
-    current_user = Depends(get_current_user_or_anonymous),
-    db: Session = Depends(get_db)
+    request: Request,
+    current_user = Depends(get_runner_user_or_anonymous),
+    db: SessionRunner = Depends(get_session_runner)
 ):
-    """Download a file"""
-    file_obj = file_service.get_file_for_download(db, file_id, current_user)
+    """Download a file; honours If-None-Match / If-Modified-Since"""
+    return await db.run(_download_file, file_id, current_user, request)
+
+
+def _download_file(db: Session, file_id: int, current_user, request: Request) -> Response:
+    # Only downloads that send the file are counted
+    file_obj = file_service.get_file_for_download(db, file_id, current_user, track=False)
     if not file_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -132,12 +166,19 @@ def download_file(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="File not found on disk"
         )
-    
-    return FileResponse(
+
+    headers = validator_headers(file_etag(file_obj), file_obj.created_at, PRIVATE_CACHE_CONTROL)
+    if is_not_modified(request, headers["ETag"], file_obj.created_at):
+        return not_modified_response(headers)
+
+    response = FileResponse(
         path=str(file_path),
         filename=file_obj.original_filename,
-        media_type=file_obj.mime_type
+        media_type=file_obj.mime_type,
+        headers=headers
     )
+    file_service.track_download(db, file_obj)
+    return response
 
 
 @router.delete("/{file_id}", status_code=status.HTTP_204_NO_CONTENT)
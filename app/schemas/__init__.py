@@ -3,11 +3,14 @@ Pydantic schemas for API requests and responses
 """
 
 from .user import UserCreate, UserLogin, UserResponse, Token, AnonymousSessionCreate, AnonymousSessionResponse
-from .clip import ClipCreate, ClipUpdate, ClipResponse, ClipListResponse
+from .clip import (
+    ClipCreate, ClipUpdate, ClipResponse, ClipSummary, ClipListResponse, ClipChangeResponse, ClipChangesResponse
+)
 from .file import FileResponse, FileUploadResponse
 
 __all__ = [
     "UserCreate", "UserLogin", "UserResponse", "Token", "AnonymousSessionCreate", "AnonymousSessionResponse",
-    "ClipCreate", "ClipUpdate", "ClipResponse", "ClipListResponse",
+    "ClipCreate", "ClipUpdate", "ClipResponse", "ClipSummary", "ClipListResponse",
+    "ClipChangeResponse", "ClipChangesResponse",
     "FileResponse", "FileUploadResponse"
 ]
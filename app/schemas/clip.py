@@ -2,9 +2,10 @@
 Clip-related Pydantic schemas
 """
 
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, BaseModel, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Union
+from app.models.change import ChangeType
 from app.models.clip import ClipType, AccessLevel
 
 
@@ -50,6 +51,10 @@ class FileInfo(BaseModel):
 
 class ClipResponse(ClipBase):
     """Schema for clip response"""
+    # Read from Clip.content_text so compressed content is returned as text
+    content: Optional[str] = Field(
+        None, validation_alias=AliasChoices("content_text", "content"), description="Clip content"
+    )
     id: int
     share_token: Optional[str]
     is_pinned: bool
@@ -66,14 +71,60 @@ class ClipResponse(ClipBase):
     }
 
 
+class ClipSummary(BaseModel):
+    """Schema for a clip in a summary list, without content or files"""
+    id: int
+    title: Optional[str]
+    clip_type: ClipType
+    access_level: AccessLevel
+    is_markdown: bool
+    share_token: Optional[str]
+    is_pinned: bool
+    access_count: int
+    last_accessed: datetime
+    created_at: datetime
+    updated_at: Optional[datetime]
+    expires_at: Optional[datetime]
+    owner_id: int
+    preview: Optional[str] = Field(description="First characters of the content")
+    content_size: Optional[int] = Field(description="Content size in bytes")
+    file_count: int
+
+    model_config = {
+        "from_attributes": True
+    }
+
+
 class ClipListResponse(BaseModel):
     """Schema for clip list response"""
-    clips: List[ClipResponse]
-    total: int
-    page: int
+    clips: List[Union[ClipResponse, ClipSummary]]
+    total: Optional[int] = None  # omitted in cursor mode or when not requested
+    page: Optional[int] = None  # None in cursor mode
     per_page: int
     has_next: bool
     has_prev: bool
+    next_cursor: Optional[str] = None
+
+
+class ClipChangeResponse(BaseModel):
+    """Schema for the latest change to a clip since a sync position"""
+    seq: int
+    clip_id: int
+    change: ChangeType
+    clip: Optional[ClipResponse] = Field(None, description="Current clip; None for deleted or evicted clips")
+
+
+class ClipChangesResponse(BaseModel):
+    """Schema for delta sync response"""
+    changes: List[ClipChangeResponse]
+    next_since: int = Field(description="Pass as `since` on the next call")
+    has_more: bool
+
+
+class ClipStreamTicket(BaseModel):
+    """Schema for a short-lived ticket opening the clip stream"""
+    ticket: str = Field(description="Pass as `ticket` to GET /api/clips/stream, or in the first WebSocket message")
+    expires_in: int = Field(description="Seconds the ticket stays valid")
 
 
 class ClipShareRequest(BaseModel):
@@ -41,8 +41,9 @@ class FileUploadResponse(BaseModel):
 class FileListResponse(BaseModel):
     """Schema for file list response"""
     files: list[FileResponse]
-    total: int
-    page: int
+    total: Optional[int] = None  # omitted in cursor mode or when not requested
+    page: Optional[int] = None  # None in cursor mode
     per_page: int
     has_next: bool
     has_prev: bool
+    next_cursor: Optional[str] = None
@@ -38,6 +38,7 @@ class UserResponse(UserBase):
     last_login: Optional[datetime]
     max_clips: int
     storage_quota: int
+    eviction_policy: Optional[str] = None
 
     model_config = {
         "from_attributes": True
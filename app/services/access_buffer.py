@@ -0,0 +1,230 @@
+"""
+Write-behind buffer for clip access and file download tracking
+"""
+
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.clip import Clip
+from app.models.file import File
+
+logger = logging.getLogger(__name__)
+
+
+class AccessBuffer:
+    """Coalesces read-side counter updates and flushes them in batches.
+
+    Each clip or file id keeps a pending increment and the latest access
+    time. A worker thread flushes every `access_buffer_flush_interval`
+    milliseconds, or sooner once `access_buffer_max_events` accesses are
+    pending, with one executemany UPDATE per table. Pending updates are
+    drained on stop. When disabled, accesses are written and committed
+    immediately as before.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._clips: Dict[int, List] = {}  # id -> [count, last access]
+        self._files: Dict[int, List] = {}
+        self._events = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Statistics
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.access_buffer_enabled
+
+    def _record(self, pending: Dict[int, List], row_id: int, at: datetime):
+        with self._lock:
+            entry = pending.get(row_id)
+            if entry is None:
+                pending[row_id] = [1, at]
+            else:
+                entry[0] += 1
+                entry[1] = max(entry[1], at)
+            self._events += 1
+            full = self._events >= settings.access_buffer_max_events
+        if full:
+            self._wake.set()
+
+    def track_clip_access(self, db: Session, clip: Clip):
+        """Record a clip read; commits right away unless buffering is enabled"""
+        if not self.enabled:
+            clip.update_access()
+            db.commit()
+            return
+
+        now = datetime.now(timezone.utc)
+        self._record(self._clips, clip.id, now)
+        # Reflect the access in the response without making the session dirty
+        set_committed_value(clip, "access_count", (clip.access_count or 0) + 1)
+        set_committed_value(clip, "last_accessed", now)
+
+    def track_clip_access_by_id(self, db: Session, clip_id: int):
+        """Record a read of a clip that wasn't loaded, e.g. served from a cache"""
+        if not self.enabled:
+            db.execute(update(Clip).where(Clip.id == clip_id).values(
+                access_count=Clip.access_count + 1, last_accessed=datetime.now(timezone.utc), updated_at=Clip.updated_at
+            ))
+            db.commit()
+            return
+
+        self._record(self._clips, clip_id, datetime.now(timezone.utc))
+
+    def track_file_download(self, db: Session, file_obj: File):
+        """Record a file download; commits right away unless buffering is enabled"""
+        if not self.enabled:
+            file_obj.update_download()
+            db.commit()
+            return
+
+        now = datetime.now(timezone.utc)
+        self._record(self._files, file_obj.id, now)
+        set_committed_value(file_obj, "download_count", (file_obj.download_count or 0) + 1)
+        set_committed_value(file_obj, "last_downloaded", now)
+
+    def track_file_download_by_id(self, db: Session, file_id: int):
+        """Record a download of a file that wasn't loaded by this session"""
+        if not self.enabled:
+            db.execute(update(File).where(File.id == file_id).values(
+                download_count=File.download_count + 1, last_downloaded=func.now(),
+                updated_at=File.updated_at
+            ))
+            db.commit()
+            return
+
+        self._record(self._files, file_id, datetime.now(timezone.utc))
+
+    def pending(self) -> int:
+        """Number of ids with unflushed updates"""
+        with self._lock:
+            return len(self._clips) + len(self._files)
+
+    def _take(self) -> Tuple[Dict[int, List], Dict[int, List]]:
+        with self._lock:
+            clips, self._clips = self._clips, {}
+            files, self._files = self._files, {}
+            self._events = 0
+        return clips, files
+
+    def _restore(self, clips: Dict[int, List], files: Dict[int, List]):
+        """Put back updates from a failed flush, merging newer accesses"""
+        with self._lock:
+            for pending, taken in ((self._clips, clips), (self._files, files)):
+                for row_id, (count, at) in taken.items():
+                    entry = pending.setdefault(row_id, [0, at])
+                    entry[0] += count
+                    entry[1] = max(entry[1], at)
+                    self._events += count
+
+    def flush(self, db: Optional[Session] = None) -> int:
+        """Write pending updates, returns the number of rows updated"""
+        with self._flush_lock:
+            clips, files = self._take()
+            if not clips and not files:
+                return 0
+
+            own_session = db is None
+            if own_session:
+                db = self.session_factory()
+            try:
+                # Counters aren't edits, so updated_at is written back unchanged
+                if clips:
+                    table = Clip.__table__
+                    db.execute(
+                        update(table).where(table.c.id == bindparam("row_id")).values(
+                            access_count=func.coalesce(table.c.access_count, 0) + bindparam("count"),
+                            last_accessed=bindparam("at"),
+                            updated_at=table.c.updated_at
+                        ),
+                        [{"row_id": k, "count": c, "at": at} for k, (c, at) in clips.items()]
+                    )
+                if files:
+                    table = File.__table__
+                    db.execute(
+                        update(table).where(table.c.id == bindparam("row_id")).values(
+                            download_count=func.coalesce(table.c.download_count, 0) + bindparam("count"),
+                            last_downloaded=bindparam("at"),
+                            updated_at=table.c.updated_at
+                        ),
+                        [{"row_id": k, "count": c, "at": at} for k, (c, at) in files.items()]
+                    )
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                self._restore(clips, files)
+                self.last_error = str(e)
+                raise
+            finally:
+                if own_session:
+                    db.close()
+
+        self.flushes += 1
+        self.rows_flushed += len(clips) + len(files)
+        self.last_error = None
+        return len(clips) + len(files)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the flush thread"""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="access-buffer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the flush thread and drain pending updates"""
+        if self.running:
+            self._stop_event.set()
+            self._wake.set()
+            self._thread.join(timeout)
+            self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Final access buffer flush failed: {e}", exc_info=True)
+
+    def _run(self):
+        """Worker loop"""
+        while not self._stop_event.is_set():
+            self._wake.wait(settings.access_buffer_flush_interval / 1000.0)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Access buffer flush failed: {e}", exc_info=True)
+
+    def get_stats(self) -> dict:
+        """Get buffer statistics"""
+        return {
+            "enabled": self.enabled,
+            "running": self.running,
+            "pending": self.pending(),
+            "flushes": self.flushes,
+            "rows_flushed": self.rows_flushed,
+            "last_error": self.last_error
+        }
+
+
+# Global instance
+access_buffer = AccessBuffer()
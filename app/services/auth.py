@@ -4,17 +4,23 @@ Authentication service for user management and JWT tokens
 
 import secrets
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import List, Optional
 from sqlalchemy.orm import Session
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from fastapi import HTTPException, status
 
+from app.models.change import ClipChange
+from app.models.clip import Clip
 from app.models.user import User
 from app.schemas.user import UserCreate
 from app.config import settings
 
 
+# JWT purpose claim of clip stream tickets
+STREAM_TICKET_PURPOSE = "clip-stream"
+
+
 class AuthService:
     """Authentication service"""
     
@@ -44,17 +50,31 @@ class AuthService:
         encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
         return encoded_jwt
     
-    def verify_token(self, token: str) -> dict:
-        """Verify and decode a JWT token"""
+    def verify_token(self, token: str, purpose: Optional[str] = None) -> dict:
+        """Verify and decode a JWT token; tokens issued for a `purpose` only pass for that purpose"""
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            return payload
         except JWTError:
+            payload = None
+        if payload is None or payload.get("purpose") != purpose:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        return payload
+
+    def create_stream_ticket(self, user: User) -> str:
+        """Short-lived token that can only open the user's clip stream.
+
+        Browsers can't set headers on EventSource requests, so the ticket
+        goes in the URL instead of the access token or session id, where
+        it would end up in access logs.
+        """
+        return self.create_access_token(
+            {"sub": str(user.id), "purpose": STREAM_TICKET_PURPOSE},
+            expires_delta=timedelta(seconds=settings.clip_stream_ticket_ttl)
+        )
     
     def get_user_by_username(self, db: Session, username: str) -> Optional[User]:
         """Get user by username"""
@@ -151,23 +171,42 @@ class AuthService:
             User.is_anonymous == True
         ).first()
 
-    def cleanup_expired_anonymous_users(self, db: Session) -> int:
-        """Clean up expired anonymous users"""
-        expire_time = datetime.now(timezone.utc) - timedelta(hours=settings.anonymous_clip_expire_hours)
+    def delete_users(self, db: Session, user_ids: List[int]) -> int:
+        """Delete users with their clips and files using set-based statements.
+
+        Clips are evicted in batches of purge_batch_size, each committed on
+        its own so writers aren't locked out for long; the remaining files
+        and the users go in a final transaction. Users left behind by a
+        failure are picked up again by the next run.
+        """
+        from app.services.lru import lru_service
+
+        clip_ids = [
+            clip_id for (clip_id,) in db.query(Clip.id).filter(Clip.owner_id.in_(user_ids)).order_by(Clip.id)
+        ]
+        for i in range(0, len(clip_ids), settings.purge_batch_size):
+            lru_service.evict_clips(db, clip_ids[i:i + settings.purge_batch_size])
+
+        lru_service.delete_user_files(db, user_ids)
+        db.query(ClipChange).filter(ClipChange.user_id.in_(user_ids)).delete(synchronize_session=False)
+        deleted_count = db.query(User).filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+        db.commit()
 
-        expired_users = db.query(User).filter(
-            User.is_anonymous == True,
-            User.created_at < expire_time
-        ).all()
+        return deleted_count
 
-        deleted_count = len(expired_users)
-        for user in expired_users:
-            db.delete(user)
+    def cleanup_expired_anonymous_users(self, db: Session, deadline: Optional[float] = None) -> int:
+        """Clean up expired anonymous users in batches"""
+        from app.services.lru import lru_service
 
-        if deleted_count > 0:
-            db.commit()
+        expire_time = datetime.now(timezone.utc) - timedelta(hours=settings.anonymous_clip_expire_hours)
+        query = db.query(User.id).filter(
+            User.is_anonymous == True,
+            User.created_at < expire_time
+        )
 
-        return deleted_count
+        return lru_service.purge_in_batches(
+            db, "anonymous-users", query, User.id, lambda ids: self.delete_users(db, ids), deadline
+        )
 
 
 # Global instance
@@ -4,14 +4,81 @@ Clip service for managing clipboard content
 
 import secrets
 import hashlib
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import Optional, List, Tuple
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_, or_
+from sqlalchemy.orm import Session, aliased, defer, joinedload, selectinload
+from sqlalchemy import Row, desc, and_, case, func, select
 
+from app.models.blob import ClipBlob, blob_text
+from app.models.change import TOMBSTONES, ClipChange
 from app.models.clip import Clip, AccessLevel, ClipType
+from app.models.file import File
 from app.models.user import User
+from app.config import settings
 from app.schemas.clip import ClipCreate, ClipUpdate
+from app.services.lru import lru_service
+from app.services.lru_index import lru_index
+from app.services.expiry import expiry_queue
+from app.services.access_buffer import access_buffer
+from app.services.clip_events import CREATED, DELETED, PINNED, UNPINNED, UPDATED, clip_events
+from app.services.search import get_search_backend
+from app.services.share_cache import SharedClip, share_cache
+from app.utils.dates import as_utc
+from app.utils.pagination import keyset_paginate
+from app.utils.singleflight import lookups
+
+
+# Loader options for clips that are serialized as ClipResponse: files come
+# in one SELECT ... IN per page instead of one lazy load per clip. Blob bodies
+# are joined to the row and only decompressed when serialized.
+CLIP_BLOB_OPTION = joinedload(Clip.blob).undefer(ClipBlob.content_data)
+CLIP_RESPONSE_OPTIONS = (selectinload(Clip.files), CLIP_BLOB_OPTION)
+
+# Lists only need the FileInfo columns of each file and never the password hash
+CLIP_LIST_OPTIONS = (
+    selectinload(Clip.files).load_only(
+        File.id, File.filename, File.original_filename, File.file_size,
+        File.mime_type, File.created_at, File.clip_id
+    ),
+    defer(Clip.password_hash),
+    CLIP_BLOB_OPTION,
+)
+
+# List pages are read as row tuples and turned into plain dicts without
+# building Clip objects; columns are in the order of the schema fields.
+_CLIP_ROW_TAIL = (
+    Clip.share_token, Clip.is_pinned, Clip.access_count, Clip.last_accessed,
+    Clip.created_at, Clip.updated_at, Clip.expires_at, Clip.owner_id
+)
+
+# Blob bodies are joined through an alias, search backends join ClipBlob themselves
+_ROW_BLOB = aliased(ClipBlob)
+
+# ClipResponse: inline content or the columns of its blob, decoded per row
+CLIP_CONTENT_COLUMNS = (
+    Clip.title, Clip.content, Clip.clip_type, Clip.access_level, Clip.is_markdown, Clip.id,
+    *_CLIP_ROW_TAIL,
+    _ROW_BLOB.content.label("blob_content"), _ROW_BLOB.content_codec.label("blob_codec"),
+    _ROW_BLOB.content_data.label("blob_data"), _ROW_BLOB.file_path.label("blob_file_path"),
+)
+
+# ClipSummary never reads content, password_hash or files
+CLIP_SUMMARY_COLUMNS = (
+    Clip.id, Clip.title, Clip.clip_type, Clip.access_level, Clip.is_markdown,
+    *_CLIP_ROW_TAIL,
+    Clip.preview, Clip.content_size,
+    select(func.count(File.id)).where(File.clip_id == Clip.id).scalar_subquery().label("file_count"),
+)
+
+# FileInfo columns of the files attached to a page of clips
+FILE_INFO_COLUMNS = (
+    File.id, File.filename, File.original_filename, File.file_size, File.mime_type, File.created_at
+)
+FILE_INFO_KEYS = tuple(column.key for column in FILE_INFO_COLUMNS)
+
+
+class ChangeLogExpired(Exception):
+    """A sync position older than the retained change log (or from another database)"""
 
 
 class ClipService:
@@ -60,7 +127,6 @@ class ClipService:
 
         # Associate files if provided
         if clip_create.file_ids:
-            from app.models.file import File
             for file_id in clip_create.file_ids:
                 # Verify file belongs to user and update its clip_id
                 file_obj = db.query(File).filter(
@@ -73,34 +139,116 @@ class ClipService:
             db.commit()
             db.refresh(db_clip)
 
+        lru_index.touch(user.id, db_clip.id, is_pinned=False, expires_at=db_clip.expires_at)
+        expiry_queue.schedule(db_clip.id, db_clip.expires_at)
+        lru_service.mark_dirty(user.id)
+        share_cache.invalidate(tokens=[share_token])
+        clip_events.publish(user.id, CREATED, [db_clip.id])
+
         return db_clip
     
-    def get_clip_by_id(self, db: Session, clip_id: int, user: User) -> Optional[Clip]:
-        """Get clip by ID (only owner can access)"""
-        clip = db.query(Clip).filter(
+    def get_clip_by_id(
+        self, db: Session, clip_id: int, user: User, with_content: bool = True, track: bool = True
+    ) -> Optional[Clip]:
+        """Get clip by ID (only owner can access); with_content=False defers the body.
+
+        With track=False the read isn't counted; call track_access once the clip is served.
+        """
+        if with_content:
+            query = db.query(Clip).options(*CLIP_RESPONSE_OPTIONS)
+        else:
+            query = db.query(Clip).options(selectinload(Clip.files), defer(Clip.content))
+        clip = query.filter(
             and_(Clip.id == clip_id, Clip.owner_id == user.id)
         ).first()
         
-        if clip:
-            clip.update_access()
-            db.commit()
+        if clip and track:
+            self.track_access(db, clip)
         
         return clip
+
+    def track_access(self, db: Session, clip: Clip):
+        """Count a read of a loaded clip"""
+        access_buffer.track_clip_access(db, clip)
+        lru_index.touch(clip.owner_id, clip.id)
     
-    def get_clip_by_share_token(self, db: Session, share_token: str) -> Optional[Clip]:
-        """Get clip by share token (public access)"""
-        clip = db.query(Clip).filter(Clip.share_token == share_token).first()
+    def get_clip_by_share_token(self, db: Session, share_token: str, track: bool = True) -> Optional[Clip]:
+        """Get clip by share token (public access); track=False leaves the read uncounted"""
+        clip = db.query(Clip).options(*CLIP_RESPONSE_OPTIONS).filter(
+            Clip.share_token == share_token
+        ).first()
         
         if clip:
             # Check if expired
-            if clip.expires_at and clip.expires_at < datetime.now(timezone.utc):
+            if clip.expires_at and as_utc(clip.expires_at) < datetime.now(timezone.utc):
                 return None
             
-            clip.update_access()
-            db.commit()
+            if track:
+                self.track_access(db, clip)
         
         return clip
+
+    def _load_shared_clip(self, db: Session, share_token: str) -> Optional[SharedClip]:
+        clip = self.get_clip_by_share_token(db, share_token, track=False)
+        return SharedClip.from_clip(clip) if clip else None
+
+    def track_shared_access(self, db: Session, shared: SharedClip):
+        """Count a read of a shared clip snapshot"""
+        access_buffer.track_clip_access_by_id(db, shared.clip_id)
+        lru_index.touch(shared.owner_id, shared.clip_id)
+
+    def get_shared_clip(self, db: Session, share_token: str) -> Optional[SharedClip]:
+        """Get a snapshot of a shared clip, served from the share cache when enabled.
+
+        Concurrent lookups of the same token share one database fetch. The
+        read isn't counted; call track_shared_access once the clip is served.
+        """
+        if share_cache.enabled:
+            hit, shared = share_cache.get(share_token)
+            if hit:
+                if shared is None:
+                    return None
+                if shared.is_expired(datetime.now(timezone.utc)):
+                    share_cache.invalidate(clip_ids=[shared.clip_id])
+                    return None
+                return shared
+
+        generation = share_cache.generation
+        shared, loaded = lookups.do(
+            ("shared_clip", share_token), lambda: self._load_shared_clip(db, share_token)
+        )
+        if loaded and share_cache.enabled:
+            if shared is None:
+                share_cache.put_missing(share_token, generation)
+            else:
+                share_cache.put(share_token, shared, generation)
+        return shared
     
+    # Sort key for cursor pagination, most recently used first
+    CURSOR_COLUMNS = (Clip.last_accessed, Clip.id)
+
+    def _user_clips_query(self, db: Session, user: User, clip_type: Optional[ClipType] = None):
+        """Base query for the clips a user can list"""
+        query = db.query(Clip)
+        if user.is_anonymous:
+            query = query.filter(Clip.access_level == AccessLevel.PUBLIC)
+        else:
+            query = query.filter(Clip.owner_id == user.id)
+
+        # Filter by type
+        if clip_type:
+            query = query.filter(Clip.clip_type == clip_type)
+
+        return query
+
+    def _as_rows(self, query, summary: bool = False):
+        """Select list row columns instead of Clip objects, previews only if summary"""
+        if summary:
+            return query.with_entities(*CLIP_SUMMARY_COLUMNS)
+        return query.with_entities(*CLIP_CONTENT_COLUMNS).outerjoin(
+            _ROW_BLOB, _ROW_BLOB.hash == Clip.content_hash
+        )
+
     def get_user_clips(
         self, 
         db: Session, 
@@ -108,36 +256,140 @@ class ClipService:
         skip: int = 0, 
         limit: int = 20,
         clip_type: Optional[ClipType] = None,
-        search: Optional[str] = None
-    ) -> Tuple[List[Clip], int]:
-        """Get user's clips with pagination and filtering"""
-        if user.is_anonymous:
-            query = db.query(Clip).filter(Clip.access_level == AccessLevel.PUBLIC)
-        else:
-            query = db.query(Clip).filter(Clip.owner_id == user.id)
+        search: Optional[str] = None,
+        include_total: bool = True,
+        summary: bool = False
+    ) -> Tuple[List[Row], Optional[int]]:
+        """Get rows of user's clips with pagination and filtering; total is None unless include_total.
 
-        # Filter by type
-        if clip_type:
-            query = query.filter(Clip.clip_type == clip_type)
+        Turn the rows into ClipResponse (or ClipSummary) dicts with list_items.
+        """
+        query = self._user_clips_query(db, user, clip_type)
         
-        # Search in title and content
+        # Search in title and content, best matches first
+        rank = []
         if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                or_(
-                    Clip.title.ilike(search_term),
-                    Clip.content.ilike(search_term)
-                )
-            )
+            query, rank = get_search_backend(db, search).apply(query, search)
         
         # Get total count
-        total = query.count()
+        total = query.count() if include_total else None
         
         # Apply pagination and ordering
-        clips = query.order_by(desc(Clip.last_accessed)).offset(skip).limit(limit).all()
+        rows = self._as_rows(query, summary).order_by(
+            *rank, desc(Clip.last_accessed), desc(Clip.id)
+        ).offset(skip).limit(limit).all()
         
-        return clips, total
+        return rows, total
+
+    def get_user_clips_after(
+        self,
+        db: Session,
+        user: User,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+        clip_type: Optional[ClipType] = None,
+        search: Optional[str] = None,
+        summary: bool = False
+    ) -> Tuple[List[Row], Optional[str]]:
+        """Get rows of a page of user's clips after a cursor, most recently used first.
+
+        Search results are filtered but kept in recency order, since a rank
+        can't be resumed from a cursor. Raises ValueError for a bad cursor.
+        """
+        query = self._user_clips_query(db, user, clip_type)
+        if search:
+            query, _ = get_search_backend(db, search).apply(query, search)
+
+        return keyset_paginate(self._as_rows(query, summary), self.CURSOR_COLUMNS, cursor, limit)
+
+    def list_items(self, db: Session, rows: List[Row], summary: bool = False) -> List[dict]:
+        """ClipResponse (or ClipSummary) dicts of list rows, with blob bodies decoded.
+
+        Files of a page of full clips are read in one query.
+        """
+        if summary:
+            return [row._asdict() for row in rows]
+
+        files = {row.id: [] for row in rows}
+        if files:
+            for file_row in db.query(*FILE_INFO_COLUMNS, File.clip_id).filter(
+                File.clip_id.in_(files)
+            ).order_by(File.id):
+                *info, clip_id = file_row
+                files[clip_id].append(dict(zip(FILE_INFO_KEYS, info)))
+
+        items = []
+        for row in rows:
+            item = row._asdict()
+            blob = (item.pop("blob_content"), item.pop("blob_codec"), item.pop("blob_data"), item.pop("blob_file_path"))
+            if item["content"] is None:
+                item["content"] = blob_text(*blob)
+            item["files"] = files[row.id]
+            items.append(item)
+        return items
     
+    def change_settle_cutoff(self, db: Session) -> Optional[datetime]:
+        """Changes logged after this may still be joined by lower seqs, or None.
+
+        On PostgreSQL and MySQL a transaction can commit a lower seq after a
+        higher one is already visible. SQLite serializes writers, so seqs
+        become visible in order there.
+        """
+        if db.get_bind().dialect.name == "sqlite" or not settings.clip_change_settle_seconds:
+            return None
+        return datetime.now(timezone.utc) - timedelta(seconds=settings.clip_change_settle_seconds)
+
+    def get_changes(
+        self, db: Session, user: User, since: Optional[int], limit: int = 100
+    ) -> Tuple[List[Tuple[ClipChange, Optional[Clip]]], int, bool]:
+        """Latest change per clip after `since`, oldest first, with the current clips.
+
+        Returns (changes, next_since, has_more); tombstones come with None
+        instead of a clip. Without `since` only the current position is
+        returned, to start syncing from after a full load. Raises
+        ChangeLogExpired if changes after `since` may have been pruned.
+
+        Changes newer than `change_settle_cutoff` are held back, and
+        next_since never passes them, so a lower seq committing late is
+        still delivered.
+        """
+        cutoff = self.change_settle_cutoff(db)
+        settled = [] if cutoff is None else [ClipChange.created_at <= cutoff]
+        settled_seq = ClipChange.seq if cutoff is None else case((settled[0], ClipChange.seq))
+        head, settled_head, oldest = db.query(
+            func.max(ClipChange.seq), func.max(settled_seq), func.min(settled_seq)
+        ).one()
+        if since is None:
+            return [], settled_head or 0, False
+
+        # Gaps left by transactions still in flight are not pruned history
+        if since > (head or 0) or (oldest is not None and since < oldest - 1):
+            raise ChangeLogExpired()
+
+        latest = db.query(
+            func.max(ClipChange.seq).label("seq")
+        ).filter(
+            ClipChange.user_id == user.id, ClipChange.seq > since, *settled
+        ).group_by(ClipChange.clip_id).subquery()
+        changes = db.query(ClipChange).join(latest, ClipChange.seq == latest.c.seq).order_by(
+            ClipChange.seq
+        ).limit(limit + 1).all()
+
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        live_ids = [change.clip_id for change in changes if change.change not in TOMBSTONES]
+        clips = {}
+        if live_ids:
+            clips = {clip.id: clip for clip in db.query(Clip).options(*CLIP_LIST_OPTIONS).filter(
+                Clip.id.in_(live_ids), Clip.owner_id == user.id
+            )}
+
+        if has_more:
+            next_since = changes[-1].seq
+        else:
+            next_since = max(settled_head or 0, since, changes[-1].seq if changes else 0)
+        return [(change, clips.get(change.clip_id)) for change in changes], next_since, has_more
+
     def update_clip(self, db: Session, clip_id: int, clip_update: ClipUpdate, user: User) -> Optional[Clip]:
         """Update a clip"""
         clip = self.get_clip_by_id(db, clip_id, user)
@@ -162,22 +414,36 @@ class ClipService:
                 update_data["share_token"] = self.generate_share_token()
         
         # Apply updates
+        previous_token = clip.share_token
         for field, value in update_data.items():
             setattr(clip, field, value)
         
         db.commit()
         db.refresh(clip)
+
+        lru_index.touch(clip.owner_id, clip.id, is_pinned=bool(clip.is_pinned), expires_at=clip.expires_at)
+        share_cache.invalidate(clip_ids=[clip.id], tokens=[previous_token, clip.share_token])
+        clip_events.publish(clip.owner_id, UPDATED, [clip.id])
+        if "content" in update_data:
+            lru_service.mark_dirty(user.id)
+        if "expires_at" in update_data:
+            expiry_queue.schedule(clip.id, clip.expires_at)
         
         return clip
     
     def delete_clip(self, db: Session, clip_id: int, user: User) -> bool:
         """Delete a clip"""
-        clip = self.get_clip_by_id(db, clip_id, user)
+        clip = self.get_clip_by_id(db, clip_id, user, with_content=False)
         if not clip:
             return False
         
         db.delete(clip)
         db.commit()
+
+        lru_index.discard(user.id, [clip_id])
+        expiry_queue.cancel([clip_id])
+        share_cache.invalidate(clip_ids=[clip_id])
+        clip_events.publish(user.id, DELETED, [clip_id])
         
         return True
     
@@ -190,6 +456,10 @@ class ClipService:
         clip.is_pinned = is_pinned
         db.commit()
         db.refresh(clip)
+
+        lru_index.touch(clip.owner_id, clip.id, is_pinned=is_pinned)
+        share_cache.invalidate(clip_ids=[clip.id])
+        clip_events.publish(clip.owner_id, PINNED if is_pinned else UNPINNED, [clip.id])
         
         return clip
 
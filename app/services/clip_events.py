@@ -0,0 +1,131 @@
+"""
+In-process pub/sub of clip changes for live sync streams
+"""
+
+import asyncio
+import threading
+from typing import Dict, Iterable, Optional, Set
+
+from app.config import settings
+
+# Event types sent to streams
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+PINNED = "pinned"
+UNPINNED = "unpinned"
+EVICTED = "evicted"
+# Sent instead of events a slow client missed: it should reload its clips
+RESYNC = "resync"
+
+
+class Subscription:
+    """Queue of events for one open stream, consumed on its event loop"""
+
+    _CLOSE = object()
+
+    def __init__(self, user_id: int, loop: asyncio.AbstractEventLoop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.clip_stream_queue_size)
+
+    def _offer(self, event):
+        """Runs on the subscriber's loop"""
+        if self.queue.full():
+            # Too far behind: drop what's pending, the client reloads instead
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            if event is not self._CLOSE:
+                event = {"type": RESYNC, "clip_ids": []}
+        self.queue.put_nowait(event)
+
+    def deliver(self, event) -> bool:
+        """Hand an event to the subscriber's loop from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(self._offer, event)
+            return True
+        except RuntimeError:  # Loop already closed
+            return False
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        """Next event, {"type": "ping"} after `timeout` seconds without one, None once closed"""
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return {"type": "ping"}
+        return None if event is self._CLOSE else event
+
+
+class ClipEventHub:
+    """Fans clip change events out to the open streams of their owner.
+
+    Services publish after committing, from request threads or the cleanup
+    scheduler; streams consume on the event loop. Only streams connected to
+    this process are reached, so with several workers clients should still
+    reload on (re)connect.
+    """
+
+    def __init__(self):
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.published = 0
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """Open a subscription; call from the coroutine that will consume it"""
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def _deliver(self, subscriptions: Iterable[Subscription], event):
+        for subscription in subscriptions:
+            if not subscription.deliver(event):
+                self.unsubscribe(subscription)
+
+    def publish(self, user_id: int, event_type: str, clip_ids: Iterable[int]):
+        """Notify a user's streams that clips changed; no-op if none are open"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        if not subscriptions:
+            return
+        self.published += 1
+        self._deliver(subscriptions, {"type": event_type, "clip_ids": list(clip_ids)})
+
+    def disconnect(self, user_id: Optional[int] = None):
+        """End a user's streams, or every stream"""
+        with self._lock:
+            if user_id is None:
+                subscriptions = [s for group in self._subscriptions.values() for s in group]
+            else:
+                subscriptions = list(self._subscriptions.get(user_id, ()))
+        self._deliver(subscriptions, Subscription._CLOSE)
+
+    def subscriber_count(self, user_id: Optional[int] = None) -> int:
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscriptions.get(user_id, ()))
+            return sum(len(group) for group in self._subscriptions.values())
+
+    def get_stats(self) -> dict:
+        """Get hub statistics"""
+        with self._lock:
+            users = len(self._subscriptions)
+        return {
+            "users": users,
+            "streams": self.subscriber_count(),
+            "published": self.published
+        }
+
+
+# Global instance
+clip_events = ClipEventHub()
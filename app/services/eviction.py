@@ -0,0 +1,180 @@
+"""
+Eviction policies deciding which clips LRU cleanup removes first
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, case, func, select
+from sqlalchemy.orm import Session
+
+from app.models.clip import Clip
+from app.models.file import File
+from app.models.user import User
+from app.config import settings
+from app.utils.sql import octet_length
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 86400.0
+
+
+def clip_size_expression():
+    """SQL expression for the bytes a clip occupies: content plus attached files"""
+    file_bytes = select(func.coalesce(func.sum(File.file_size), 0)).where(
+        File.clip_id == Clip.id
+    ).scalar_subquery()
+    content_bytes = func.coalesce(Clip.content_size, octet_length(Clip.content), 0)
+    return content_bytes + file_bytes
+
+
+def epoch_days_expression(db: Session, column):
+    """SQL expression converting a datetime column to (fractional) days since an epoch"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return func.julianday(column)
+    if dialect == "postgresql":
+        return func.extract("epoch", column) / 86400.0
+    if dialect in ("mysql", "mariadb"):
+        return func.unix_timestamp(column) / 86400.0
+    raise NotImplementedError(f"Unsupported database dialect: {dialect}")
+
+
+def greatest_expression(db: Session, *values):
+    """SQL GREATEST(), spelled MAX() on SQLite"""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.max(*values)
+    return func.greatest(*values)
+
+
+class EvictionPolicy:
+    """Base eviction policy: orders a user's unpinned clips, victims first"""
+
+    name = ""
+
+    def order_by(self, db: Session) -> list:
+        """SQL ORDER BY expressions, first row is evicted first"""
+        raise NotImplementedError
+
+    def priority(self, clip_id: int, last_accessed: float, access_count: int, size: int) -> tuple:
+        """Python equivalent of order_by for offline replay; last_accessed is epoch seconds"""
+        raise NotImplementedError
+
+    def select_victims(
+        self, db: Session, user: User, count: int, now: datetime, bytes_to_free: int = 0
+    ) -> List[Tuple[int, datetime]]:
+        """Get (id, created_at) of unpinned, non-expired clips to evict.
+
+        Takes up to `count` clips, or more when needed until the clips taken
+        add up to `bytes_to_free` bytes (content plus attached files).
+        """
+        query = db.query(Clip.id, Clip.created_at).filter(
+            and_(
+                Clip.owner_id == user.id,
+                Clip.is_pinned == False,
+                or_(Clip.expires_at.is_(None), Clip.expires_at > now)
+            )
+        ).order_by(*self.order_by(db))
+
+        if bytes_to_free <= 0:
+            return query.limit(count).all()
+
+        victims = []
+        freed = 0
+        for clip_id, created_at, size in query.add_columns(clip_size_expression()).yield_per(500):
+            if len(victims) >= count and freed >= bytes_to_free:
+                break
+            victims.append((clip_id, created_at))
+            freed += size or 0
+        return victims
+
+
+class LRUPolicy(EvictionPolicy):
+    """Least recently used first"""
+
+    name = "lru"
+
+    def order_by(self, db: Session) -> list:
+        return [Clip.last_accessed, Clip.id]
+
+    def priority(self, clip_id: int, last_accessed: float, access_count: int, size: int) -> tuple:
+        return (last_accessed, clip_id)
+
+
+class LFUPolicy(EvictionPolicy):
+    """Least frequently used first, ties broken by recency"""
+
+    name = "lfu"
+
+    def order_by(self, db: Session) -> list:
+        return [Clip.access_count, Clip.last_accessed, Clip.id]
+
+    def priority(self, clip_id: int, last_accessed: float, access_count: int, size: int) -> tuple:
+        return (access_count, last_accessed, clip_id)
+
+
+class TwoQueuePolicy(EvictionPolicy):
+    """Scan-resistant 2Q variant.
+
+    Clips read fewer than `lru_2q_promote_after` times sit in a probationary
+    queue and are evicted (in LRU order) before any clip of the protected
+    queue, so read-once pastes can't flush out frequently reused snippets.
+    """
+
+    name = "2q"
+
+    def order_by(self, db: Session) -> list:
+        probationary = case(
+            (Clip.access_count < settings.lru_2q_promote_after, 0),
+            else_=1
+        )
+        return [probationary, Clip.last_accessed, Clip.id]
+
+    def priority(self, clip_id: int, last_accessed: float, access_count: int, size: int) -> tuple:
+        probationary = 0 if access_count < settings.lru_2q_promote_after else 1
+        return (probationary, last_accessed, clip_id)
+
+
+class GDSFPolicy(EvictionPolicy):
+    """Size-aware GreedyDual-Size-Frequency.
+
+    Priority is `L + frequency / size`; the lowest priority is evicted first.
+    Instead of tracking the inflation value L per user, L advances with wall
+    time: one day since last access is worth one read of a 1 KB clip
+    (scaled by `lru_gdsf_aging_days`), so stale clips eventually age out.
+    """
+
+    name = "gdsf"
+
+    def order_by(self, db: Session) -> list:
+        size_kb = greatest_expression(db, clip_size_expression() / 1024.0, 1.0)
+        clock = epoch_days_expression(db, Clip.last_accessed) / settings.lru_gdsf_aging_days
+        priority = clock + (func.coalesce(Clip.access_count, 0) + 1) / size_kb
+        return [priority, Clip.last_accessed, Clip.id]
+
+    def priority(self, clip_id: int, last_accessed: float, access_count: int, size: int) -> tuple:
+        size_kb = max(size / 1024.0, 1.0)
+        clock = last_accessed / DAY_SECONDS / settings.lru_gdsf_aging_days
+        return (clock + (access_count + 1) / size_kb, last_accessed, clip_id)
+
+
+POLICIES: Dict[str, EvictionPolicy] = {
+    policy.name: policy
+    for policy in (LRUPolicy(), LFUPolicy(), TwoQueuePolicy(), GDSFPolicy())
+}
+
+
+def get_policy(name: Optional[str]) -> EvictionPolicy:
+    """Get a policy by name, falling back to LRU for unknown names"""
+    policy = POLICIES.get((name or "").lower())
+    if policy is None:
+        if name:
+            logger.warning(f"Unknown eviction policy '{name}', using LRU")
+        policy = POLICIES[LRUPolicy.name]
+    return policy
+
+
+def get_user_policy(user: User) -> EvictionPolicy:
+    """Get the policy for a user: their own choice, else the global setting"""
+    return get_policy(user.eviction_policy or settings.lru_eviction_policy)
@@ -0,0 +1,103 @@
+"""
+In-process expiry queue for clips with an expires_at deadline
+"""
+
+import heapq
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+
+from app.models.clip import Clip
+from app.config import settings
+from app.utils.dates import as_utc
+
+
+class ExpiryQueue:
+    """Min-heap of clip deadlines, seeded from the expires_at index.
+
+    Only deadlines up to `expiry_horizon` seconds ahead are kept in memory;
+    the window is extended with an index range scan once the engine catches
+    up with it. Rescheduled and deleted clips are cancelled lazily. Entries
+    are advisory: callers re-check expires_at before deleting.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int]] = []
+        self._deadlines: Dict[int, float] = {}  # Current deadline per queued clip
+        self._loaded_until: Optional[float] = None  # Deadlines up to here are queued
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._deadlines)
+
+    def _push(self, clip_id: int, deadline: float):
+        self._deadlines[clip_id] = deadline
+        heapq.heappush(self._heap, (deadline, clip_id))
+
+    def schedule(self, clip_id: int, expires_at: Optional[datetime]):
+        """Queue, move or (with expires_at=None) cancel a clip's deadline"""
+        with self._lock:
+            self._deadlines.pop(clip_id, None)
+            if expires_at is None or self._loaded_until is None:
+                return
+            deadline = as_utc(expires_at).timestamp()
+            # Deadlines past the window are picked up by a later seed
+            if deadline <= self._loaded_until:
+                self._push(clip_id, deadline)
+
+    def cancel(self, clip_ids: List[int]):
+        """Forget deleted clips"""
+        with self._lock:
+            for clip_id in clip_ids:
+                self._deadlines.pop(clip_id, None)
+
+    def needs_seed(self, now: datetime) -> bool:
+        """Whether the loaded window ends before `now`"""
+        with self._lock:
+            return self._loaded_until is None or now.timestamp() >= self._loaded_until
+
+    def seed(self, db: Session, now: datetime):
+        """Load deadlines from the end of the current window up to the horizon"""
+        until = now + timedelta(seconds=settings.expiry_horizon)
+        with self._lock:
+            loaded_until = self._loaded_until
+
+        query = db.query(Clip.id, Clip.expires_at).filter(
+            and_(Clip.expires_at.isnot(None), Clip.expires_at <= until)
+        )
+        if loaded_until is not None:
+            query = query.filter(Clip.expires_at > datetime.fromtimestamp(loaded_until, timezone.utc))
+
+        rows = query.all()
+        with self._lock:
+            for clip_id, expires_at in rows:
+                self._push(clip_id, as_utc(expires_at).timestamp())
+            self._loaded_until = until.timestamp()
+
+    def pop_due(self, now: datetime, limit: int) -> List[int]:
+        """Remove and return up to `limit` clip ids whose deadline has passed"""
+        now_ts = now.timestamp()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now_ts and len(due) < limit:
+                deadline, clip_id = heapq.heappop(self._heap)
+                # Skip entries superseded by a reschedule or cancellation
+                if self._deadlines.get(clip_id) == deadline:
+                    del self._deadlines[clip_id]
+                    due.append(clip_id)
+        return due
+
+    def clear(self):
+        """Drop every queued deadline; the next run re-seeds from the database"""
+        with self._lock:
+            self._heap = []
+            self._deadlines = {}
+            self._loaded_until = None
+
+
+# Global instance
+expiry_queue = ExpiryQueue()
@@ -8,16 +8,31 @@ import uuid
 import time
 from typing import Optional, List, Tuple
 from pathlib import Path
+from sqlalchemy import Row
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from fastapi import UploadFile, HTTPException, status
 
 from app.models.file import File
 from app.models.user import User
-from app.models.clip import Clip
+from app.models.clip import Clip, AccessLevel
+from app.services.lru import lru_service
+from app.services.access_buffer import access_buffer
+from app.services.share_cache import share_cache
+from app.services.clip_events import UPDATED, clip_events
+from app.utils.pagination import keyset_paginate
+from app.utils.singleflight import lookups
 from app.config import settings
 
 
+# FileResponse columns, in field order; lists read them as row tuples
+FILE_ROW_COLUMNS = (
+    File.id, File.filename, File.original_filename, File.file_size, File.mime_type, File.file_hash,
+    File.is_image, File.is_video, File.is_audio, File.width, File.height, File.duration,
+    File.download_count, File.last_downloaded, File.created_at, File.owner_id, File.clip_id
+)
+
+
 class FileService:
     """Service for managing file uploads and downloads with concurrent safety"""
     
@@ -166,6 +181,10 @@ class FileService:
             db.add(db_file)
             db.commit()
             db.refresh(db_file)
+            lru_service.mark_dirty(user.id)
+            if clip:
+                share_cache.invalidate(clip_ids=[clip.id])
+                clip_events.publish(clip.owner_id, UPDATED, [clip.id])
             
             return db_file
             
@@ -271,6 +290,10 @@ class FileService:
             db.add(db_file)
             db.commit()
             db.refresh(db_file)
+            lru_service.mark_dirty(user.id)
+            if clip:
+                share_cache.invalidate(clip_ids=[clip.id])
+                clip_events.publish(clip.owner_id, UPDATED, [clip.id])
             
             return db_file
             
@@ -291,44 +314,47 @@ class FileService:
         ).first()
 
         if file_obj:
-            file_obj.update_download()
-            db.commit()
+            access_buffer.track_file_download(db, file_obj)
+
+        return file_obj
 
+    def _load_shared_file(self, db: Session, file_id: int) -> Optional[File]:
+        """A file attached to a public or encrypted clip, detached so concurrent callers can share it"""
+        file_obj = db.query(File).join(Clip, File.clip_id == Clip.id).filter(
+            File.id == file_id,
+            Clip.access_level.in_([AccessLevel.PUBLIC, AccessLevel.ENCRYPTED])
+        ).first()
+        if file_obj is not None:
+            db.expunge(file_obj)
         return file_obj
 
-    def get_file_for_download(self, db: Session, file_id: int, user: User = None) -> Optional[File]:
-        """Get file for download - allows access to file in shared clips"""
-        from app.models.clip import Clip, AccessLevel
+    def get_file_for_download(
+        self, db: Session, file_id: int, user: User = None, track: bool = True
+    ) -> Optional[File]:
+        """Get file for download - allows access to file in shared clips.
 
+        Concurrent downloads of the same shared file share one database fetch.
+        With track=False the download isn't counted; call track_download once
+        the file is sent.
+        """
         # First try to get file as owner
+        file_obj = None
         if user and not user.is_anonymous:
             file_obj = db.query(File).filter(
                 File.id == file_id,
                 File.owner_id == user.id
             ).first()
 
-            if file_obj:
-                file_obj.update_download()
-                db.commit()
-                return file_obj
-
-        # If not owner or anonymous, check if file is in a shared clip
-        file_obj = db.query(File).filter(File.id == file_id).first()
-        if not file_obj or not file_obj.clip_id:
-            return None
-
-        # Check if the clip is publicly accessible
-        clip = db.query(Clip).filter(Clip.id == file_obj.clip_id).first()
-        if not clip or clip.access_level == AccessLevel.PRIVATE:
-            return None
-
-        # For public and encrypted clips, allow download
-        if clip.access_level in [AccessLevel.PUBLIC, AccessLevel.ENCRYPTED]:
-            file_obj.update_download()
-            db.commit()
-            return file_obj
+        # If not owner or anonymous, check if file is in a public or encrypted clip
+        if file_obj is None:
+            file_obj, _ = lookups.do(("shared_file", file_id), lambda: self._load_shared_file(db, file_id))
+        if file_obj is not None and track:
+            self.track_download(db, file_obj)
+        return file_obj
 
-        return None
+    def track_download(self, db: Session, file_obj: File):
+        """Count a download of a file, which may be detached from the session"""
+        access_buffer.track_file_download_by_id(db, file_obj.id)
     
     def get_file_path(self, file_obj: File) -> Path:
         """Get file path on disk"""
@@ -353,6 +379,9 @@ class FileService:
         # Delete database record
         db.delete(file_obj)
         db.commit()
+        if file_obj.clip_id:
+            share_cache.invalidate(clip_ids=[file_obj.clip_id])
+            clip_events.publish(user.id, UPDATED, [file_obj.clip_id])
         
         # Delete physical file only if no other references exist
         if other_files == 0:
@@ -362,20 +391,35 @@ class FileService:
         
         return True
     
+    # Sort key for cursor pagination, newest first
+    CURSOR_COLUMNS = (File.created_at, File.id)
+
     def get_user_files(
         self, 
         db: Session, 
         user: User, 
         skip: int = 0, 
-        limit: int = 20
-    ) -> Tuple[List[File], int]:
-        """Get user's files with pagination"""
-        query = db.query(File).filter(File.owner_id == user.id)
+        limit: int = 20,
+        include_total: bool = True
+    ) -> Tuple[List[Row], Optional[int]]:
+        """Get rows of user's files with pagination; total is None unless include_total"""
+        query = db.query(*FILE_ROW_COLUMNS).filter(File.owner_id == user.id)
         
-        total = query.count()
-        files = query.order_by(File.created_at.desc()).offset(skip).limit(limit).all()
+        total = query.count() if include_total else None
+        rows = query.order_by(File.created_at.desc(), File.id.desc()).offset(skip).limit(limit).all()
         
-        return files, total
+        return rows, total
+
+    def get_user_files_after(
+        self,
+        db: Session,
+        user: User,
+        cursor: Optional[str] = None,
+        limit: int = 20
+    ) -> Tuple[List[Row], Optional[str]]:
+        """Get rows of a page of user's files after a cursor, newest first; raises ValueError for a bad cursor"""
+        query = db.query(*FILE_ROW_COLUMNS).filter(File.owner_id == user.id)
+        return keyset_paginate(query, self.CURSOR_COLUMNS, cursor, limit)
 
 
 # Global instance
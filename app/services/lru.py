@@ -2,14 +2,42 @@
 LRU service for managing automatic cleanup of clips
 """
 
+import threading
+import time
 from datetime import datetime, timedelta, timezone
-from typing import List
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Set, Tuple
+from sqlalchemy.orm import Query, Session
+from sqlalchemy import and_, or_, func, select, update
 
-from app.models.clip import Clip
+from app.models.blob import ClipBlob, delete_unused_blobs, release_blobs, remove_spill_files
+from app.models.change import ChangeType, ClipChange, record_changes
+from app.models.checkpoint import JobCheckpoint
+from app.models.clip import Clip, PREVIEW_LENGTH
+from app.models.events import call_after_commit
+from app.models.file import File
 from app.models.user import User
+from app.services.eviction import LRUPolicy, get_user_policy
+from app.services.expiry import expiry_queue
+from app.services.lru_index import lru_index
+from app.services.share_cache import share_cache
+from app.services.clip_events import EVICTED, clip_events
 from app.config import settings
+from app.utils.sql import octet_length
+
+
+def _unlink_files(file_paths: List[str]):
+    """Remove physical files, skipping those already gone"""
+    for file_path in file_paths:
+        path = Path(file_path)
+        if path.exists():
+            path.unlink()
+
+
+def _chunks(items: List, size: int = 500) -> Iterator[List]:
+    """Split a list into chunks that fit comfortably in an IN (...) clause"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
 
 
 class LRUService:
@@ -17,9 +45,81 @@ class LRUService:
     
     def __init__(self):
         self.max_items_per_user = settings.lru_max_items_per_user
+        self._dirty_users: Set[int] = set()
+        self._dirty_lock = threading.Lock()
     
-    def get_clips_for_cleanup(self, db: Session, user: User) -> List[Clip]:
-        """Get clips that should be cleaned up based on LRU policy"""
+    def _get_cleanup_candidates_indexed(self, db: Session, user: User) -> Optional[List[Tuple[int, datetime]]]:
+        """Get cleanup candidates from the in-process LRU index.
+
+        Recency is only tracked per process, so candidates are checked
+        against the database: they must still be evictable, and no other
+        evictable clip may have an older `last_accessed` (e.g. because
+        another worker read a candidate). Returns None when the index
+        disagrees with the database, in which case the caller falls back
+        to the database scan.
+        """
+        clips_to_delete = lru_index.excess(db, user.id, user.max_clips)
+        if clips_to_delete <= 0:
+            return []
+
+        candidate_ids = lru_index.oldest(db, user.id, clips_to_delete)
+        if not candidate_ids:
+            return []
+
+        now = datetime.now(timezone.utc)
+        evictable = and_(
+            Clip.owner_id == user.id,
+            Clip.is_pinned == False,
+            or_(Clip.expires_at.is_(None), Clip.expires_at > now)
+        )
+        rows = db.query(Clip.id, Clip.created_at, Clip.last_accessed).filter(
+            evictable, Clip.id.in_(candidate_ids)
+        ).all()
+
+        stale = len(rows) != len(candidate_ids)
+        if not stale:
+            newest = max(last_accessed for _, _, last_accessed in rows)
+            stale = db.query(Clip.id).filter(
+                evictable, Clip.id.notin_(candidate_ids), Clip.last_accessed < newest
+            ).first() is not None
+        if stale:
+            # Index is stale (e.g. clips changed or read by another process)
+            lru_index.invalidate(user.id)
+            return None
+
+        created = {clip_id: created_at for clip_id, created_at, _ in rows}
+        return [(clip_id, created[clip_id]) for clip_id in candidate_ids]
+
+    def get_bytes_over_budget(self, user: User) -> int:
+        """Bytes to free to bring a user back to the low watermark of their quota.
+
+        Usage is clip content plus owned files, read from the denormalized
+        counters. Returns 0 unless byte-budget eviction is enabled and usage
+        is above the high watermark.
+        """
+        if not settings.lru_byte_budget_enabled or not user.storage_quota:
+            return 0
+
+        used = (user.content_used or 0) + (user.storage_used or 0)
+        if used <= user.storage_quota * settings.lru_quota_high_watermark:
+            return 0
+        return max(0, int(used - user.storage_quota * settings.lru_quota_low_watermark))
+
+    def get_cleanup_candidates(self, db: Session, user: User) -> List[Tuple[int, datetime]]:
+        """Get (id, created_at) of clips that should be cleaned up, in eviction order"""
+        policy = get_user_policy(user)
+        bytes_to_free = self.get_bytes_over_budget(user)
+
+        # The in-process index only knows about recency and clip counts
+        if lru_index.enabled and policy.name == LRUPolicy.name and not bytes_to_free:
+            candidates = self._get_cleanup_candidates_indexed(db, user)
+            if candidates is not None:
+                return candidates
+
+        # The counter includes expired clips, so it bounds the count below
+        if (user.clip_count or 0) <= user.max_clips and not bytes_to_free:
+            return []
+
         # Get total non-expired clips count for user (expired clips are handled separately)
         now = datetime.now(timezone.utc)
         total_clips = db.query(Clip).filter(
@@ -29,82 +129,237 @@ class LRUService:
             )
         ).count()
 
-        # If user is within limit, no cleanup needed
-        if total_clips <= user.max_clips:
+        # If user is within both limits, no cleanup needed
+        excess = max(0, total_clips - user.max_clips)
+        if excess == 0 and bytes_to_free == 0:
             return []
 
-        # Get all non-pinned, non-expired clips for user, ordered by last access (oldest first)
-        unpinned_clips = db.query(Clip).filter(
-            and_(
-                Clip.owner_id == user.id,
-                Clip.is_pinned == False,
-                or_(Clip.expires_at.is_(None), Clip.expires_at > now)
-            )
-        ).order_by(Clip.last_accessed).all()
+        # Let the user's eviction policy pick the non-pinned, non-expired victims
+        return policy.select_victims(db, user, excess, now, bytes_to_free)
 
-        # Calculate how many clips to delete
-        clips_to_delete = total_clips - user.max_clips
+    def get_clips_for_cleanup(self, db: Session, user: User) -> List[Clip]:
+        """Get clips that should be cleaned up based on the user's eviction policy"""
+        candidate_ids = [clip_id for clip_id, _ in self.get_cleanup_candidates(db, user)]
+        if not candidate_ids:
+            return []
 
-        # Return the oldest unpinned clips for deletion
-        return unpinned_clips[:clips_to_delete]
-    
-    def cleanup_user_clips(self, db: Session, user: User) -> int:
-        """Clean up excess clips for a user based on LRU policy"""
-        clips_to_delete = self.get_clips_for_cleanup(db, user)
-        
+        clips = db.query(Clip).filter(Clip.id.in_(candidate_ids)).all()
+        position = {clip_id: i for i, clip_id in enumerate(candidate_ids)}
+        return sorted(clips, key=lambda clip: position[clip.id])
+
+    @staticmethod
+    def _empty_deltas() -> dict:
+        return {"clip_count": 0, "pinned_count": 0, "content_used": 0, "storage_used": 0}
+
+    def evict_clips(self, db: Session, clip_ids: List[int], commit: bool = True) -> int:
+        """Delete clips and their files with set-based statements.
+
+        Physical files are removed once no other file record references
+        their hash. With commit=False the deletes join the caller's
+        transaction, and caches, events and files are updated when it
+        commits. Returns the number of clips deleted.
+        """
+        if not clip_ids:
+            return 0
+
+        owners = {}
+        counters = {}
+        blob_refs = {}
+        orphan_candidates = {}
         deleted_count = 0
-        for clip in clips_to_delete:
-            # Additional check: don't delete recently created clips (less than 1 hour old)
-            # Handle timezone-aware comparison
-            now_utc = datetime.now(timezone.utc)
-            clip_created_at = clip.created_at
-            if clip_created_at.tzinfo is None:
-                clip_created_at = clip_created_at.replace(tzinfo=timezone.utc)
+        for chunk in _chunks(clip_ids):
+            for clip_id, owner_id, is_pinned, content_size, blob_hash in db.query(
+                Clip.id, Clip.owner_id, Clip.is_pinned, Clip.content_size, Clip.content_hash
+            ).filter(Clip.id.in_(chunk)):
+                owners.setdefault(owner_id, []).append(clip_id)
+                if blob_hash:
+                    blob_refs[blob_hash] = blob_refs.get(blob_hash, 0) + 1
+                deltas = counters.setdefault(owner_id, self._empty_deltas())
+                deltas["clip_count"] -= 1
+                deltas["content_used"] -= content_size or 0
+                if is_pinned:
+                    deltas["pinned_count"] -= 1
 
-            if clip_created_at > now_utc - timedelta(hours=1):
-                continue
-            
-            db.delete(clip)
-            deleted_count += 1
-        
-        if deleted_count > 0:
+            for owner_id, file_hash, file_path, file_size in db.query(
+                File.owner_id, File.file_hash, File.file_path, File.file_size
+            ).filter(File.clip_id.in_(chunk)):
+                orphan_candidates[file_hash] = file_path
+                deltas = counters.setdefault(owner_id, self._empty_deltas())
+                deltas["storage_used"] -= file_size or 0
+
+            db.query(File).filter(File.clip_id.in_(chunk)).delete(synchronize_session=False)
+            deleted_count += db.query(Clip).filter(Clip.id.in_(chunk)).delete(synchronize_session=False)
+
+        # Bulk deletes bypass the ORM counter listeners
+        for owner_id, deltas in counters.items():
+            values = {
+                getattr(User, name): getattr(User, name) + delta
+                for name, delta in deltas.items()
+                if delta
+            }
+            if values:
+                db.execute(update(User).where(User.id == owner_id).values(values))
+        # Tombstones for delta sync clients
+        for owner_id, ids in owners.items():
+            record_changes(db.connection(), owner_id, ids, ChangeType.EVICTED)
+        unused_blob_files = release_blobs(db.connection(), blob_refs)
+
+        orphan_files = self._unreferenced_files(db, orphan_candidates)
+
+        def evicted():
+            for owner_id, ids in owners.items():
+                lru_index.discard(owner_id, ids)
+                expiry_queue.cancel(ids)
+                clip_events.publish(owner_id, EVICTED, ids)
+            share_cache.invalidate(clip_ids=clip_ids)
+
+            _unlink_files(orphan_files)
+            remove_spill_files(unused_blob_files)
+
+        call_after_commit(db, evicted)
+        if commit:
             db.commit()
-        
+
+        return deleted_count
+
+    def delete_user_files(self, db: Session, user_ids: List[int]) -> int:
+        """Delete all file records of users being deleted, attached to a clip or not.
+
+        Joins the caller's transaction; physical files no other record
+        references are removed when it commits. User counters are left
+        alone since the users go too. Returns the number of records deleted.
+        """
+        candidates = {
+            file_hash: file_path
+            for file_hash, file_path in db.query(File.file_hash, File.file_path).filter(File.owner_id.in_(user_ids))
+        }
+        deleted_count = db.query(File).filter(File.owner_id.in_(user_ids)).delete(synchronize_session=False)
+
+        orphan_files = self._unreferenced_files(db, candidates)
+        call_after_commit(db, lambda: _unlink_files(orphan_files))
         return deleted_count
+
+    def _unreferenced_files(self, db: Session, candidates: dict) -> List[str]:
+        """Paths of deleted files ({file_hash: file_path}) no other file record references"""
+        candidates = dict(candidates)
+        for chunk in _chunks(list(candidates)):
+            for (file_hash,) in db.query(File.file_hash).filter(File.file_hash.in_(chunk)).distinct():
+                candidates.pop(file_hash, None)
+        return list(candidates.values())
+
+    def purge_in_batches(
+        self,
+        db: Session,
+        job: str,
+        query: Query,
+        id_column,
+        purge: Callable[[List[int]], int],
+        deadline: Optional[float] = None
+    ) -> int:
+        """Purge the ids selected by `query` in keyset-paginated batches.
+
+        `purge` handles one batch of ids in its own transaction and returns
+        the number of rows deleted (or changed). Batches are separated by a
+        short sleep so other writers aren't locked out. The last id purged
+        is checkpointed per job in job_checkpoints: a run interrupted by an
+        error, `deadline` or a restart resumes from there, and a completed
+        pass starts over from the top.
+        """
+        checkpoint = db.get(JobCheckpoint, job)
+        last_id = checkpoint.last_id if checkpoint else 0
+        total_deleted = 0
+
+        while True:
+            if deadline is not None and time.monotonic() > deadline:
+                return total_deleted
+
+            ids = [row_id for (row_id,) in query.filter(id_column > last_id).order_by(
+                id_column
+            ).limit(settings.purge_batch_size)]
+            if not ids:
+                break
+
+            total_deleted += purge(ids)
+            last_id = ids[-1]
+            if checkpoint is None:
+                checkpoint = JobCheckpoint(job=job, last_id=last_id)
+                db.add(checkpoint)
+            checkpoint.last_id = last_id
+            db.commit()
+
+            if len(ids) < settings.purge_batch_size:
+                break
+            time.sleep(settings.purge_batch_sleep)
+
+        if checkpoint is not None:
+            db.delete(checkpoint)
+            db.commit()
+        return total_deleted
+
+    def cleanup_user_clips(self, db: Session, user: User) -> int:
+        """Clean up excess clips for a user based on LRU policy"""
+        # Don't delete recently created clips (less than 1 hour old)
+        recent_cutoff = datetime.now(timezone.utc) - timedelta(hours=1)
+
+        victim_ids = []
+        for clip_id, created_at in self.get_cleanup_candidates(db, user):
+            # Handle timezone-aware comparison
+            if created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=timezone.utc)
+            if created_at > recent_cutoff:
+                continue
+            victim_ids.append(clip_id)
+
+        return self.evict_clips(db, victim_ids)
     
-    def cleanup_expired_clips(self, db: Session) -> int:
+    def expire_due_clips(self, db: Session, deadline: Optional[float] = None) -> int:
+        """Delete clips whose expires_at has passed, in batches from the expiry queue.
+
+        Stops early once `deadline` (a time.monotonic() value) has passed;
+        clips left in the queue are picked up by the next run.
+        """
+        now = datetime.now(timezone.utc)
+        if expiry_queue.needs_seed(now):
+            expiry_queue.seed(db, now)
+
+        total_deleted = 0
+        while deadline is None or time.monotonic() <= deadline:
+            due_ids = expiry_queue.pop_due(now, settings.expiry_batch_size)
+            if not due_ids:
+                break
+            # Deadlines may have been moved by another worker
+            expired_ids = [clip_id for (clip_id,) in db.query(Clip.id).filter(
+                and_(
+                    Clip.id.in_(due_ids),
+                    Clip.expires_at.isnot(None),
+                    Clip.expires_at <= now
+                )
+            )]
+            total_deleted += self.evict_clips(db, expired_ids)
+
+        return total_deleted
+
+    def cleanup_expired_clips(self, db: Session, deadline: Optional[float] = None) -> int:
         """Clean up expired clips across all users"""
         now = datetime.now(timezone.utc)
-        expired_clips = db.query(Clip).filter(
+        query = db.query(Clip.id).filter(
             and_(
                 Clip.expires_at.isnot(None),
                 Clip.expires_at < now
             )
-        ).all()
-        
-        deleted_count = len(expired_clips)
-        for clip in expired_clips:
-            db.delete(clip)
-        
-        if deleted_count > 0:
-            db.commit()
-        
-        return deleted_count
+        )
+
+        return self.purge_in_batches(
+            db, "expired", query, Clip.id, lambda ids: self.evict_clips(db, ids), deadline
+        )
     
     def get_user_storage_stats(self, db: Session, user: User) -> dict:
-        """Get storage statistics for a user"""
-        # Count clips
-        total_clips = db.query(Clip).filter(Clip.owner_id == user.id).count()
-        pinned_clips = db.query(Clip).filter(
-            and_(Clip.owner_id == user.id, Clip.is_pinned == True)
-        ).count()
-        
-        # Calculate storage usage (sum of file sizes)
-        from app.models.file import File
-        from sqlalchemy import func
-        storage_used = db.query(func.sum(File.file_size)).filter(
-            File.owner_id == user.id
-        ).scalar() or 0
+        """Get storage statistics for a user from the denormalized counters"""
+        total_clips = user.clip_count or 0
+        pinned_clips = user.pinned_count or 0
+        content_used = user.content_used or 0
+        files_used = user.storage_used or 0
+        storage_used = content_used + files_used
         
         return {
             "total_clips": total_clips,
@@ -112,66 +367,229 @@ class LRUService:
             "unpinned_clips": total_clips - pinned_clips,
             "max_clips": user.max_clips,
             "clips_available": max(0, user.max_clips - total_clips),
+            "content_used": content_used,
+            "files_used": files_used,
             "storage_used": storage_used,
             "storage_quota": user.storage_quota,
             "storage_available": max(0, user.storage_quota - storage_used),
             "storage_usage_percent": (storage_used / user.storage_quota * 100) if user.storage_quota > 0 else 0
         }
+
+    def reconcile_user_counters(self, db: Session, deadline: Optional[float] = None) -> int:
+        """Repair drift in the denormalized user counters, returns users fixed.
+
+        Users are reconciled in id ranges of purge_batch_size, one
+        transaction each, then blob reference counts. Stops early once
+        `deadline` has passed; the next run resumes after the last range.
+        """
+        fixed = self.purge_in_batches(
+            db, "counters", db.query(User.id), User.id,
+            lambda ids: self._reconcile_user_range(db, ids[0], ids[-1]), deadline
+        )
+        if deadline is None or time.monotonic() <= deadline:
+            self._reconcile_blob_refs(db, deadline)
+        return fixed
+
+    def _reconcile_user_range(self, db: Session, first_id: int, last_id: int) -> int:
+        """Reconcile the counters of users with ids in [first_id, last_id] and commit"""
+        in_range = Clip.owner_id.between(first_id, last_id)
+        # Clips written outside the app; content_size counts bytes, not characters
+        db.query(Clip).filter(
+            and_(in_range, Clip.content_size.is_(None), Clip.content.isnot(None))
+        ).update({Clip.content_size: octet_length(Clip.content)}, synchronize_session=False)
+        db.query(Clip).filter(
+            and_(in_range, Clip.preview.is_(None), Clip.content.isnot(None))
+        ).update({Clip.preview: func.substr(Clip.content, 1, PREVIEW_LENGTH)}, synchronize_session=False)
+
+        clip_count = select(func.count(Clip.id)).where(
+            Clip.owner_id == User.id
+        ).scalar_subquery()
+        pinned_count = select(func.count(Clip.id)).where(
+            and_(Clip.owner_id == User.id, Clip.is_pinned == True)
+        ).scalar_subquery()
+        content_used = select(func.coalesce(func.sum(Clip.content_size), 0)).where(
+            Clip.owner_id == User.id
+        ).scalar_subquery()
+        storage_used = select(func.coalesce(func.sum(File.file_size), 0)).where(
+            File.owner_id == User.id
+        ).scalar_subquery()
+
+        fixed = db.query(User).filter(
+            and_(
+                User.id.between(first_id, last_id),
+                or_(
+                    User.clip_count != clip_count,
+                    User.pinned_count != pinned_count,
+                    User.content_used != content_used,
+                    User.storage_used != storage_used
+                )
+            )
+        ).update({
+            User.clip_count: clip_count,
+            User.pinned_count: pinned_count,
+            User.content_used: content_used,
+            User.storage_used: storage_used
+        }, synchronize_session=False)
+        db.commit()
+        return fixed
+
+    def _reconcile_blob_refs(self, db: Session, deadline: Optional[float] = None):
+        """Repair blob reference counts in batches, dropping blobs no clip points at"""
+        blob_refs = select(func.count(Clip.id)).where(
+            Clip.content_hash == ClipBlob.hash
+        ).scalar_subquery()
+        last_hash = ""
+        while deadline is None or time.monotonic() <= deadline:
+            hashes = [blob_hash for (blob_hash,) in db.query(ClipBlob.hash).filter(
+                ClipBlob.hash > last_hash
+            ).order_by(ClipBlob.hash).limit(settings.purge_batch_size)]
+            if not hashes:
+                break
+            in_batch = ClipBlob.hash.between(hashes[0], hashes[-1])
+
+            db.query(ClipBlob).filter(
+                and_(in_batch, ClipBlob.ref_count != blob_refs)
+            ).update({ClipBlob.ref_count: blob_refs}, synchronize_session=False)
+            unused_blob_files = delete_unused_blobs(db.connection(), in_batch)
+            db.commit()
+            remove_spill_files(unused_blob_files)
+
+            last_hash = hashes[-1]
+            if len(hashes) < settings.purge_batch_size:
+                break
     
-    def cleanup_anonymous_clips(self, db: Session) -> int:
+    def cleanup_anonymous_clips(self, db: Session, deadline: Optional[float] = None) -> int:
         """Clean up clips from expired anonymous users"""
         from app.services.auth import auth_service
 
-        # Clean up expired anonymous users (this will cascade delete their clips)
-        deleted_users = auth_service.cleanup_expired_anonymous_users(db)
+        # Clean up expired anonymous users (this also deletes their clips)
+        deleted_users = auth_service.cleanup_expired_anonymous_users(db, deadline=deadline)
 
         # Also clean up anonymous clips that have expired individually
         expire_time = datetime.now(timezone.utc) - timedelta(hours=settings.anonymous_clip_expire_hours)
 
-        expired_clips = db.query(Clip).join(User).filter(
+        query = db.query(Clip.id).join(User).filter(
             and_(
                 User.is_anonymous == True,
                 Clip.created_at < expire_time,
                 Clip.is_pinned == False  # Don't delete pinned clips even for anonymous users
             )
-        ).all()
+        )
 
-        deleted_clips = len(expired_clips)
-        for clip in expired_clips:
-            db.delete(clip)
+        return self.purge_in_batches(
+            db, "anonymous-clips", query, Clip.id, lambda ids: self.evict_clips(db, ids), deadline
+        )
 
-        if deleted_clips > 0:
+    def prune_clip_changes(self, db: Session, deadline: Optional[float] = None) -> int:
+        """Delete change log entries older than the retention period.
+
+        The newest entry is always kept, so clients syncing from a pruned
+        position can be told to reload instead of silently missing changes.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(days=settings.clip_change_retention_days)
+        head = db.query(func.max(ClipChange.seq)).scalar()
+        if head is None:
+            return 0
+        query = db.query(ClipChange.seq).filter(
+            and_(ClipChange.created_at < cutoff, ClipChange.seq < head)
+        )
+
+        def purge(seqs: List[int]) -> int:
+            deleted = db.query(ClipChange).filter(ClipChange.seq.in_(seqs)).delete(synchronize_session=False)
             db.commit()
+            return deleted
 
-        return deleted_clips
+        return self.purge_in_batches(db, "clip-changes", query, ClipChange.seq, purge, deadline)
 
-    def run_cleanup_for_all_users(self, db: Session) -> dict:
-        """Run LRU cleanup for all users"""
-        users = db.query(User).filter(User.is_active == True).all()
+    def mark_dirty(self, user_id: int):
+        """Record that a user may have gone over their clip limit or byte budget"""
+        with self._dirty_lock:
+            self._dirty_users.add(user_id)
+
+    def _drain_dirty(self) -> Set[int]:
+        """Take the current set of possibly-over-limit users"""
+        with self._dirty_lock:
+            dirty, self._dirty_users = self._dirty_users, set()
+        return dirty
+
+    @staticmethod
+    def _over_limit():
+        """Filter on the user counters matching users that may need cleanup.
+
+        clip_count includes expired clips not purged yet, so this can match
+        users whose non-expired clips are within the limit, never the reverse.
+        """
+        over_limit = User.clip_count > User.max_clips
+        if settings.lru_byte_budget_enabled:
+            over_limit = or_(
+                over_limit,
+                User.content_used + User.storage_used > User.storage_quota * settings.lru_quota_high_watermark
+            )
+        return and_(User.is_active == True, over_limit)
+
+    def find_users_over_limit(self, db: Session) -> List[int]:
+        """Find active users holding more clips than their limit, or (with
+        byte-budget eviction) using more than their storage quota"""
+        return [user_id for (user_id,) in db.query(User.id).filter(self._over_limit()).order_by(User.id)]
+
+    def cleanup_users_over_limit(self, db: Session, deadline: Optional[float] = None, full: bool = True) -> dict:
+        """Run LRU cleanup for users that may be over their clip limit.
+
+        Visits users marked dirty since the last run and, when `full` is
+        set, every user found over the limit by their counters. Dirty users
+        whose counters are within the limits are dropped in the same query
+        that loads the others. Stops early once `deadline` (a
+        time.monotonic() value) has passed; users not visited are kept for
+        the next run.
+        """
+        if full:
+            self._drain_dirty()
+            users = db.query(User).filter(self._over_limit()).order_by(User.id).all()
+        else:
+            users = []
+            for chunk in _chunks(sorted(self._drain_dirty())):
+                users.extend(db.query(User).filter(
+                    and_(User.id.in_(chunk), self._over_limit())
+                ).order_by(User.id).all())
 
         total_deleted = 0
         users_cleaned = 0
+        users_processed = 0
 
         for user in users:
+            if deadline is not None and time.monotonic() > deadline:
+                for remaining in users[users_processed:]:
+                    self.mark_dirty(remaining.id)
+                break
+            users_processed += 1
             deleted = self.cleanup_user_clips(db, user)
             if deleted > 0:
                 total_deleted += deleted
                 users_cleaned += 1
 
+        return {
+            "users_processed": users_processed,
+            "users_cleaned": users_cleaned,
+            "clips_deleted_lru": total_deleted
+        }
+
+    def run_cleanup_for_all_users(self, db: Session) -> dict:
+        """Run LRU cleanup for all users"""
+        result = self.cleanup_users_over_limit(db)
+
         # Also clean up expired clips
         expired_deleted = self.cleanup_expired_clips(db)
 
         # Clean up anonymous clips
         anonymous_deleted = self.cleanup_anonymous_clips(db)
 
-        return {
-            "users_processed": len(users),
-            "users_cleaned": users_cleaned,
-            "clips_deleted_lru": total_deleted,
+        total_deleted = result["clips_deleted_lru"]
+        result.update({
             "clips_deleted_expired": expired_deleted,
             "clips_deleted_anonymous": anonymous_deleted,
             "total_deleted": total_deleted + expired_deleted + anonymous_deleted
-        }
+        })
+        return result
 
 
 # Global instance
@@ -0,0 +1,164 @@
+"""
+In-process LRU index for fast eviction decisions
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.clip import Clip
+from app.config import settings
+from app.utils.dates import as_utc
+
+
+class UserLRUEntry:
+    """Recency-ordered clip ids for a single user"""
+
+    def __init__(self):
+        self.unpinned: "OrderedDict[int, None]" = OrderedDict()  # Oldest first
+        self.pinned: set = set()
+        self.expires: Dict[int, datetime] = {}  # Only clips with an expiration
+        self.warmed_at = time.monotonic()
+
+    def touch(self, clip_id: int, is_pinned: Optional[bool] = None, expires_at=False):
+        """Mark a clip as most recently used, optionally updating its state"""
+        if is_pinned is None:
+            is_pinned = clip_id in self.pinned
+
+        if is_pinned:
+            self.unpinned.pop(clip_id, None)
+            self.pinned.add(clip_id)
+        else:
+            self.pinned.discard(clip_id)
+            self.unpinned[clip_id] = None
+            self.unpinned.move_to_end(clip_id)
+
+        # expires_at=False means "unchanged"
+        if expires_at is not False:
+            if expires_at is None:
+                self.expires.pop(clip_id, None)
+            else:
+                self.expires[clip_id] = as_utc(expires_at)
+
+    def discard(self, clip_id: int):
+        """Forget a clip"""
+        self.unpinned.pop(clip_id, None)
+        self.pinned.discard(clip_id)
+        self.expires.pop(clip_id, None)
+
+    def drop_expired(self, now: datetime):
+        """Drop expired clips, they are handled by expired cleanup instead"""
+        for clip_id in [cid for cid, exp in self.expires.items() if exp <= now]:
+            self.discard(clip_id)
+
+    def total(self) -> int:
+        """Number of tracked (non-expired) clips"""
+        return len(self.unpinned) + len(self.pinned)
+
+    def oldest(self, count: int) -> List[int]:
+        """Return up to `count` least recently used unpinned clip ids"""
+        result = []
+        for clip_id in self.unpinned:
+            if len(result) >= count:
+                break
+            result.append(clip_id)
+        return result
+
+
+class LRUIndex:
+    """Per-user recency index, warmed lazily from the database.
+
+    The index is advisory and only sees accesses made in this process:
+    callers must verify candidates, including their recency, against the
+    database and call `invalidate` when the index turns out to be stale
+    (e.g. clips read or changed by another worker process).
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[int, UserLRUEntry]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.lru_index_enabled
+
+    def _get_entry(self, owner_id: int) -> Optional[UserLRUEntry]:
+        """Get a warmed entry, dropping it if it is older than the TTL"""
+        entry = self._entries.get(owner_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.warmed_at > settings.lru_index_ttl:
+            del self._entries[owner_id]
+            return None
+        self._entries.move_to_end(owner_id)
+        return entry
+
+    def warm(self, db: Session, owner_id: int) -> UserLRUEntry:
+        """Get the entry for a user, loading it from the database if needed"""
+        with self._lock:
+            entry = self._get_entry(owner_id)
+            if entry is not None:
+                return entry
+
+        rows = db.query(Clip.id, Clip.is_pinned, Clip.expires_at).filter(
+            Clip.owner_id == owner_id
+        ).order_by(Clip.last_accessed, Clip.id).all()
+
+        entry = UserLRUEntry()
+        for clip_id, is_pinned, expires_at in rows:
+            entry.touch(clip_id, bool(is_pinned), expires_at)
+
+        with self._lock:
+            self._entries[owner_id] = entry
+            self._entries.move_to_end(owner_id)
+            while len(self._entries) > settings.lru_index_max_users:
+                self._entries.popitem(last=False)
+        return entry
+
+    def excess(self, db: Session, owner_id: int, max_clips: int) -> int:
+        """Number of clips a user holds above `max_clips`"""
+        entry = self.warm(db, owner_id)
+        with self._lock:
+            entry.drop_expired(datetime.now(timezone.utc))
+            return entry.total() - max_clips
+
+    def oldest(self, db: Session, owner_id: int, count: int) -> List[int]:
+        """Least recently used unpinned clip ids for a user"""
+        entry = self.warm(db, owner_id)
+        with self._lock:
+            return entry.oldest(count)
+
+    def touch(self, owner_id: int, clip_id: int, is_pinned: Optional[bool] = None, expires_at=False):
+        """Record an access or state change; no-op for users not yet warmed"""
+        if not self.enabled:
+            return
+        with self._lock:
+            entry = self._entries.get(owner_id)
+            if entry is not None:
+                entry.touch(clip_id, is_pinned, expires_at)
+
+    def discard(self, owner_id: int, clip_ids: List[int]):
+        """Forget deleted clips"""
+        if not self.enabled:
+            return
+        with self._lock:
+            entry = self._entries.get(owner_id)
+            if entry is not None:
+                for clip_id in clip_ids:
+                    entry.discard(clip_id)
+
+    def invalidate(self, owner_id: Optional[int] = None):
+        """Drop a user's entry (or every entry) so it is re-warmed on next use"""
+        with self._lock:
+            if owner_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(owner_id, None)
+
+
+# Global instance
+lru_index = LRUIndex()
@@ -0,0 +1,203 @@
+"""
+Background scheduler for periodic cleanup jobs
+"""
+
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledJob:
+    """A periodic maintenance job and its last-run statistics"""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Session, float], object],
+        interval: float,
+        max_runtime: float,
+        jitter: float = 0.0,
+        run_at_start: bool = False
+    ):
+        self.name = name
+        self.func = func  # Called as func(db, deadline), deadline is a time.monotonic() value
+        self.interval = interval
+        self.max_runtime = max_runtime
+        self.jitter = jitter
+        # Jobs that run at start still get a little jitter
+        first_delay = random.uniform(1.0, 10.0) if run_at_start else self.next_delay()
+        self.next_run = time.monotonic() + first_delay
+
+        # Last-run statistics
+        self.runs = 0
+        self.failures = 0
+        self.last_started_at: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+        self.last_result = None
+        self.last_error: Optional[str] = None
+        self.last_overran = False
+
+    def next_delay(self) -> float:
+        """Interval with random jitter, so workers don't run jobs in lockstep"""
+        spread = self.interval * self.jitter
+        return max(1.0, self.interval + random.uniform(-spread, spread))
+
+    def get_stats(self) -> dict:
+        """Get job statistics"""
+        return {
+            "name": self.name,
+            "interval": self.interval,
+            "max_runtime": self.max_runtime,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_started_at": self.last_started_at.isoformat() if self.last_started_at else None,
+            "last_duration": self.last_duration,
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+            "last_overran": self.last_overran,
+            "next_run_in": max(0.0, round(self.next_run - time.monotonic(), 3))
+        }
+
+
+class CleanupScheduler:
+    """Runs cleanup jobs on jittered intervals in a worker thread"""
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self.jobs: List[ScheduledJob] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def add_job(self, job: ScheduledJob) -> ScheduledJob:
+        """Register a job"""
+        self.jobs.append(job)
+        return job
+
+    def _default_jobs(self) -> List[ScheduledJob]:
+        """Jobs built from the current settings"""
+        from app.services.lru import lru_service
+
+        jitter = settings.cleanup_jitter
+        max_runtime = settings.cleanup_max_runtime
+        return [
+            ScheduledJob(
+                "lru",
+                lambda db, deadline: lru_service.cleanup_users_over_limit(db, deadline=deadline),
+                settings.lru_cleanup_interval, max_runtime, jitter
+            ),
+            ScheduledJob(
+                "lru-dirty",
+                lambda db, deadline: lru_service.cleanup_users_over_limit(db, deadline=deadline, full=False),
+                settings.lru_dirty_cleanup_interval, max_runtime, jitter
+            ),
+            ScheduledJob(
+                "expiry",
+                lambda db, deadline: lru_service.expire_due_clips(db, deadline=deadline),
+                settings.expiry_tick_interval, max_runtime, jitter
+            ),
+            ScheduledJob(
+                "expired",
+                lambda db, deadline: lru_service.cleanup_expired_clips(db, deadline=deadline),
+                settings.expired_cleanup_interval, max_runtime, jitter
+            ),
+            ScheduledJob(
+                "anonymous",
+                lambda db, deadline: lru_service.cleanup_anonymous_clips(db, deadline=deadline),
+                settings.anonymous_cleanup_interval, max_runtime, jitter
+            ),
+            ScheduledJob(
+                "clip-changes",
+                lambda db, deadline: lru_service.prune_clip_changes(db, deadline=deadline),
+                settings.clip_change_prune_interval, max_runtime, jitter
+            ),
+            ScheduledJob(
+                "counters",
+                lambda db, deadline: lru_service.reconcile_user_counters(db, deadline=deadline),
+                settings.counter_reconcile_interval, max_runtime, jitter,
+                run_at_start=True
+            ),
+        ]
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the worker thread with the default jobs"""
+        if self.running:
+            return
+        self.jobs = self._default_jobs()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="cleanup-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Cleanup scheduler started with jobs: {[job.name for job in self.jobs]}")
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the worker thread, waiting for a running job to finish"""
+        if not self.running:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info("Cleanup scheduler stopped")
+
+    def run_job(self, job: ScheduledJob):
+        """Run a job once and record its statistics"""
+        started = time.monotonic()
+        deadline = started + job.max_runtime
+        job.last_started_at = datetime.now(timezone.utc)
+        job.runs += 1
+
+        db = self.session_factory()
+        try:
+            job.last_result = job.func(db, deadline)
+            job.last_error = None
+        except Exception as e:
+            db.rollback()
+            job.failures += 1
+            job.last_error = str(e)
+            logger.error(f"Cleanup job '{job.name}' failed: {e}", exc_info=True)
+        finally:
+            db.close()
+
+        job.last_duration = round(time.monotonic() - started, 3)
+        job.last_overran = job.last_duration > job.max_runtime
+        if job.last_overran:
+            logger.warning(
+                f"Cleanup job '{job.name}' took {job.last_duration}s, "
+                f"over its {job.max_runtime}s budget"
+            )
+        job.next_run = time.monotonic() + job.next_delay()
+
+    def _run(self):
+        """Worker loop"""
+        while not self._stop_event.is_set():
+            for job in self.jobs:
+                if self._stop_event.is_set():
+                    break
+                if time.monotonic() >= job.next_run:
+                    self.run_job(job)
+
+            next_due = min((job.next_run for job in self.jobs), default=time.monotonic() + 60)
+            self._stop_event.wait(max(0.0, next_due - time.monotonic()))
+
+    def get_stats(self) -> dict:
+        """Get scheduler and per-job statistics"""
+        return {
+            "running": self.running,
+            "jobs": [job.get_stats() for job in self.jobs]
+        }
+
+
+# Global instance
+cleanup_scheduler = CleanupScheduler()
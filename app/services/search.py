@@ -0,0 +1,173 @@
+"""
+Full-text clip search backends, chosen by database dialect
+"""
+
+import re
+from typing import List, Tuple
+
+from sqlalchemy import and_, func, literal_column, or_, select, union
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql import column, table
+
+from app.models.blob import ClipBlob
+from app.models.clip import Clip
+from app.models.search import BLOB_FTS_TABLE, FTS_TABLE, has_search_index
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def search_tokens(term: str) -> List[str]:
+    """Split a search box term into word tokens"""
+    return _TOKEN.findall(term.lower())
+
+
+class SearchBackend:
+    """Filters a clip query by a search term; returns (query, rank ordering)"""
+
+    name = ""
+
+    def apply(self, query: Query, term: str) -> Tuple[Query, list]:
+        raise NotImplementedError
+
+
+def join_blob(query: Query) -> Query:
+    """Outer join each clip's body blob"""
+    return query.outerjoin(ClipBlob, ClipBlob.hash == Clip.content_hash)
+
+
+class LikeSearch(SearchBackend):
+    """Substring match without an index"""
+
+    name = "like"
+
+    def __init__(self, blob_content=ClipBlob.content):
+        self.blob_content = blob_content
+
+    def apply(self, query: Query, term: str) -> Tuple[Query, list]:
+        search_term = f"%{term}%"
+        return join_blob(query).filter(
+            or_(
+                Clip.title.ilike(search_term),
+                Clip.content.ilike(search_term),
+                self.blob_content.ilike(search_term)
+            )
+        ), []
+
+
+def sqlite_blob_text():
+    """Plain text of the joined blob on SQLite, where it may be compressed or spilled.
+
+    Calls a Python function per row; only the LIKE fallback uses it.
+    """
+    return func.clip_text(ClipBlob.content, ClipBlob.content_codec, ClipBlob.content_data, ClipBlob.file_path)
+
+
+class SQLiteFTSSearch(SearchBackend):
+    """SQLite FTS5 indexes, ranked by bm25
+
+    Titles and inline content are indexed in clips_fts, blob bodies in
+    clip_blobs_fts by hash; a clip matches if either does.
+    """
+
+    name = "fts5"
+
+    fts = table(FTS_TABLE, column("rowid"))
+    blob_fts = table(BLOB_FTS_TABLE, column("hash"))
+
+    def apply(self, query: Query, term: str) -> Tuple[Query, list]:
+        # Quote every token so FTS5 syntax in user input is matched literally
+        match = " ".join(f'"{token}"*' for token in search_tokens(term))
+        fts_table = literal_column(FTS_TABLE)
+        blob_fts_table = literal_column(BLOB_FTS_TABLE)
+        indexed = select(self.fts.c.rowid).where(fts_table.op("MATCH")(match))
+        in_blob = select(self.blob_fts.c.hash).where(blob_fts_table.op("MATCH")(match))
+        rank = select(func.bm25(fts_table)).where(
+            and_(fts_table.op("MATCH")(match), self.fts.c.rowid == Clip.id)
+        ).scalar_subquery()
+        blob_rank = select(func.bm25(blob_fts_table)).where(
+            and_(blob_fts_table.op("MATCH")(match), self.blob_fts.c.hash == Clip.content_hash)
+        ).scalar_subquery()
+        query = query.filter(or_(Clip.id.in_(indexed), Clip.content_hash.in_(in_blob)))
+        return query, [func.coalesce(rank, blob_rank, 0)]
+
+
+class PostgresSearch(SearchBackend):
+    """tsvector match against the GIN expression indexes, ranked by ts_rank
+
+    Inline content and blob bodies are indexed separately, so each is
+    matched on its own index and the hits are combined by clip id.
+    """
+
+    name = "tsvector"
+
+    def apply(self, query: Query, term: str) -> Tuple[Query, list]:
+        # Same expressions as the indexes (POSTGRES_DOCUMENT and
+        # POSTGRES_BLOB_DOCUMENT), with literals inlined
+        simple = literal_column("'simple'")
+        empty = literal_column("''")
+        space = literal_column("' '")
+        tsquery = func.to_tsquery(simple, " & ".join(f"{token}:*" for token in search_tokens(term)))
+        inline = func.to_tsvector(simple, func.coalesce(Clip.title, empty) + space + func.coalesce(Clip.content, empty))
+        blob = func.to_tsvector(simple, func.coalesce(ClipBlob.content, empty))
+        matches = union(
+            select(Clip.id).where(inline.op("@@")(tsquery)),
+            select(Clip.id).join(ClipBlob, ClipBlob.hash == Clip.content_hash).where(blob.op("@@")(tsquery))
+        )
+        document = func.to_tsvector(
+            simple,
+            func.coalesce(Clip.title, empty) + space + func.coalesce(Clip.content, ClipBlob.content, empty)
+        )
+        return (
+            join_blob(query).filter(Clip.id.in_(select(matches.subquery().c.id))),
+            [func.ts_rank(document, tsquery).desc()]
+        )
+
+
+class MySQLSearch(SearchBackend):
+    """FULLTEXT indexes in boolean mode, ranked by relevance
+
+    Inline content and blob bodies have separate FULLTEXT indexes; a clip
+    matches if either does.
+    """
+
+    name = "fulltext"
+
+    def apply(self, query: Query, term: str) -> Tuple[Query, list]:
+        from sqlalchemy.dialects.mysql import match
+
+        against = " ".join(f"+{token}*" for token in search_tokens(term))
+        inline = match(Clip.title, Clip.content, against=against).in_boolean_mode()
+        blob = match(ClipBlob.content, against=against).in_boolean_mode()
+        matches = union(
+            select(Clip.id).where(inline),
+            select(Clip.id).join(ClipBlob, ClipBlob.hash == Clip.content_hash).where(blob)
+        )
+        relevance = inline + func.coalesce(blob, 0)
+        return (
+            join_blob(query).filter(Clip.id.in_(select(matches.subquery().c.id))),
+            [relevance.desc()]
+        )
+
+
+_BACKENDS = {
+    "sqlite": SQLiteFTSSearch(),
+    "postgresql": PostgresSearch(),
+    "mysql": MySQLSearch(),
+    "mariadb": MySQLSearch(),
+}
+
+
+def get_search_backend(db: Session, term: str) -> SearchBackend:
+    """Full-text backend for the session's database, LIKE when unavailable.
+
+    Terms without any word characters can't be expressed as a full-text
+    query and also use LIKE.
+    """
+    bind = db.get_bind()
+    backend = _BACKENDS.get(bind.dialect.name)
+    if backend is None or not has_search_index(bind) or not search_tokens(term):
+        if bind.dialect.name == "sqlite":
+            # Blob bodies may be compressed or spilled to files there
+            return LikeSearch(sqlite_blob_text())
+        return LikeSearch()
+    return backend
@@ -0,0 +1,185 @@
+"""
+In-process cache of resolved share tokens
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.config import settings
+from app.models.clip import AccessLevel, Clip
+from app.schemas.clip import ClipResponse
+from app.utils.conditional import clip_etag
+from app.utils.dates import as_utc
+
+
+@dataclass
+class SharedClip:
+    """Detached snapshot of a shared clip, safe to keep across sessions"""
+    clip_id: int
+    owner_id: int
+    access_level: AccessLevel
+    password_hash: Optional[str]
+    expires_at: Optional[datetime]
+    response: ClipResponse
+    etag: str
+    last_modified: Optional[datetime]
+    size: int  # UTF-8 bytes of the content held in `response`
+
+    @classmethod
+    def from_clip(cls, clip: Clip) -> "SharedClip":
+        return cls(
+            clip_id=clip.id,
+            owner_id=clip.owner_id,
+            access_level=clip.access_level,
+            password_hash=clip.password_hash,
+            expires_at=as_utc(clip.expires_at),
+            response=ClipResponse.model_validate(clip),
+            etag=clip_etag(clip),
+            last_modified=clip.updated_at or clip.created_at,
+            size=clip.content_size or 0
+        )
+
+    def is_expired(self, now: datetime) -> bool:
+        return self.expires_at is not None and self.expires_at < now
+
+
+class ShareCache:
+    """Bounded TTL cache of shared clips by token, with negative entries.
+
+    Entries hold the whole body, so the cache is bounded by
+    `share_cache_max_bytes` of content as well as by entry count, and
+    bodies of `share_cache_max_entry_bytes` or more are loaded per request
+    instead. Hot tokens are answered from a snapshot of the clip, and tokens that
+    resolved to nothing are remembered for `share_cache_negative_ttl`
+    seconds so scanners don't reach the database. Writers call
+    `invalidate` after committing; a lookup that started before an
+    invalidation is not cached, so a slow reader can't put back stale data.
+    Other worker processes only see changes once their entries expire.
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, Tuple[float, SharedClip]]" = OrderedDict()
+        self._missing: "OrderedDict[str, float]" = OrderedDict()
+        self._tokens: Dict[int, str] = {}  # clip id -> cached token
+        self._bytes = 0  # Content held by _entries
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.share_cache_enabled
+
+    @property
+    def generation(self) -> int:
+        """Read before loading a clip, then pass to `put`/`put_missing`"""
+        return self._generation
+
+    def get(self, token: str) -> Tuple[bool, Optional[SharedClip]]:
+        """Look a token up: (False, None) on a miss, (True, None) for a known bad token"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(token)
+            if cached is not None:
+                if cached[0] > now:
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return True, cached[1]
+                self._drop(token)
+
+            missing_until = self._missing.get(token)
+            if missing_until is not None:
+                if missing_until > now:
+                    self.negative_hits += 1
+                    return True, None
+                del self._missing[token]
+
+            self.misses += 1
+            return False, None
+
+    def put(self, token: str, shared: SharedClip, generation: int):
+        """Cache a resolved clip unless something was invalidated since `generation`
+        or its body is too large to keep"""
+        if shared.size >= settings.share_cache_max_entry_bytes:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._missing.pop(token, None)
+            self._drop(token)
+            previous = self._tokens.get(shared.clip_id)
+            if previous is not None:
+                self._drop(previous)
+            self._entries[token] = (time.monotonic() + settings.share_cache_ttl, shared)
+            self._bytes += shared.size
+            self._tokens[shared.clip_id] = token
+            while (
+                len(self._entries) > settings.share_cache_max_entries
+                or self._bytes > settings.share_cache_max_bytes
+            ):
+                self._drop(next(iter(self._entries)))
+
+    def put_missing(self, token: str, generation: int):
+        """Remember that a token doesn't resolve to a shared clip"""
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._missing[token] = time.monotonic() + settings.share_cache_negative_ttl
+            self._missing.move_to_end(token)
+            while len(self._missing) > settings.share_cache_max_entries:
+                self._missing.popitem(last=False)
+
+    def _drop(self, token: str):
+        cached = self._entries.pop(token, None)
+        if cached is None:
+            return
+        self._bytes -= cached[1].size
+        if self._tokens.get(cached[1].clip_id) == token:
+            del self._tokens[cached[1].clip_id]
+
+    def invalidate(self, clip_ids: Iterable[int] = (), tokens: Iterable[Optional[str]] = ()):
+        """Forget cached clips and tokens after they changed"""
+        with self._lock:
+            self._generation += 1
+            for clip_id in clip_ids:
+                token = self._tokens.get(clip_id)
+                if token is not None:
+                    self._drop(token)
+            for token in tokens:
+                if token:
+                    self._drop(token)
+                    self._missing.pop(token, None)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._missing.clear()
+            self._tokens.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> dict:
+        """Get cache statistics"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "negative_entries": len(self._missing),
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses
+            }
+
+
+# Global instance
+share_cache = ShareCache()
@@ -3,6 +3,6 @@ Utility functions and dependencies
 """
 
 from .auth import get_current_user, get_current_active_user
-from .pagination import paginate_query
+from .pagination import paginate_query, keyset_paginate
 
-__all__ = ["get_current_user", "get_current_active_user", "paginate_query"]
+__all__ = ["get_current_user", "get_current_active_user", "paginate_query", "keyset_paginate"]
@@ -3,13 +3,13 @@ Authentication utilities and dependencies
 """
 
 from typing import Optional
-from fastapi import Depends, HTTPException, status, Header
+from fastapi import Depends, HTTPException, status, Header, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
-from app.database import get_db, settings
+from app.database import SessionRunner, get_db, get_session_runner, settings
 from app.models.user import User
-from app.services.auth import auth_service
+from app.services.auth import STREAM_TICKET_PURPOSE, auth_service
 
 
 # Security scheme
@@ -98,6 +98,27 @@ def get_current_user_or_anonymous(
     db: Session = Depends(get_db)
 ) -> User:
     """Get current user or create anonymous user if allowed"""
+    return resolve_user_or_anonymous(db, credentials, x_session_id)
+
+
+async def get_runner_user_or_anonymous(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    x_session_id: Optional[str] = Header(None),
+    db: SessionRunner = Depends(get_session_runner)
+) -> User:
+    """get_current_user_or_anonymous for async routes, on the route's session runner.
+
+    The user belongs to the runner's session: only read it inside `db.run`.
+    """
+    return await db.run(resolve_user_or_anonymous, credentials, x_session_id)
+
+
+def resolve_user_or_anonymous(
+    db: Session,
+    credentials: Optional[HTTPAuthorizationCredentials],
+    x_session_id: Optional[str]
+) -> User:
+    """The request's user, or a new anonymous user if allowed"""
     # Try to get existing user
     user = get_current_user_optional(credentials, x_session_id, db)
     if user:
@@ -133,3 +154,45 @@ def require_authenticated_user(
         )
 
     return current_user
+
+
+def resolve_stream_user_id(
+    db: Session,
+    token: Optional[str] = None,
+    session_id: Optional[str] = None,
+    ticket: Optional[str] = None
+) -> Optional[int]:
+    """Id of the user a live stream's credentials belong to, or None. Never creates anonymous users."""
+    user_id = None
+    if ticket:
+        try:
+            payload = auth_service.verify_token(ticket, purpose=STREAM_TICKET_PURPOSE)
+            user = auth_service.get_user_by_id(db, user_id=int(payload["sub"]))
+            user_id = user.id if user and user.is_active else None
+        except (HTTPException, KeyError, ValueError):
+            pass
+    else:
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token) if token else None
+        user = get_current_user_optional(credentials, session_id, db)
+        user_id = user.id if user else None
+
+    # Streams outlive the request: don't keep a pooled connection checked out
+    db.rollback()
+    return user_id
+
+
+def get_stream_user_id(
+    ticket: Optional[str] = Query(None),
+    authorization: Optional[str] = Header(None),
+    x_session_id: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+) -> Optional[int]:
+    """Id of the user opening a live stream from its headers or `ticket`, or None.
+
+    Browsers can't set headers on EventSource requests; they pass a ticket
+    from POST /api/clips/stream/ticket instead of credentials in the URL.
+    """
+    token = None
+    if authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    return resolve_stream_user_id(db, token, x_session_id, ticket)
@@ -0,0 +1,80 @@
+"""
+Validators and conditional GET handling (ETag / Last-Modified)
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response, status
+
+from app.config import settings
+from app.utils.dates import as_utc
+
+# Revalidate on every use; for responses only the requesting user may see
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Strong entity tag over the given parts"""
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8"))
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def clip_etag(clip) -> str:
+    """Entity tag of a clip's ClipResponse, without loading blob bodies.
+
+    Access counters are left out: they change on every read and polling
+    clients don't need a new copy for them.
+    """
+    body = clip.content_hash or hashlib.sha256((clip.content or "").encode("utf-8")).hexdigest()
+    return make_etag(
+        clip.id, clip.updated_at or clip.created_at, body, clip.title, clip.access_level.value,
+        bool(clip.is_pinned), bool(clip.is_markdown), clip.expires_at, clip.share_token,
+        ",".join(f"{f.id}:{f.file_hash}" for f in sorted(clip.files, key=lambda f: f.id))
+    )
+
+
+def file_etag(file_obj) -> str:
+    """Entity tag of a stored file: its SHA-256, which never changes for a record"""
+    return f'"{file_obj.file_hash}"'
+
+
+def public_cache_control() -> str:
+    """Cache-Control for public shared clips, letting proxies absorb repeat traffic"""
+    return f"public, max-age={settings.shared_clip_max_age}, must-revalidate"
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime], cache_control: str) -> Dict[str, str]:
+    """ETag, Last-Modified and Cache-Control headers for a response"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(as_utc(last_modified).astimezone(timezone.utc), usegmt=True)
+    return headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Whether the client's cached copy is current (RFC 9110 section 13.2.2)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison: W/ prefixes don't matter for GET
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP dates have whole-second precision
+        return as_utc(last_modified).replace(microsecond=0) <= since
+    return False
+
+
+def not_modified_response(headers: Dict[str, str]) -> Response:
+    """Empty 304 carrying the validators"""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
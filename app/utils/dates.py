@@ -0,0 +1,13 @@
+"""
+Datetime helpers
+"""
+
+from datetime import datetime, timezone
+from typing import Optional
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Normalize naive datetimes (as returned by SQLite) to UTC"""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
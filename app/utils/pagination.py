@@ -2,7 +2,12 @@
 Pagination utilities
 """
 
-from typing import Tuple, Any
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Tuple, Any, Optional, Sequence
+from sqlalchemy import DateTime, literal, tuple_
 from sqlalchemy.orm import Query
 from math import ceil
 
@@ -47,3 +52,61 @@ def paginate_query(query: Query, page: int = 1, per_page: int = 20) -> Tuple[Any
     }
     
     return items, pagination_info
+
+
+def encode_cursor(values: Sequence) -> str:
+    """Encode the sort key of the last item on a page as an opaque cursor"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> list:
+    """Decode a cursor back into values for `columns`; raises ValueError if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        return [
+            datetime.fromisoformat(value) if isinstance(column.type, DateTime) else int(value)
+            for column, value in zip(columns, values)
+        ]
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Invalid cursor")
+
+
+def keyset_paginate(
+    query: Query,
+    columns: Sequence,
+    cursor: Optional[str] = None,
+    limit: int = 20
+) -> Tuple[list, Optional[str]]:
+    """
+    Page through a query in descending `columns` order without OFFSET
+
+    Args:
+        query: SQLAlchemy query object
+        columns: Sort key columns, the last one must be unique (e.g. id)
+        cursor: next_cursor of the previous page, None for the first page
+        limit: Items per page
+
+    Returns:
+        Tuple of (items, next_cursor), next_cursor is None on the last page
+    """
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        # Raw columns against typed parameters, so an index on the columns applies
+        bounds = [literal(value, column.type) for column, value in zip(columns, values)]
+        query = query.filter(tuple_(*columns) < tuple_(*bounds))
+
+    items = query.order_by(*[column.desc() for column in columns]).limit(limit + 1).all()
+    if len(items) <= limit:
+        return items, None
+
+    items = items[:limit]
+    return items, cursor_for(items[-1], columns)
+
+
+def cursor_for(item: Any, columns: Sequence) -> str:
+    """Cursor pointing just past `item`"""
+    return encode_cursor([getattr(item, column.key) for column in columns])
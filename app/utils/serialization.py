@@ -0,0 +1,51 @@
+"""
+Fast JSON encoding for list responses
+"""
+
+import enum
+import json
+from datetime import datetime
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson  # optional, encodes several times faster than json
+except ImportError:
+    orjson = None
+
+
+def _isoformat(value: datetime) -> str:
+    """ISO 8601 the way pydantic writes it, with Z for UTC"""
+    text = value.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+
+def _default(value: Any):
+    if isinstance(value, datetime):
+        return _isoformat(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode plain dicts, lists, datetimes and enums as pydantic would in JSON mode"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response for content already shaped like the route's response_model.
+
+    Returning a response skips FastAPI's validation and serialization of
+    the result, so the content is encoded exactly once; response_model stays
+    on the route for the OpenAPI schema. Only use it for data read straight
+    from trusted columns.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
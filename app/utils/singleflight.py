@@ -0,0 +1,102 @@
+"""
+Request coalescing for concurrent identical lookups
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy.util import await_only
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+class _Call:
+    """A lookup in flight and the callers waiting for it"""
+
+    def __init__(self):
+        self.done: Future = Future()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    def wait(self):
+        """Block until the leader finishes.
+
+        Async session code runs on the event loop in a greenlet; blocking
+        there would also stall a leader running on the same loop, so it
+        awaits instead.
+        """
+        if _on_event_loop():
+            await_only(asyncio.wrap_future(self.done))
+        else:
+            self.done.result()
+
+
+class SingleFlight:
+    """Runs a function once per key for all callers that ask at the same time.
+
+    The first caller for a key runs `fn`; callers arriving while it runs
+    block until it finishes and get the same result (or exception). Nothing
+    is cached afterwards. Results are handed to other threads, so `fn` must
+    return values that don't belong to the caller's session.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run or join the lookup for `key`, returns (result, whether this caller ran it)"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, False
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set_result(None)
+        return call.result, True
+
+    def in_flight(self) -> int:
+        """Number of lookups currently running"""
+        with self._lock:
+            return len(self._calls)
+
+    def get_stats(self) -> dict:
+        """Get coalescing statistics"""
+        return {
+            "in_flight": self.in_flight(),
+            "executed": self.executed,
+            "coalesced": self.coalesced
+        }
+
+
+# Shared by clip and file lookups; keys are prefixed with what they look up
+lookups = SingleFlight()
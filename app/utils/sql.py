@@ -0,0 +1,33 @@
+"""
+Portable SQL expressions
+"""
+
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class octet_length(FunctionElement):
+    """Size in bytes of a text value, as Clip.content_size counts it (UTF-8).
+
+    length() counts characters on SQLite and PostgreSQL but bytes on MySQL.
+    """
+    type = BigInteger()
+    name = "octet_length"
+    inherit_cache = True
+
+
+@compiles(octet_length)
+def _octet_length(element, compiler, **kw):
+    return f"octet_length({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(octet_length, "sqlite")
+def _octet_length_sqlite(element, compiler, **kw):
+    return f"length(CAST({compiler.process(element.clauses, **kw)} AS BLOB))"
+
+
+@compiles(octet_length, "mysql")
+@compiles(octet_length, "mariadb")
+def _octet_length_mysql(element, compiler, **kw):
+    return f"length({compiler.process(element.clauses, **kw)})"
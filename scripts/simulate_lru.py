@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Offline LRU trace-replay simulator for CLIP.LRU
+
+Replays a clip access trace against an eviction policy without a database
+and reports hit ratio, bytes retained, evictions per hour and eviction
+batch sizes. Traces are CSV lines of
+
+    timestamp,op,user_id,clip_id[,size]
+
+where timestamp is in seconds, op is one of create, read, share (read by
+share token), pin or unpin, and size (create only) is the content size in
+bytes. Without a trace file a synthetic trace is generated.
+
+Examples:
+    python scripts/simulate_lru.py trace.csv --policy 2q --max-clips 500
+    python scripts/simulate_lru.py --synthetic 1000000 --users 2000 --write-trace trace.csv
+"""
+
+import argparse
+import heapq
+import math
+import random
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.config import settings
+from app.services.eviction import POLICIES, get_policy
+
+Event = Tuple[float, str, int, int, int]
+
+LIVE = 1
+PINNED = 2
+
+
+class ReplaySimulator:
+    """Replays a trace against one eviction policy.
+
+    Per-clip state lives in typed arrays indexed by a dense clip number
+    (which doubles as the auto-increment id tie-breaker). Each user has a
+    lazy min-heap of eviction priorities; entries are invalidated by
+    bumping the clip's version instead of being removed.
+    """
+
+    def __init__(
+        self,
+        policy_name: str,
+        max_clips: int,
+        on_limit: str = "reject",
+        storage_quota: Optional[int] = None,
+        sweep_interval: float = 60.0,
+        min_age: float = 3600.0
+    ):
+        self.policy = get_policy(policy_name)
+        self.max_clips = max_clips
+        self.on_limit = on_limit
+        self.storage_quota = storage_quota
+        self.sweep_interval = sweep_interval
+        self.min_age = min_age
+
+        # Per-clip state
+        self.clip_numbers: Dict[int, int] = {}
+        self.owner = array("q")
+        self.size = array("q")
+        self.created = array("d")
+        self.last_accessed = array("d")
+        self.access_count = array("q")
+        self.version = array("q")
+        self.flags = array("b")
+
+        # Per-user state
+        self.heaps: Dict[int, list] = {}
+        self.live_clips: Dict[int, int] = {}
+        self.live_bytes: Dict[int, int] = {}
+        self.dirty: Set[int] = set()
+        self.next_sweep: Optional[float] = None
+
+        # Statistics
+        self.first_ts: Optional[float] = None
+        self.last_ts = 0.0
+        self.events = 0
+        self.creates = 0
+        self.rejected = 0
+        self.hits = 0
+        self.misses = 0
+        self.unknown = 0
+        self.share_reads = 0
+        self.evictions = 0
+        self.batches = array("q")
+
+    def _push(self, number: int):
+        """Queue a clip under its current priority"""
+        entry = (
+            self.policy.priority(number, self.last_accessed[number], self.access_count[number], self.size[number]),
+            self.version[number],
+            number
+        )
+        heap = self.heaps[self.owner[number]]
+        heapq.heappush(heap, entry)
+
+        # Drop superseded entries once they dominate the heap
+        user_id = self.owner[number]
+        if len(heap) > 2 * self.live_clips[user_id] + 64:
+            self.heaps[user_id] = heap = [e for e in heap if self._is_current(e)]
+            heapq.heapify(heap)
+
+    def _is_current(self, entry) -> bool:
+        _, version, number = entry
+        return version == self.version[number] and self.flags[number] == LIVE
+
+    def _bytes_over_budget(self, user_id: int) -> int:
+        """Mirror of LRUService.get_bytes_over_budget"""
+        if not self.storage_quota:
+            return 0
+        used = self.live_bytes[user_id]
+        if used <= self.storage_quota * settings.lru_quota_high_watermark:
+            return 0
+        return int(used - self.storage_quota * settings.lru_quota_low_watermark)
+
+    def cleanup(self, user_id: int, now: float, excess: int) -> int:
+        """Mirror of LRUService.cleanup_user_clips: take victims in policy
+        order, then spare the ones created within `min_age`"""
+        bytes_to_free = self._bytes_over_budget(user_id)
+        if excess <= 0 and bytes_to_free <= 0:
+            return 0
+
+        heap = self.heaps[user_id]
+        spared = []
+        taken = 0
+        freed = 0
+        evicted = 0
+        while heap and (taken < excess or freed < bytes_to_free):
+            entry = heapq.heappop(heap)
+            if not self._is_current(entry):
+                continue
+            number = entry[2]
+            taken += 1
+            freed += self.size[number]
+            if self.created[number] > now - self.min_age:
+                spared.append(entry)
+                continue
+            self.flags[number] = 0
+            self.live_clips[user_id] -= 1
+            self.live_bytes[user_id] -= self.size[number]
+            evicted += 1
+
+        for entry in spared:
+            heapq.heappush(heap, entry)
+
+        if evicted:
+            self.evictions += evicted
+            self.batches.append(evicted)
+        return evicted
+
+    def sweep(self, now: float):
+        """Mirror of the lru-dirty scheduler job"""
+        dirty, self.dirty = self.dirty, set()
+        for user_id in dirty:
+            self.cleanup(user_id, now, self.live_clips[user_id] - self.max_clips)
+
+    def create(self, ts: float, user_id: int, clip_id: int, size: int):
+        if user_id not in self.heaps:
+            self.heaps[user_id] = []
+            self.live_clips[user_id] = 0
+            self.live_bytes[user_id] = 0
+
+        self.creates += 1
+        admitted = True
+        # Mirror of the POST /api/clips limit check
+        if self.live_clips[user_id] >= self.max_clips:
+            excess = self.live_clips[user_id] - self.max_clips
+            if self.on_limit == "evict":
+                excess += 1  # Make room for the new clip
+            if self.cleanup(user_id, ts, excess) == 0:
+                self.rejected += 1
+                admitted = False
+
+        # Rejected clips are kept as dead entries, reading them is a miss
+        number = len(self.owner)
+        self.clip_numbers[clip_id] = number
+        self.owner.append(user_id)
+        self.size.append(size)
+        self.created.append(ts)
+        self.last_accessed.append(ts)
+        self.access_count.append(0)
+        self.version.append(0)
+        self.flags.append(LIVE if admitted else 0)
+        if not admitted:
+            return
+        self.live_clips[user_id] += 1
+        self.live_bytes[user_id] += size
+        self.dirty.add(user_id)
+        self._push(number)
+
+    def read(self, ts: float, clip_id: int):
+        number = self.clip_numbers.get(clip_id)
+        if number is None:
+            self.unknown += 1
+            return
+        if not self.flags[number] & LIVE:
+            self.misses += 1
+            return
+
+        self.hits += 1
+        self.last_accessed[number] = ts
+        self.access_count[number] += 1
+        self.version[number] += 1
+        if self.flags[number] == LIVE:
+            self._push(number)
+
+    def pin(self, clip_id: int, is_pinned: bool):
+        number = self.clip_numbers.get(clip_id)
+        if number is None or not self.flags[number] & LIVE:
+            return
+        self.flags[number] = LIVE | PINNED if is_pinned else LIVE
+        self.version[number] += 1
+        if not is_pinned:
+            self._push(number)
+
+    def replay(self, events: Iterator[Event]):
+        """Apply every event of a trace"""
+        for ts, op, user_id, clip_id, size in events:
+            if self.first_ts is None:
+                self.first_ts = ts
+                self.next_sweep = ts + self.sweep_interval
+            self.last_ts = ts
+            self.events += 1
+
+            while ts >= self.next_sweep:
+                self.sweep(self.next_sweep)
+                self.next_sweep += self.sweep_interval
+
+            if op == "create":
+                self.create(ts, user_id, clip_id, size)
+            elif op == "read":
+                self.read(ts, clip_id)
+            elif op == "share":
+                self.share_reads += 1
+                self.read(ts, clip_id)
+            elif op == "pin":
+                self.pin(clip_id, True)
+            elif op == "unpin":
+                self.pin(clip_id, False)
+            else:
+                raise ValueError(f"Unknown trace op '{op}'")
+
+    def get_report(self) -> dict:
+        """Summary statistics of the replay"""
+        reads = self.hits + self.misses
+        hours = max((self.last_ts - (self.first_ts or 0.0)) / 3600.0, 1e-9)
+        batches = sorted(self.batches)
+        p99 = batches[max(0, math.ceil(len(batches) * 0.99) - 1)] if batches else 0
+
+        return {
+            "policy": self.policy.name,
+            "max_clips": self.max_clips,
+            "on_limit": self.on_limit,
+            "storage_quota": self.storage_quota,
+            "events": self.events,
+            "users": len(self.heaps),
+            "creates": self.creates,
+            "creates_rejected": self.rejected,
+            "reads": reads,
+            "share_reads": self.share_reads,
+            "unknown_reads": self.unknown,
+            "hit_ratio": round(self.hits / reads, 4) if reads else None,
+            "clips_retained": sum(self.live_clips.values()),
+            "bytes_retained": sum(self.live_bytes.values()),
+            "evictions": self.evictions,
+            "evictions_per_hour": round(self.evictions / hours, 2),
+            "eviction_batches": len(batches),
+            "p99_eviction_batch": p99,
+            "max_eviction_batch": batches[-1] if batches else 0
+        }
+
+
+def read_trace(path: Path) -> Iterator[Event]:
+    """Parse a CSV trace file"""
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = line.split(",")
+            yield (
+                float(fields[0]),
+                fields[1],
+                int(fields[2]),
+                int(fields[3]),
+                int(fields[4]) if len(fields) > 4 and fields[4] else 0
+            )
+
+
+def synthetic_trace(
+    events: int,
+    users: int,
+    rate: float = 5.0,
+    seed: int = 42,
+    create_share: float = 0.2,
+    share_share: float = 0.15,
+    pin_share: float = 0.02
+) -> Iterator[Event]:
+    """Generate a trace with skewed user activity and recency-biased reads"""
+    rng = random.Random(seed)
+    user_clips: Dict[int, list] = {}
+    next_clip = 1
+    ts = 0.0
+
+    for _ in range(events):
+        ts += rng.expovariate(rate)
+        # Log-uniform user ids: a few heavy users produce much of the traffic
+        user_id = int(users ** rng.random())
+        clips = user_clips.setdefault(user_id, [])
+
+        roll = rng.random()
+        if not clips or roll < create_share:
+            size = int(rng.lognormvariate(7.0, 1.5))  # Median around 1 KB
+            clips.append(next_clip)
+            yield ts, "create", user_id, next_clip, size
+            next_clip += 1
+            continue
+
+        # Mostly re-read recent clips, occasionally old ones
+        back = min(int(rng.expovariate(1 / 30.0)), len(clips) - 1)
+        clip_id = clips[-1 - back]
+        if roll < create_share + pin_share:
+            yield ts, "pin" if rng.random() < 0.7 else "unpin", user_id, clip_id, 0
+        elif roll < create_share + pin_share + share_share:
+            yield ts, "share", user_id, clip_id, 0
+        else:
+            yield ts, "read", user_id, clip_id, 0
+
+
+def write_trace(events: Iterator[Event], path: Path) -> Iterator[Event]:
+    """Pass events through while saving them as a CSV trace"""
+    with open(path, "w") as f:
+        for event in events:
+            ts, op, user_id, clip_id, size = event
+            f.write(f"{ts:.3f},{op},{user_id},{clip_id},{size if op == 'create' else ''}\n")
+            yield event
+
+
+def main():
+    """Parse arguments, replay the trace and print the report"""
+    parser = argparse.ArgumentParser(description="Replay a clip access trace against an eviction policy")
+    parser.add_argument("trace", nargs="?", type=Path, help="CSV trace file (omit to use --synthetic)")
+    parser.add_argument("--policy", default=settings.lru_eviction_policy, choices=sorted(POLICIES))
+    parser.add_argument("--max-clips", type=int, default=settings.lru_max_items_per_user)
+    parser.add_argument(
+        "--on-limit", choices=["reject", "evict"], default="reject",
+        help="Creating a clip at the limit: reject (current behaviour) or evict one clip to make room"
+    )
+    parser.add_argument("--storage-quota", type=int, default=None, help="Enable byte-budget eviction with this quota")
+    parser.add_argument("--sweep-interval", type=float, default=settings.lru_dirty_cleanup_interval)
+    parser.add_argument("--min-age", type=float, default=3600.0, help="Clips younger than this are never evicted")
+    parser.add_argument("--synthetic", type=int, default=1_000_000, help="Synthetic trace length in events")
+    parser.add_argument("--users", type=int, default=1000, help="Synthetic trace user count")
+    parser.add_argument("--rate", type=float, default=5.0, help="Synthetic trace events per second")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--write-trace", type=Path, default=None, help="Save the synthetic trace to this file")
+    args = parser.parse_args()
+
+    if args.trace:
+        events = read_trace(args.trace)
+    else:
+        events = synthetic_trace(args.synthetic, args.users, rate=args.rate, seed=args.seed)
+        if args.write_trace:
+            events = write_trace(events, args.write_trace)
+
+    simulator = ReplaySimulator(
+        args.policy,
+        args.max_clips,
+        on_limit=args.on_limit,
+        storage_quota=args.storage_quota,
+        sweep_interval=args.sweep_interval,
+        min_age=args.min_age
+    )
+
+    started = time.monotonic()
+    simulator.replay(events)
+    elapsed = time.monotonic() - started
+
+    for key, value in simulator.get_report().items():
+        print(f"{key:>22}: {value}")
+    print(f"{'replay_seconds':>22}: {elapsed:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,39 @@
 Test configuration and fixtures
 """
 
-import pytest
+import os
 import tempfile
-import shutil
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 
+# Keep the databases the app and tests open out of the working tree; set
+# before app.config is imported so the application engine uses it too
+TEST_DIR = tempfile.mkdtemp(prefix="cliplru-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DIR}/app.db"
+os.environ["STORAGE_PATH"] = os.path.join(TEST_DIR, "uploads")
+
 from app.main import app
-from app.database import get_db, Base, settings
+from app.database import SessionRunner, get_db, get_session_runner, Base, settings
 from app.models.user import User
 from app.services.auth import auth_service
+from app.services.lru import lru_service
+from app.services.lru_index import lru_index
+from app.services.expiry import expiry_queue
+from app.services.access_buffer import access_buffer
+from app.services.share_cache import share_cache
+from app.services.file import file_service
+
 
+# Background cleanup jobs would run against the application database
+settings.cleanup_scheduler_enabled = False
 
 # Test database URL (SQLite for testing)
-TEST_DATABASE_URL = "sqlite:///./test.db"
+TEST_DATABASE_URL = f"sqlite:///{TEST_DIR}/test.db"
 
 # Create test engine
 test_engine = create_engine(
@@ -28,19 +46,20 @@ test_engine = create_engine(
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
 
 
-@pytest.fixture(scope="session")
-def temp_storage_dir():
-    """Create temporary storage directory for tests"""
-    temp_dir = tempfile.mkdtemp()
-    yield temp_dir
-    shutil.rmtree(temp_dir)
-
-
 @pytest.fixture(scope="function")
-def db_session(temp_storage_dir):
+def db_session(tmp_path):
     """Create test database session"""
-    # Override storage path for tests
-    settings.storage_path = temp_storage_dir
+    # Uploads and spilled bodies go to a fresh directory per test
+    settings.storage_path = str(tmp_path / "uploads")
+    file_service.storage_path = Path(settings.storage_path)
+    file_service.storage_path.mkdir()
+
+    # Reset in-process state left over from previous tests
+    lru_index.invalidate()
+    expiry_queue.clear()
+    access_buffer._take()
+    share_cache.clear()
+    lru_service._drain_dirty()
     
     # Create tables
     Base.metadata.create_all(bind=test_engine)
@@ -66,6 +85,7 @@ def client(db_session):
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_runner] = lambda: SessionRunner(db_session)
     
     with TestClient(app) as test_client:
         yield test_client
@@ -74,6 +94,40 @@ def client(db_session):
     app.dependency_overrides.clear()
 
 
+class QueryCounter:
+    """Statements executed against the test engine inside `count()` blocks"""
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @contextmanager
+    def __call__(self, expected=None):
+        """Count statements in the block; fail if `expected` is given and differs"""
+        self.statements = []
+        event.listen(test_engine, "before_cursor_execute", self._record)
+        try:
+            yield self
+        finally:
+            event.remove(test_engine, "before_cursor_execute", self._record)
+        if expected is not None:
+            assert self.count == expected, (
+                f"expected {expected} queries, got {self.count}:\n" + "\n".join(self.statements)
+            )
+
+
+@pytest.fixture
+def count_queries(db_session):
+    """Assert per-endpoint query counts, e.g. `with count_queries(3): client.get(...)`"""
+    return QueryCounter()
+
+
 @pytest.fixture
 def test_user(db_session):
     """Create a test user"""
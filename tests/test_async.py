@@ -0,0 +1,190 @@
+"""
+Tests for routes and services running on the optional async database engine
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.database import SessionRunner, get_engine_config, get_session_runner, sync_database_url
+from app.main import app
+from tests.conftest import TEST_DATABASE_URL
+
+pytest.importorskip("aiosqlite")
+
+ASYNC_DATABASE_URL = TEST_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+
+@pytest.fixture
+def async_engine():
+    # No pool: connections are tied to the event loop that opened them
+    config = {**get_engine_config(ASYNC_DATABASE_URL), "poolclass": NullPool}
+    return create_async_engine(ASYNC_DATABASE_URL, **config)
+
+
+@pytest.fixture
+def async_runs(client: TestClient, async_engine):
+    """Serve async routes from AsyncSessions on the test database; yields the sessions used"""
+    sessions = []
+
+    async def override_get_session_runner():
+        async with AsyncSession(async_engine, autoflush=False) as session:
+            sessions.append(session)
+            yield SessionRunner(session)
+
+    app.dependency_overrides[get_session_runner] = override_get_session_runner
+    return sessions
+
+
+def _run(async_engine, fn, *args):
+    """Run sync session code on an AsyncSession from a test"""
+    async def main():
+        async with AsyncSession(async_engine, autoflush=False) as session:
+            return await SessionRunner(session).run(fn, *args)
+
+    return asyncio.run(main())
+
+
+class TestAsyncEngine:
+    """Test the async engine path of SessionRunner"""
+
+    def test_shared_clip_on_async_session(self, client: TestClient, auth_headers, async_runs, db_session):
+        """Test that the shared clip route reads, counts and revalidates through an AsyncSession"""
+        from app.models.clip import Clip
+
+        clip = client.post("/api/clips/", headers=auth_headers, json={
+            "title": "Async", "content": "Served without a worker thread", "access_level": "public"
+        }).json()
+
+        response = client.get(f"/api/clips/shared/{clip['share_token']}")
+        assert response.status_code == 200
+        assert response.json()["content"] == "Served without a worker thread"
+        assert len(async_runs) == 1
+
+        revalidated = client.get(
+            f"/api/clips/shared/{clip['share_token']}", headers={"If-None-Match": response.headers["etag"]}
+        )
+        assert revalidated.status_code == 304
+        assert client.get("/api/clips/shared/missing").status_code == 404
+        assert len(async_runs) == 3
+
+        assert db_session.query(Clip.access_count).filter(Clip.id == clip["id"]).scalar() == 1
+
+    def test_shared_spilled_content_on_async_session(
+        self, client: TestClient, auth_headers, async_runs, monkeypatch
+    ):
+        """Test that a spilled body is streamed from its file by the async content route"""
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "clip_spill_threshold", 512)
+        body = "spilled line\n" * 100
+        token = client.post("/api/clips/", headers=auth_headers, json={
+            "title": "Big", "content": body, "access_level": "public"
+        }).json()["share_token"]
+
+        response = client.get(f"/api/clips/shared/{token}/content")
+        assert response.status_code == 200
+        assert response.text == body
+        assert async_runs
+
+    def test_clip_reads_on_async_session(self, client: TestClient, auth_headers, async_runs, db_session):
+        """Test that clip get and list, with auth, run on AsyncSessions and count only served reads"""
+        from app.models.clip import Clip
+
+        clip = client.post("/api/clips/", headers=auth_headers, json={"title": "Async", "content": "Listed"}).json()
+
+        listing = client.get("/api/clips/?view=summary", headers=auth_headers)
+        assert [item["id"] for item in listing.json()["clips"]] == [clip["id"]]
+        assert client.get("/api/clips/?cursor=", headers=auth_headers).json()["clips"][0]["content"] == "Listed"
+
+        response = client.get(f"/api/clips/{clip['id']}", headers=auth_headers)
+        assert response.json()["content"] == "Listed"
+        revalidated = client.get(
+            f"/api/clips/{clip['id']}", headers={**auth_headers, "If-None-Match": response.headers["etag"]}
+        )
+        assert revalidated.status_code == 304
+        assert client.get("/api/clips/999", headers=auth_headers).status_code == 404
+        assert len(async_runs) == 5
+
+        db_session.expire_all()
+        assert db_session.query(Clip.access_count).filter(Clip.id == clip["id"]).scalar() == 1
+
+    def test_anonymous_user_on_async_session(self, client: TestClient, async_runs, db_session):
+        """Test that async routes create anonymous users in their own session"""
+        from app.models.user import User
+
+        assert client.get("/api/clips/").json()["clips"] == []
+        assert len(async_runs) == 1
+        assert db_session.query(User).filter(User.is_anonymous == True).count() == 1
+
+    def test_download_on_async_session(self, client: TestClient, auth_headers, async_runs, db_session):
+        """Test that downloads stream from disk and revalidate through an AsyncSession"""
+        import io
+        from app.models.file import File
+
+        uploaded = client.post(
+            "/api/files/upload", headers=auth_headers, files={"file": ("a.txt", io.BytesIO(b"Async bytes"), "text/plain")}
+        ).json()["file"]
+
+        response = client.get(f"/api/files/{uploaded['id']}/download", headers=auth_headers)
+        assert response.content == b"Async bytes"
+        revalidated = client.get(
+            f"/api/files/{uploaded['id']}/download", headers={**auth_headers, "If-None-Match": response.headers["etag"]}
+        )
+        assert revalidated.status_code == 304
+        assert len(async_runs) == 2
+
+        db_session.expire_all()
+        assert db_session.query(File.download_count).filter(File.id == uploaded["id"]).scalar() == 1
+
+    def test_search_on_async_session(self, db_session, test_user, async_engine, monkeypatch):
+        """Test full-text and blob body search on aiosqlite connections"""
+        from app.config import settings
+        from app.models.clip import Clip
+        from app.models.search import has_search_index
+        from app.models.user import User
+        from app.services.clip import clip_service
+
+        monkeypatch.setattr(settings, "clip_compression_enabled", True)
+        monkeypatch.setattr(settings, "clip_compression_threshold", 256)
+        db_session.add_all([
+            Clip(title="Inline", content="a zebra crossing", owner_id=test_user.id),
+            Clip(title="Compressed", content="zebra herd\n" * 100, owner_id=test_user.id),
+            Clip(title="Other", content="giraffe", owner_id=test_user.id),
+        ])
+        db_session.commit()
+
+        def search(db, user_id, term):
+            user = db.get(User, user_id)
+            clips, _ = clip_service.get_user_clips(db, user, search=term)
+            return has_search_index(db.get_bind()), sorted(clip.title for clip in clips)
+
+        # The compressed body is found through the blob index on the aiosqlite connection
+        assert _run(async_engine, search, test_user.id, "zebra") == (True, ["Compressed", "Inline"])
+
+
+class TestAsyncDrivers:
+    """Test the sync drivers used next to async ones"""
+
+    def test_sync_url_for_async_drivers(self, monkeypatch):
+        """Test that mysql+aiomysql uses mysqlclient when installed and PyMySQL otherwise"""
+        import importlib.util
+        from app.database import sync_scheme
+
+        installed = {"MySQLdb", "pymysql"}
+        monkeypatch.setattr(importlib.util, "find_spec", lambda name: object() if name in installed else None)
+        sync_scheme.cache_clear()
+        try:
+            assert sync_database_url("sqlite+aiosqlite:///./x.db") == "sqlite:///./x.db"
+            assert sync_database_url("postgresql+asyncpg://u@h/db") == "postgresql://u@h/db"
+            assert sync_database_url("mysql+aiomysql://u@h/db") == "mysql://u@h/db"
+
+            installed.discard("MySQLdb")
+            sync_scheme.cache_clear()
+            assert sync_database_url("mysql+aiomysql://u@h/db") == "mysql+pymysql://u@h/db"
+            assert sync_database_url("mysql://u@h/db") == "mysql://u@h/db"
+        finally:
+            sync_scheme.cache_clear()
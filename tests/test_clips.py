@@ -2,6 +2,7 @@
 Tests for clip management endpoints
 """
 
+import pytest
 from fastapi.testclient import TestClient
 
 
@@ -93,7 +94,201 @@ class TestClipEndpoints:
         assert data["total"] == 5
         assert data["has_next"] is True
         assert data["has_prev"] is False
-    
+
+    def test_get_clips_cursor_pagination(self, client: TestClient, auth_headers, db_session):
+        """Test walking clips with a cursor, including tied and mixed-precision timestamps"""
+        from datetime import datetime
+        from app.models.clip import Clip
+
+        for i in range(7):
+            client.post("/api/clips/", headers=auth_headers, json={
+                "title": f"Clip {i}",
+                "content": f"Content {i}",
+                "clip_type": "text"
+            })
+        # Mix whole-second and microsecond timestamps, with ties
+        clips = db_session.query(Clip).order_by(Clip.id).all()
+        for i, clip in enumerate(clips):
+            clip.last_accessed = datetime(2024, 1, 1, 12, 0, i // 3, 0 if i % 2 else 250000)
+        db_session.commit()
+
+        seen = []
+        cursor = ""
+        while True:
+            response = client.get(f"/api/clips/?per_page=3&cursor={cursor}", headers=auth_headers)
+            assert response.status_code == 200
+            data = response.json()
+            assert data["total"] is None
+            seen.extend(clip["id"] for clip in data["clips"])
+            if not data["has_next"]:
+                assert data["next_cursor"] is None
+                break
+            cursor = data["next_cursor"]
+
+        expected = sorted(clips, key=lambda c: (c.last_accessed, c.id), reverse=True)
+        assert seen == [clip.id for clip in expected]
+
+    def test_cursor_pages_use_the_keyset_index(self, db_session, test_user):
+        """Test that cursor pages of clips and files are read from the composite indexes"""
+        from datetime import datetime
+        from sqlalchemy import event
+        from app.services.clip import clip_service
+        from app.services.file import file_service
+        from app.utils.pagination import encode_cursor
+
+        cursor = encode_cursor([datetime(2024, 1, 1, 12, 0, 0, 250000), 5])
+        executed = []
+
+        def record(conn, dbapi_cursor, statement, parameters, context, executemany):
+            executed.append((statement, parameters))
+
+        bind = db_session.get_bind()
+        event.listen(bind, "before_cursor_execute", record)
+        try:
+            clip_service.get_user_clips_after(db_session, test_user, cursor=cursor)
+            file_service.get_user_files_after(db_session, test_user, cursor=cursor)
+        finally:
+            event.remove(bind, "before_cursor_execute", record)
+
+        plans = []
+        for statement, parameters in executed:
+            rows = db_session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            plans.append(" | ".join(row[-1] for row in rows))
+        assert "USING INDEX ix_clips_owner_last_accessed (owner_id=? AND last_accessed<?)" in plans[0]
+        assert "USING INDEX ix_files_owner_created (owner_id=? AND created_at<?)" in plans[1]
+        for plan in plans:
+            assert "TEMP B-TREE" not in plan
+
+    def test_get_clips_invalid_cursor(self, client: TestClient, auth_headers):
+        """Test that a malformed cursor is rejected"""
+        response = client.get("/api/clips/?cursor=not-a-cursor", headers=auth_headers)
+        assert response.status_code == 400
+
+    def test_get_clips_without_total(self, client: TestClient, auth_headers):
+        """Test page mode without the count query"""
+        for i in range(3):
+            client.post("/api/clips/", headers=auth_headers, json={
+                "title": f"Clip {i}",
+                "content": f"Content {i}",
+                "clip_type": "text"
+            })
+
+        response = client.get("/api/clips/?page=2&per_page=2&include_total=false", headers=auth_headers)
+        data = response.json()
+        assert data["total"] is None
+        assert len(data["clips"]) == 1
+        assert data["has_next"] is False
+        assert data["has_prev"] is True
+
+    def test_get_clips_query_count(self, client: TestClient, auth_headers, count_queries):
+        """Test that listing clips with files doesn't issue a query per clip"""
+        import io
+
+        for i in range(6):
+            clip_id = client.post("/api/clips/", headers=auth_headers, json={
+                "title": f"Clip {i}",
+                "content": f"Content {i}",
+                "clip_type": "text"
+            }).json()["id"]
+            client.post(
+                f"/api/files/upload?clip_id={clip_id}",
+                headers=auth_headers,
+                files={"file": (f"file{i}.txt", io.BytesIO(f"File {i}".encode()), "text/plain")}
+            )
+
+        # user, count, clips, files
+        with count_queries(4):
+            response = client.get("/api/clips/", headers=auth_headers)
+        assert all(len(clip["files"]) == 1 for clip in response.json()["clips"])
+
+        # user, clips, files
+        with count_queries(3):
+            client.get("/api/clips/?cursor=", headers=auth_headers)
+
+    def test_get_clips_summary_view(self, client: TestClient, auth_headers, count_queries):
+        """Test the summary view returns previews and file counts without loading content"""
+        import io
+        from app.models.clip import PREVIEW_LENGTH
+
+        content = "é" + "x" * 1000
+        clip_id = client.post("/api/clips/", headers=auth_headers, json={
+            "title": "Long clip",
+            "content": content,
+            "clip_type": "text"
+        }).json()["id"]
+        for i in range(2):
+            client.post(
+                f"/api/files/upload?clip_id={clip_id}",
+                headers=auth_headers,
+                files={"file": (f"file{i}.txt", io.BytesIO(f"File {i}".encode()), "text/plain")}
+            )
+
+        # user, clips with file counts
+        with count_queries(2) as queries:
+            response = client.get("/api/clips/?view=summary&cursor=", headers=auth_headers)
+        assert not any("clips.content AS" in statement for statement in queries.statements)
+
+        assert response.status_code == 200
+        clip = response.json()["clips"][0]
+        assert clip["preview"] == content[:PREVIEW_LENGTH]
+        assert clip["content_size"] == len(content.encode("utf-8"))
+        assert clip["file_count"] == 2
+        assert "content" not in clip and "files" not in clip
+
+        # Full view is unchanged, and the preview follows edits
+        client.put(f"/api/clips/{clip_id}", headers=auth_headers, json={"content": "short"})
+        full = client.get("/api/clips/", headers=auth_headers).json()["clips"][0]
+        assert full["content"] == "short" and len(full["files"]) == 2
+        summary = client.get("/api/clips/?view=summary", headers=auth_headers).json()["clips"][0]
+        assert summary["preview"] == "short"
+
+    def test_get_clips_matches_response_models(self, client: TestClient, auth_headers, db_session, monkeypatch):
+        """Test list rows encode exactly as the validated response models would"""
+        import io
+        from sqlalchemy import func, select
+        from sqlalchemy.orm import with_expression
+        from app.config import settings
+        from app.models.clip import Clip
+        from app.models.file import File
+        from app.schemas.clip import ClipResponse, ClipSummary
+        from app.utils import serialization
+
+        monkeypatch.setattr(settings, "clip_blob_threshold", 256)
+        monkeypatch.setattr(settings, "clip_compression_enabled", True)
+        monkeypatch.setattr(settings, "clip_compression_threshold", 1024)
+        monkeypatch.setattr(settings, "clip_compression_codec", "zlib")
+
+        for i, content in enumerate(["inline ü", "b" * 300, "c" * 2000, None]):
+            clip_id = client.post("/api/clips/", headers=auth_headers, json={
+                "title": f"Clip {i}", "content": content, "clip_type": "text", "is_markdown": i == 1
+            }).json()["id"]
+            client.post(
+                f"/api/files/upload?clip_id={clip_id}",
+                headers=auth_headers,
+                files={"file": (f"file{i}.txt", io.BytesIO(f"File {i}".encode()), "text/plain")}
+            )
+
+        for view, schema in (("full", ClipResponse), ("summary", ClipSummary)):
+            response = client.get(f"/api/clips/?view={view}", headers=auth_headers)
+            assert response.headers["content-type"] == "application/json"
+            clips = response.json()["clips"]
+            assert len(clips) == 4
+
+            db_session.expire_all()
+            for clip in clips:
+                query = db_session.query(Clip).filter(Clip.id == clip["id"])
+                if schema is ClipSummary:
+                    query = query.options(with_expression(
+                        Clip.file_count,
+                        select(func.count(File.id)).where(File.clip_id == Clip.id).scalar_subquery()
+                    ))
+                assert clip == schema.model_validate(query.one()).model_dump(mode="json")
+
+            # Same output with the stdlib encoder
+            with monkeypatch.context() as m:
+                m.setattr(serialization, "orjson", None)
+                assert client.get(f"/api/clips/?view={view}", headers=auth_headers).json()["clips"] == clips
+
     def test_get_clip_by_id(self, client: TestClient, auth_headers):
         """Test getting a specific clip"""
         # Create a clip
@@ -266,3 +461,619 @@ class TestClipEndpoints:
         data = response.json()
         assert len(data["clips"]) == 1
         assert "Python" in data["clips"][0]["title"]
+
+
+class TestFullTextSearch:
+    """Test the full-text search index behind clip search"""
+
+    def _search(self, db_session, user, term):
+        from app.services.clip import clip_service
+
+        clips, total = clip_service.get_user_clips(db_session, user, search=term)
+        return [clip.title for clip in clips]
+
+    def _add(self, db_session, user, title, content):
+        from app.models.clip import Clip
+
+        clip = Clip(title=title, content=content, owner_id=user.id)
+        db_session.add(clip)
+        db_session.commit()
+        return clip
+
+    def test_uses_fts5_on_sqlite(self, db_session):
+        """Test that the SQLite test database gets the FTS5 backend"""
+        from app.services.search import get_search_backend
+
+        assert get_search_backend(db_session, "python").name == "fts5"
+        assert get_search_backend(db_session, "%%").name == "like"
+
+    def test_prefix_match_and_ranking(self, db_session, test_user):
+        """Test prefix matching with the most relevant clip first"""
+        self._add(db_session, test_user, "Shopping list", "milk, eggs, a python book")
+        self._add(db_session, test_user, "Python notes", "python decorators and python generators")
+        self._add(db_session, test_user, "Recipes", "pasta")
+
+        assert self._search(db_session, test_user, "pyth") == ["Python notes", "Shopping list"]
+        assert self._search(db_session, test_user, "python gen") == ["Python notes"]
+
+    def test_index_follows_updates_and_deletes(self, db_session, test_user):
+        """Test that edits and bulk eviction keep the index in sync"""
+        from app.services.lru import lru_service
+
+        clip = self._add(db_session, test_user, "Draft", "first version")
+        clip.content = "second revision"
+        db_session.commit()
+
+        assert self._search(db_session, test_user, "first") == []
+        assert self._search(db_session, test_user, "revision") == ["Draft"]
+
+        lru_service.evict_clips(db_session, [clip.id])
+        assert self._search(db_session, test_user, "revision") == []
+
+    def test_search_syntax_is_literal(self, db_session, test_user):
+        """Test that FTS5 operators in the search box don't break the query"""
+        self._add(db_session, test_user, "Quote", 'say "hello" OR NOT goodbye')
+
+        assert self._search(db_session, test_user, '"hello" OR') == ["Quote"]
+        assert self._search(db_session, test_user, "NOT*(") == ["Quote"]
+
+    def test_index_is_kept_by_plain_sql_writes(self, db_session, test_user):
+        """Test that rows written without the app's SQL functions are indexed"""
+        import sqlite3
+
+        connection = sqlite3.connect(db_session.get_bind().url.database)
+        with connection:
+            connection.execute(
+                "INSERT INTO clips (title, content, clip_type, access_level, owner_id, is_pinned) "
+                "VALUES ('Imported', 'written by a script', 'TEXT', 'PRIVATE', ?, 0)",
+                (test_user.id,)
+            )
+            connection.execute("UPDATE clips SET content = 'edited by a script' WHERE title = 'Imported'")
+        connection.close()
+
+        assert self._search(db_session, test_user, "written") == []
+        assert self._search(db_session, test_user, "edited script") == ["Imported"]
+
+    def test_blob_bodies_are_indexed(self, db_session, test_user, monkeypatch, count_queries):
+        """Test that compressed and spilled blob bodies are found through the index, not clip_text()"""
+        from sqlalchemy import text
+        from app.config import settings
+        from app.models.search import BLOB_FTS_TABLE
+        from app.services.lru import lru_service
+
+        monkeypatch.setattr(settings, "clip_compression_enabled", True)
+        monkeypatch.setattr(settings, "clip_compression_threshold", 256)
+        monkeypatch.setattr(settings, "clip_spill_threshold", 2048)
+        compressed = self._add(db_session, test_user, "Compressed", "zebra herd\n" * 50)
+        spilled = self._add(db_session, test_user, "Spilled", "zebra crossing\n" * 200)
+        self._add(db_session, test_user, "Shared body", "zebra herd\n" * 50)
+        self._add(db_session, test_user, "Inline", "giraffe")
+
+        with count_queries() as counter:
+            assert sorted(self._search(db_session, test_user, "zebra")) == ["Compressed", "Shared body", "Spilled"]
+            assert self._search(db_session, test_user, "zebra cross") == ["Spilled"]
+        assert not any("clip_text" in statement for statement in counter.statements)
+
+        def indexed():
+            return db_session.execute(text(f"SELECT count(*) FROM {BLOB_FTS_TABLE}")).scalar()
+
+        # One entry per blob, dropped with the last clip referencing it
+        assert indexed() == 2
+        lru_service.evict_clips(db_session, [compressed.id, spilled.id])
+        assert indexed() == 1
+        assert self._search(db_session, test_user, "crossing") == []
+        assert self._search(db_session, test_user, "herd") == ["Shared body"]
+
+    def test_existing_blobs_are_indexed_on_install(self, db_session, test_user):
+        """Test that installing the index picks up blobs stored before it existed"""
+        from sqlalchemy import text
+        from app.models.search import BLOB_FTS_TABLE, install_search_index
+
+        self._add(db_session, test_user, "Old paste", "stored before the index " * 20)
+        db_session.execute(text(f"DROP TABLE {BLOB_FTS_TABLE}"))
+        db_session.commit()
+
+        with db_session.get_bind().begin() as connection:
+            install_search_index(connection)
+        assert self._search(db_session, test_user, "index") == ["Old paste"]
+
+
+class TestContentCompression:
+    """Test transparent compression of large clip content"""
+
+    @pytest.fixture(autouse=True)
+    def _compression(self, monkeypatch):
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "clip_compression_enabled", True)
+        monkeypatch.setattr(settings, "clip_compression_threshold", 1024)
+        monkeypatch.setattr(settings, "clip_compression_codec", "zlib")
+
+    def test_large_content_is_stored_compressed(self, client: TestClient, auth_headers, db_session):
+        """Test that large content is compressed at rest and returned as text"""
+        from app.models.clip import Clip
+
+        content = "2024-01-01 INFO request served in 12ms\n" * 200
+        clip_id = client.post("/api/clips/", headers=auth_headers, json={
+            "title": "Server log",
+            "content": content,
+            "clip_type": "text"
+        }).json()["id"]
+
+        row = db_session.query(Clip).filter(Clip.id == clip_id).one()
+        assert row.content is None
+        assert row.content_size == len(content)
+        assert row.blob.content is None
+        assert row.blob.content_codec == "zlib"
+        assert len(row.blob.content_data) < len(content) // 5
+
+        assert client.get(f"/api/clips/{clip_id}", headers=auth_headers).json()["content"] == content
+        assert client.get("/api/clips/", headers=auth_headers).json()["clips"][0]["content"] == content
+
+        # Small content is left alone
+        small = client.post("/api/clips/", headers=auth_headers, json={
+            "title": "Note",
+            "content": "short note",
+            "clip_type": "text"
+        }).json()
+        assert small["content"] == "short note"
+        assert db_session.query(Clip.content).filter(Clip.id == small["id"]).scalar() == "short note"
+
+    def test_search_reads_plain_text(self, client: TestClient, auth_headers):
+        """Test that the full-text index sees through compression, including on edits"""
+        clip_id = client.post("/api/clips/", headers=auth_headers, json={
+            "title": "Dump",
+            "content": '{"status": "ok", "marker": "zebra"}\n' * 100,
+            "clip_type": "text"
+        }).json()["id"]
+
+        def search(term):
+            response = client.get(f"/api/clips/?search={term}", headers=auth_headers)
+            return [clip["id"] for clip in response.json()["clips"]]
+
+        assert search("zebra") == [clip_id]
+
+        client.put(f"/api/clips/{clip_id}", headers=auth_headers, json={"content": "giraffe"})
+        assert search("zebra") == []
+        assert search("giraffe") == [clip_id]
+
+
+class TestClipBlobs:
+    """Test content-addressed storage of clip bodies"""
+
+    BODY = "Traceback (most recent call last):\n  File \"app.py\", line 1, in <module>\n" * 10
+
+    def _create(self, client, auth_headers, content):
+        return client.post("/api/clips/", headers=auth_headers, json={
+            "title": "Paste",
+            "content": content,
+            "clip_type": "text"
+        }).json()["id"]
+
+    def _blobs(self, db_session):
+        from app.models.blob import ClipBlob
+
+        db_session.expire_all()
+        return {blob.hash: blob.ref_count for blob in db_session.query(ClipBlob)}
+
+    def test_identical_bodies_share_a_blob(self, client: TestClient, auth_headers, db_session):
+        """Test that repeated pastes are stored once and read back intact"""
+        from app.models.blob import content_hash
+
+        first = self._create(client, auth_headers, self.BODY)
+        second = self._create(client, auth_headers, self.BODY)
+        self._create(client, auth_headers, "short command")
+
+        assert self._blobs(db_session) == {content_hash(self.BODY): 2}
+        for clip_id in (first, second):
+            assert client.get(f"/api/clips/{clip_id}", headers=auth_headers).json()["content"] == self.BODY
+
+        response = client.get("/api/clips/?search=traceback", headers=auth_headers)
+        assert sorted(clip["id"] for clip in response.json()["clips"]) == sorted([first, second])
+
+    def test_references_follow_updates_and_deletes(self, client: TestClient, auth_headers, db_session):
+        """Test that edits and deletes release references and collect unused blobs"""
+        from app.models.blob import content_hash
+        from app.services.lru import lru_service
+
+        first = self._create(client, auth_headers, self.BODY)
+        second = self._create(client, auth_headers, self.BODY)
+
+        other = self.BODY.replace("app.py", "main.py")
+        client.put(f"/api/clips/{first}", headers=auth_headers, json={"content": other})
+        assert self._blobs(db_session) == {content_hash(self.BODY): 1, content_hash(other): 1}
+
+        client.delete(f"/api/clips/{first}", headers=auth_headers)
+        assert self._blobs(db_session) == {content_hash(self.BODY): 1}
+
+        lru_service.evict_clips(db_session, [second])
+        assert self._blobs(db_session) == {}
+        assert client.get("/api/clips/?search=traceback", headers=auth_headers).json()["clips"] == []
+
+    def test_reconcile_repairs_reference_counts(self, client: TestClient, auth_headers, db_session):
+        """Test that counter reconciliation fixes drifted counts and drops orphans"""
+        from app.models.blob import ClipBlob, content_hash
+        from app.services.lru import lru_service
+
+        self._create(client, auth_headers, self.BODY)
+        db_session.add(ClipBlob(hash="0" * 64, content="orphan", size=6, ref_count=3))
+        db_session.query(ClipBlob).filter(ClipBlob.hash == content_hash(self.BODY)).update({"ref_count": 7})
+        db_session.commit()
+
+        lru_service.reconcile_user_counters(db_session)
+        assert self._blobs(db_session) == {content_hash(self.BODY): 1}
+
+    def test_large_bodies_spill_to_files(self, client: TestClient, auth_headers, db_session, monkeypatch):
+        """Test that very large bodies live in storage_path and are removed with their clips"""
+        from pathlib import Path
+        from app.config import settings
+        from app.models.blob import ClipBlob
+        from app.services.lru import lru_service
+
+        monkeypatch.setattr(settings, "clip_spill_threshold", 512)
+        first = self._create(client, auth_headers, self.BODY)
+        second = self._create(client, auth_headers, self.BODY)
+
+        db_session.expire_all()
+        blob = db_session.query(ClipBlob).one()
+        assert blob.content is None and blob.ref_count == 2
+        path = Path(blob.file_path)
+        assert path.parent.parent == Path(settings.storage_path) / "blobs"
+        assert path.read_text(encoding="utf-8") == self.BODY
+
+        assert client.get(f"/api/clips/{first}", headers=auth_headers).json()["content"] == self.BODY
+        response = client.get(f"/api/clips/{first}/content", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert response.text == self.BODY
+
+        response = client.get("/api/clips/?search=traceback", headers=auth_headers)
+        assert sorted(clip["id"] for clip in response.json()["clips"]) == sorted([first, second])
+
+        client.delete(f"/api/clips/{first}", headers=auth_headers)
+        assert path.exists()
+        lru_service.evict_clips(db_session, [second])
+        assert not path.exists()
+        assert self._blobs(db_session) == {}
+
+    def test_like_fallback_finds_spilled_bodies(self, client: TestClient, auth_headers, monkeypatch):
+        """Test that LIKE search without a full-text index still reads spilled bodies on SQLite"""
+        from app.config import settings
+        from app.services import search
+
+        monkeypatch.setattr(settings, "clip_spill_threshold", 512)
+        monkeypatch.setattr(search, "has_search_index", lambda bind: False)
+        clip_id = self._create(client, auth_headers, self.BODY)
+
+        response = client.get("/api/clips/?search=most recent", headers=auth_headers)
+        assert [clip["id"] for clip in response.json()["clips"]] == [clip_id]
+
+    def test_large_bodies_stay_searchable_off_sqlite(self, client: TestClient, auth_headers, db_session, monkeypatch):
+        """Test that bodies past the spill threshold stay in the column PostgreSQL and MySQL search"""
+        from app.config import settings
+        from app.models import blob
+        from app.models.blob import ClipBlob, spills
+        from app.services import clip as clip_module, search
+
+        monkeypatch.setattr(settings, "clip_spill_threshold", 512)
+        assert spills(len(self.BODY), "sqlite")
+        assert not any(spills(len(self.BODY), dialect) for dialect in ("postgresql", "mysql", "mariadb"))
+
+        # Store as those servers would and search their plain-column LIKE path
+        monkeypatch.setattr(blob, "spills", lambda size, dialect: spills(size, "postgresql"))
+        monkeypatch.setattr(clip_module, "get_search_backend", lambda db, term: search.LikeSearch())
+        clip_id = self._create(client, auth_headers, self.BODY)
+
+        stored = db_session.query(ClipBlob).one()
+        assert (stored.content, stored.file_path) == (self.BODY, None)
+        response = client.get("/api/clips/?search=most recent", headers=auth_headers)
+        assert [clip["id"] for clip in response.json()["clips"]] == [clip_id]
+
+    def test_spilled_body_read_back_exactly(self, tmp_path):
+        """Test that spilled bodies keep their line endings and empty bodies read back empty"""
+        from app.models.blob import read_spill_file
+
+        for body in ("dos\r\nlines\r\n", "mac\rline ü", ""):
+            path = tmp_path / "body"
+            path.write_bytes(body.encode("utf-8"))
+            assert read_spill_file(str(path)) == body
+
+
+class TestConditionalGet:
+    """Test ETag / Last-Modified revalidation of clips"""
+
+    def test_clip_revalidation(self, client: TestClient, auth_headers):
+        """Test that unchanged clips answer 304 and edits change the ETag"""
+        clip_id = client.post("/api/clips/", headers=auth_headers, json={
+            "title": "Polled", "content": "Same as before"
+        }).json()["id"]
+
+        response = client.get(f"/api/clips/{clip_id}", headers=auth_headers)
+        etag = response.headers["etag"]
+        assert response.headers["cache-control"] == "private, no-cache"
+
+        # Reads don't change the validators
+        for validator in ({"If-None-Match": etag}, {"If-Modified-Since": response.headers["last-modified"]}):
+            revalidated = client.get(f"/api/clips/{clip_id}", headers={**auth_headers, **validator})
+            assert revalidated.status_code == 304
+            assert revalidated.content == b""
+            assert revalidated.headers["etag"] == etag
+
+        client.put(f"/api/clips/{clip_id}", headers=auth_headers, json={"content": "Changed"})
+        response = client.get(f"/api/clips/{clip_id}", headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["content"] == "Changed"
+        assert response.headers["etag"] != etag
+        # 304s aren't counted as reads; the update reads the clip too
+        assert response.json()["access_count"] == 3
+
+    def test_shared_clip_revalidation(self, client: TestClient, auth_headers, count_queries, monkeypatch):
+        """Test that public shared clips are proxy-cacheable and cached tokens revalidate without queries"""
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "share_cache_enabled", True)
+        monkeypatch.setattr(settings, "access_buffer_enabled", True)
+        token = client.post("/api/clips/", headers=auth_headers, json={
+            "title": "Viral", "content": "Shared everywhere", "access_level": "public"
+        }).json()["share_token"]
+
+        response = client.get(f"/api/clips/shared/{token}")
+        assert response.headers["cache-control"] == f"public, max-age={settings.shared_clip_max_age}, must-revalidate"
+
+        with count_queries(0):
+            revalidated = client.get(
+                f"/api/clips/shared/{token}", headers={"If-None-Match": f'W/{response.headers["etag"]}'}
+            )
+        assert revalidated.status_code == 304
+
+
+    def test_revalidation_has_no_side_effects(self, client: TestClient, auth_headers, count_queries):
+        """Test that 304 answers don't count a read or write anything"""
+        clip = client.post("/api/clips/", headers=auth_headers, json={
+            "title": "Polled", "content": "Same as before", "access_level": "public"
+        }).json()
+
+        for url in (f"/api/clips/{clip['id']}", f"/api/clips/shared/{clip['share_token']}"):
+            etag = client.get(url, headers=auth_headers).headers["etag"]
+            with count_queries() as counter:
+                revalidated = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+            assert revalidated.status_code == 304
+            assert not [s for s in counter.statements if not s.lstrip().upper().startswith("SELECT")]
+
+        # One counted read per 200
+        assert client.get(f"/api/clips/{clip['id']}", headers=auth_headers).json()["access_count"] == 3
+
+    def test_attaching_files_moves_last_modified(self, client: TestClient, auth_headers, db_session):
+        """Test that If-Modified-Since sees files attached to or deleted from a clip"""
+        import io
+        from datetime import datetime
+        from app.models.clip import Clip
+
+        clip_id = client.post("/api/clips/", headers=auth_headers, json={"content": "With files"}).json()["id"]
+        db_session.query(Clip).filter(Clip.id == clip_id).update({Clip.updated_at: datetime(2024, 1, 1)})
+        db_session.commit()
+
+        def revalidate():
+            last_modified = client.get(f"/api/clips/{clip_id}", headers=auth_headers).headers["last-modified"]
+            return client.get(
+                f"/api/clips/{clip_id}", headers={**auth_headers, "If-Modified-Since": last_modified}
+            ), last_modified
+
+        response, before = revalidate()
+        assert response.status_code == 304
+
+        file_id = client.post(
+            f"/api/files/upload?clip_id={clip_id}",
+            headers=auth_headers,
+            files={"file": ("notes.txt", io.BytesIO(b"notes"), "text/plain")}
+        ).json()["file"]["id"]
+        response = client.get(f"/api/clips/{clip_id}", headers={**auth_headers, "If-Modified-Since": before})
+        assert response.status_code == 200
+        assert [f["id"] for f in response.json()["files"]] == [file_id]
+
+        db_session.query(Clip).filter(Clip.id == clip_id).update({Clip.updated_at: datetime(2024, 1, 1)})
+        db_session.commit()
+        response, before = revalidate()
+        assert response.status_code == 304
+        client.delete(f"/api/files/{file_id}", headers=auth_headers)
+        response = client.get(f"/api/clips/{clip_id}", headers={**auth_headers, "If-Modified-Since": before})
+        assert response.status_code == 200
+        assert response.json()["files"] == []
+
+
+class TestClipStream:
+    """Test live clip change events over WebSocket and SSE"""
+
+    def test_websocket_receives_clip_changes(self, client: TestClient, auth_headers, db_session):
+        """Test that create, update, pin, delete and evict reach the owner's stream"""
+        from app.services.lru import lru_service
+
+        with client.websocket_connect("/api/clips/stream", headers=auth_headers) as stream:
+            first = client.post("/api/clips/", headers=auth_headers, json={"content": "one"}).json()["id"]
+            second = client.post("/api/clips/", headers=auth_headers, json={"content": "two"}).json()["id"]
+            client.put(f"/api/clips/{first}", headers=auth_headers, json={"title": "Renamed"})
+            client.post(f"/api/clips/{first}/pin", headers=auth_headers)
+            client.delete(f"/api/clips/{first}", headers=auth_headers)
+            lru_service.evict_clips(db_session, [second])
+
+            received = [stream.receive_json() for _ in range(6)]
+
+        assert received == [
+            {"type": "created", "clip_ids": [first]},
+            {"type": "created", "clip_ids": [second]},
+            {"type": "updated", "clip_ids": [first]},
+            {"type": "pinned", "clip_ids": [first]},
+            {"type": "deleted", "clip_ids": [first]},
+            {"type": "evicted", "clip_ids": [second]},
+        ]
+
+    def test_websocket_requires_authentication(self, client: TestClient):
+        """Test that streams are refused without valid credentials in the first message"""
+        from starlette.websockets import WebSocketDisconnect
+
+        with pytest.raises(WebSocketDisconnect) as excinfo:
+            with client.websocket_connect("/api/clips/stream") as stream:
+                stream.send_json({"token": "invalid"})
+                stream.receive_json()
+        assert excinfo.value.code == 1008
+
+    def test_websocket_first_message_auth(self, client: TestClient, auth_headers):
+        """Test that a browser client authenticates with its first message instead of the URL"""
+        token = auth_headers["Authorization"].split()[1]
+
+        with client.websocket_connect("/api/clips/stream") as stream:
+            stream.send_json({"token": token})
+            assert stream.receive_json() == {"type": "subscribed"}
+            clip_id = client.post("/api/clips/", headers=auth_headers, json={"content": "one"}).json()["id"]
+            assert stream.receive_json() == {"type": "created", "clip_ids": [clip_id]}
+
+    def test_stream_ticket(self, client: TestClient, auth_headers):
+        """Test that stream tickets only open streams and credentials never go in the URL"""
+        from starlette.websockets import WebSocketDisconnect
+
+        assert client.post("/api/clips/stream/ticket").status_code == 401
+        response = client.post("/api/clips/stream/ticket", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["expires_in"] == 60
+        ticket = response.json()["ticket"]
+
+        with client.websocket_connect("/api/clips/stream") as stream:
+            stream.send_json({"ticket": ticket})
+            assert stream.receive_json() == {"type": "subscribed"}
+
+        # Tickets aren't bearer tokens, and access tokens aren't tickets
+        assert client.get("/api/auth/me", headers={"Authorization": f"Bearer {ticket}"}).status_code == 401
+        token = auth_headers["Authorization"].split()[1]
+        assert client.get(f"/api/clips/stream?ticket={token}").status_code == 401
+        assert client.get(f"/api/clips/stream?token={token}").status_code == 401
+        with pytest.raises(WebSocketDisconnect) as excinfo:
+            with client.websocket_connect("/api/clips/stream") as stream:
+                stream.send_json({"ticket": token})
+                stream.receive_json()
+        assert excinfo.value.code == 1008
+
+    def test_sse_fallback(self, client: TestClient, auth_headers, test_user):
+        """Test that the event-stream variant frames the same events"""
+        import threading
+        import time
+        from app.services.clip_events import clip_events
+
+        ticket = client.post("/api/clips/stream/ticket", headers=auth_headers).json()["ticket"]
+        user_id = test_user.id
+
+        def publish_when_subscribed():
+            deadline = time.monotonic() + 5
+            while clip_events.subscriber_count(user_id) == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            clip_events.publish(user_id, "created", [42])
+            clip_events.disconnect(user_id)
+
+        publisher = threading.Thread(target=publish_when_subscribed)
+        publisher.start()
+        response = client.get(f"/api/clips/stream?ticket={ticket}")
+        publisher.join()
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert 'event: created\ndata: {"type": "created", "clip_ids": [42]}\n\n' in response.text
+        assert clip_events.subscriber_count(user_id) == 0
+
+
+class TestDeltaSync:
+    """Test the clip change log behind GET /api/clips/changes"""
+
+    def _changes(self, client, auth_headers, since=None, **params):
+        if since is not None:
+            params["since"] = since
+        return client.get("/api/clips/changes", headers=auth_headers, params=params)
+
+    def test_changes_since_position(self, client: TestClient, auth_headers, db_session):
+        """Test that only the latest change per clip is returned, with tombstones"""
+        from app.services.lru import lru_service
+
+        since = self._changes(client, auth_headers).json()["next_since"]
+
+        kept = client.post("/api/clips/", headers=auth_headers, json={"content": "kept"}).json()["id"]
+        deleted = client.post("/api/clips/", headers=auth_headers, json={"content": "deleted"}).json()["id"]
+        evicted = client.post("/api/clips/", headers=auth_headers, json={"content": "evicted"}).json()["id"]
+        client.put(f"/api/clips/{kept}", headers=auth_headers, json={"title": "Edited"})
+        client.delete(f"/api/clips/{deleted}", headers=auth_headers)
+        lru_service.evict_clips(db_session, [evicted])
+
+        data = self._changes(client, auth_headers, since).json()
+        assert [(c["clip_id"], c["change"]) for c in data["changes"]] == [
+            (kept, "updated"), (deleted, "deleted"), (evicted, "evicted")
+        ]
+        assert data["changes"][0]["clip"]["title"] == "Edited"
+        assert data["changes"][1]["clip"] is None
+        assert data["has_more"] is False
+
+        # Reads are not changes
+        client.get(f"/api/clips/{kept}", headers=auth_headers)
+        caught_up = self._changes(client, auth_headers, data["next_since"]).json()
+        assert caught_up["changes"] == []
+        assert caught_up["next_since"] == data["next_since"]
+
+    def test_changes_are_paged(self, client: TestClient, auth_headers):
+        """Test that has_more/next_since walk through every change"""
+        since = self._changes(client, auth_headers).json()["next_since"]
+        created = [
+            client.post("/api/clips/", headers=auth_headers, json={"content": f"clip {i}"}).json()["id"]
+            for i in range(5)
+        ]
+
+        seen = []
+        while True:
+            data = self._changes(client, auth_headers, since, limit=2).json()
+            seen += [change["clip_id"] for change in data["changes"]]
+            since = data["next_since"]
+            if not data["has_more"]:
+                break
+        assert seen == created
+
+    def test_late_commit_of_lower_seq_is_delivered(self, client: TestClient, auth_headers, db_session, monkeypatch):
+        """Test that next_since doesn't pass recent changes a lower seq may still commit under"""
+        from datetime import datetime, timedelta, timezone
+        from app.models.change import ChangeType, ClipChange
+        from app.services.clip import clip_service
+
+        clock = {"now": datetime.now(timezone.utc)}
+        monkeypatch.setattr(clip_service, "change_settle_cutoff", lambda db: clock["now"] - timedelta(seconds=5))
+        since = self._changes(client, auth_headers).json()["next_since"]
+        first = client.post("/api/clips/", headers=auth_headers, json={"content": "first"}).json()["id"]
+        second = client.post("/api/clips/", headers=auth_headers, json={"content": "second"}).json()["id"]
+        user_id = db_session.query(ClipChange.user_id).filter(ClipChange.clip_id == first).scalar()
+        db_session.query(ClipChange).filter(ClipChange.seq > since).delete()
+
+        # The transaction holding seq since+1 is still open when since+2 commits
+        db_session.add(ClipChange(
+            seq=since + 2, user_id=user_id, clip_id=second, change=ChangeType.CREATED, created_at=clock["now"]
+        ))
+        db_session.commit()
+        data = self._changes(client, auth_headers, since).json()
+        assert data["changes"] == []
+        assert data["next_since"] == since
+
+        db_session.add(ClipChange(
+            seq=since + 1, user_id=user_id, clip_id=first, change=ChangeType.CREATED,
+            created_at=clock["now"] - timedelta(seconds=1)
+        ))
+        db_session.commit()
+        clock["now"] += timedelta(seconds=10)
+        data = self._changes(client, auth_headers, data["next_since"]).json()
+        assert [change["clip_id"] for change in data["changes"]] == [first, second]
+        assert data["next_since"] == since + 2
+
+    def test_pruned_position_requires_reload(self, client: TestClient, auth_headers, db_session, monkeypatch):
+        """Test that positions older than the retained log answer 410"""
+        from app.config import settings
+        from app.services.lru import lru_service
+
+        for i in range(3):
+            client.post("/api/clips/", headers=auth_headers, json={"content": f"clip {i}"})
+        monkeypatch.setattr(settings, "clip_change_retention_days", -1)
+
+        assert lru_service.prune_clip_changes(db_session) == 2
+        assert self._changes(client, auth_headers, 0).status_code == 410
+        head = self._changes(client, auth_headers).json()["next_since"]
+        assert self._changes(client, auth_headers, head - 1).status_code == 200
@@ -86,7 +86,46 @@ class TestFileEndpoints:
         assert len(data["files"]) == 3
         assert data["total"] == 3
         assert data["page"] == 1
-    
+
+    def test_get_files_matches_response_model(self, client: TestClient, auth_headers, db_session):
+        """Test file list rows encode exactly as the validated FileResponse would"""
+        from app.models.file import File
+        from app.schemas.file import FileResponse
+
+        client.post(
+            "/api/files/upload",
+            headers=auth_headers,
+            files={"file": ("ü.png", io.BytesIO(b"\x89PNG not really"), "image/png")}
+        )
+
+        files = client.get("/api/files/?cursor=", headers=auth_headers).json()["files"]
+        expected = FileResponse.model_validate(db_session.get(File, files[0]["id"])).model_dump(mode="json")
+        assert files == [expected]
+
+    def test_get_files_cursor_pagination(self, client: TestClient, auth_headers):
+        """Test walking files newest first with a cursor"""
+        uploaded = []
+        for i in range(5):
+            response = client.post(
+                "/api/files/upload",
+                headers=auth_headers,
+                files={"file": (f"test{i}.txt", io.BytesIO(f"File content {i}".encode()), "text/plain")}
+            )
+            uploaded.append(response.json()["file"]["id"])
+
+        seen = []
+        response = client.get("/api/files/?per_page=2&cursor=", headers=auth_headers)
+        while True:
+            assert response.status_code == 200
+            data = response.json()
+            seen.extend(f["id"] for f in data["files"])
+            if not data["next_cursor"]:
+                break
+            response = client.get(f"/api/files/?per_page=2&cursor={data['next_cursor']}", headers=auth_headers)
+
+        assert sorted(seen) == sorted(uploaded)
+        assert len(seen) == len(set(seen))
+
     def test_get_file_info(self, client: TestClient, auth_headers):
         """Test getting file information"""
         # Upload a file
@@ -136,6 +175,40 @@ class TestFileEndpoints:
         assert response.content == file_content
         assert response.headers["content-type"] == "text/plain; charset=utf-8"
     
+    def test_download_conditional_get(self, client: TestClient, auth_headers, db_session):
+        """Test that downloads carry the file hash as ETag and answer revalidation with 304"""
+        upload_response = client.post(
+            "/api/files/upload",
+            headers=auth_headers,
+            files={"file": ("poll.txt", io.BytesIO(b"Polled content"), "text/plain")}
+        )
+        uploaded = upload_response.json()["file"]
+
+        response = client.get(f"/api/files/{uploaded['id']}/download", headers=auth_headers)
+        assert response.headers["etag"] == f'"{uploaded["file_hash"]}"'
+        assert response.headers["cache-control"] == "private, no-cache"
+
+        for validator in (
+            {"If-None-Match": response.headers["etag"]},
+            {"If-Modified-Since": response.headers["last-modified"]},
+        ):
+            revalidated = client.get(
+                f"/api/files/{uploaded['id']}/download", headers={**auth_headers, **validator}
+            )
+            assert revalidated.status_code == 304
+            assert revalidated.content == b""
+            assert revalidated.headers["etag"] == response.headers["etag"]
+
+        response = client.get(
+            f"/api/files/{uploaded['id']}/download", headers={**auth_headers, "If-None-Match": '"stale"'}
+        )
+        assert response.status_code == 200
+        assert response.content == b"Polled content"
+
+        # Only the downloads that sent the file were counted
+        from app.models.file import File
+        assert db_session.query(File.download_count).filter(File.id == uploaded["id"]).scalar() == 2
+    
     def test_download_nonexistent_file(self, client: TestClient, auth_headers):
         """Test downloading nonexistent file"""
         response = client.get("/api/files/999/download", headers=auth_headers)
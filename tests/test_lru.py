@@ -2,8 +2,10 @@
 Tests for LRU service functionality
 """
 
+import pytest
 from datetime import datetime, timedelta, timezone
 from app.services.lru import lru_service
+from app.models.checkpoint import JobCheckpoint
 from app.models.clip import Clip
 
 
@@ -206,3 +208,858 @@ class TestLRUService:
         assert result["clips_deleted_lru"] == 3  # 1 from test_user, 2 from admin_user
         assert result["clips_deleted_expired"] == 1
         assert result["total_deleted"] == 4
+
+
+class TestLRUIndex:
+    """Test the in-process LRU index used for eviction decisions"""
+
+    def _create_clips(self, db_session, user, count):
+        from app.schemas.clip import ClipCreate
+        from app.services.clip import clip_service
+
+        clips = []
+        for i in range(count):
+            clip = clip_service.create_clip(
+                db_session, ClipCreate(title=f"Clip {i}", content=f"Content {i}"), user
+            )
+            # Make clips old enough to be deleted
+            clip.created_at = datetime.now(timezone.utc) - timedelta(hours=2)
+            clips.append(clip)
+        db_session.commit()
+        return clips
+
+    def test_cleanup_uses_access_order(self, db_session, test_user, monkeypatch):
+        """Test that recently read clips survive cleanup when the index is enabled"""
+        from app.config import settings
+        from app.services.clip import clip_service
+
+        monkeypatch.setattr(settings, "lru_index_enabled", True)
+        test_user.max_clips = 3
+        db_session.commit()
+
+        clips = self._create_clips(db_session, test_user, 3)
+        # Warm the index, then read the oldest clip so it becomes most recent
+        assert lru_service.get_clips_for_cleanup(db_session, test_user) == []
+        clip_service.get_clip_by_id(db_session, clips[0].id, test_user)
+
+        more = self._create_clips(db_session, test_user, 2)
+
+        candidates = lru_service.get_clips_for_cleanup(db_session, test_user)
+        assert [clip.id for clip in candidates] == [clips[1].id, clips[2].id]
+
+        deleted_count = lru_service.cleanup_user_clips(db_session, test_user)
+        assert deleted_count == 2
+
+        remaining = {clip.id for clip in db_session.query(Clip).filter(Clip.owner_id == test_user.id)}
+        assert remaining == {clips[0].id, more[0].id, more[1].id}
+        assert lru_service.get_clips_for_cleanup(db_session, test_user) == []
+
+    def test_index_skips_pinned_clips(self, db_session, test_user, monkeypatch):
+        """Test that pinned clips are never returned by the index"""
+        from app.config import settings
+        from app.services.clip import clip_service
+
+        monkeypatch.setattr(settings, "lru_index_enabled", True)
+        test_user.max_clips = 2
+        db_session.commit()
+
+        clips = self._create_clips(db_session, test_user, 3)
+        lru_service.get_clips_for_cleanup(db_session, test_user)
+        clip_service.pin_clip(db_session, clips[0].id, test_user, True)
+
+        candidates = lru_service.get_clips_for_cleanup(db_session, test_user)
+        assert [clip.id for clip in candidates] == [clips[1].id]
+
+    def test_stale_index_falls_back_to_database(self, db_session, test_user, monkeypatch):
+        """Test that clips deleted behind the index's back are not returned"""
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "lru_index_enabled", True)
+        test_user.max_clips = 2
+        db_session.commit()
+
+        clips = self._create_clips(db_session, test_user, 4)
+        lru_service.get_clips_for_cleanup(db_session, test_user)
+
+        # Delete a clip without going through ClipService
+        db_session.delete(clips[0])
+        db_session.commit()
+
+        candidates = lru_service.get_clips_for_cleanup(db_session, test_user)
+        assert [clip.id for clip in candidates] == [clips[1].id]
+
+    def test_reads_by_other_workers_are_respected(self, db_session, test_user, monkeypatch):
+        """Test that a candidate read by another process, unseen by the index, is not evicted"""
+        from sqlalchemy import update
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "lru_index_enabled", True)
+        test_user.max_clips = 2
+        db_session.commit()
+
+        clips = self._create_clips(db_session, test_user, 3)
+        lru_service.get_clips_for_cleanup(db_session, test_user)
+
+        # Another worker reads the oldest clip
+        db_session.execute(
+            update(Clip).where(Clip.id == clips[0].id).values(last_accessed=datetime.now(timezone.utc))
+        )
+        db_session.commit()
+
+        candidates = lru_service.get_clips_for_cleanup(db_session, test_user)
+        assert [clip.id for clip in candidates] == [clips[1].id]
+
+
+class TestBulkEviction:
+    """Test set-based clip eviction"""
+
+    def _create_file(self, db_session, user, clip, path, file_hash):
+        from app.models.file import File
+
+        file_obj = File(
+            filename=path.name,
+            original_filename=path.name,
+            file_path=str(path),
+            file_size=path.stat().st_size,
+            mime_type="text/plain",
+            file_hash=file_hash,
+            owner_id=user.id,
+            clip_id=clip.id if clip else None
+        )
+        db_session.add(file_obj)
+        db_session.commit()
+        return file_obj
+
+    def test_evict_clips_deletes_files_and_orphaned_blobs(self, db_session, test_user, tmp_path):
+        """Test that eviction removes file records and unreferenced physical files"""
+        from app.models.file import File
+
+        evicted = Clip(title="Evicted", content="Evicted", owner_id=test_user.id)
+        kept = Clip(title="Kept", content="Kept", owner_id=test_user.id)
+        db_session.add_all([evicted, kept])
+        db_session.commit()
+
+        orphan_path = tmp_path / "orphan.txt"
+        orphan_path.write_text("orphan")
+        shared_path = tmp_path / "shared.txt"
+        shared_path.write_text("shared")
+
+        self._create_file(db_session, test_user, evicted, orphan_path, "a" * 64)
+        self._create_file(db_session, test_user, evicted, shared_path, "b" * 64)
+        self._create_file(db_session, test_user, kept, shared_path, "b" * 64)
+
+        deleted_count = lru_service.evict_clips(db_session, [evicted.id])
+
+        assert deleted_count == 1
+        assert db_session.query(Clip).count() == 1
+        assert db_session.query(File).count() == 1
+        assert not orphan_path.exists()
+        assert shared_path.exists()  # Still referenced by the kept clip's file
+
+    def test_evict_clips_with_no_ids(self, db_session):
+        """Test that evicting nothing is a no-op"""
+        assert lru_service.evict_clips(db_session, []) == 0
+
+
+class TestOverLimitSweep:
+    """Test that the LRU sweep only visits users that may be over their limit"""
+
+    def _add_clips(self, db_session, user, count):
+        for i in range(count):
+            db_session.add(Clip(
+                title=f"Clip {i}",
+                content=f"Content {i}",
+                owner_id=user.id,
+                created_at=datetime.now(timezone.utc) - timedelta(hours=2),
+                last_accessed=datetime.now(timezone.utc) - timedelta(hours=i)
+            ))
+        db_session.commit()
+
+    def test_find_users_over_limit(self, db_session, test_user, test_admin_user):
+        """Test the aggregate over-limit query"""
+        test_user.max_clips = 2
+        test_admin_user.max_clips = 5
+        db_session.commit()
+
+        self._add_clips(db_session, test_user, 3)
+        self._add_clips(db_session, test_admin_user, 3)
+
+        assert lru_service.find_users_over_limit(db_session) == [test_user.id]
+
+    def test_sweep_skips_users_within_limit(self, db_session, test_user, test_admin_user):
+        """Test that users within their limit are not visited"""
+        test_user.max_clips = 2
+        db_session.commit()
+
+        self._add_clips(db_session, test_user, 3)
+        self._add_clips(db_session, test_admin_user, 3)
+
+        result = lru_service.cleanup_users_over_limit(db_session)
+
+        assert result["users_processed"] == 1
+        assert result["clips_deleted_lru"] == 1
+
+    def test_dirty_only_sweep(self, db_session, test_user, test_admin_user):
+        """Test that a non-full sweep only visits users marked dirty"""
+        test_user.max_clips = 2
+        test_admin_user.max_clips = 2
+        db_session.commit()
+
+        self._add_clips(db_session, test_user, 3)
+        self._add_clips(db_session, test_admin_user, 3)
+        lru_service.mark_dirty(test_admin_user.id)
+
+        result = lru_service.cleanup_users_over_limit(db_session, full=False)
+        assert result["users_processed"] == 1
+        assert db_session.query(Clip).filter(Clip.owner_id == test_admin_user.id).count() == 2
+        assert db_session.query(Clip).filter(Clip.owner_id == test_user.id).count() == 3
+
+        # Dirty set is drained after a sweep
+        result = lru_service.cleanup_users_over_limit(db_session, full=False)
+        assert result["users_processed"] == 0
+
+    def test_dirty_users_within_limit_cost_one_query(self, db_session, test_user, test_admin_user, count_queries):
+        """Test that the counters drop dirty users within their limits without counting their clips"""
+        self._add_clips(db_session, test_user, 3)
+        self._add_clips(db_session, test_admin_user, 3)
+        lru_service.mark_dirty(test_user.id)
+        lru_service.mark_dirty(test_admin_user.id)
+
+        with count_queries(1) as counter:
+            result = lru_service.cleanup_users_over_limit(db_session, full=False)
+        assert result["users_processed"] == 0
+        assert "count(" not in counter.statements[0].lower()
+
+
+class TestUserCounters:
+    """Test denormalized per-user counters"""
+
+    def test_counters_follow_clip_lifecycle(self, db_session, test_user):
+        """Test that counters follow create, pin, delete and eviction"""
+        from app.schemas.clip import ClipCreate
+        from app.services.clip import clip_service
+
+        clips = [
+            clip_service.create_clip(db_session, ClipCreate(title=f"Clip {i}", content="x"), test_user)
+            for i in range(3)
+        ]
+        clip_service.pin_clip(db_session, clips[0].id, test_user, True)
+        clip_service.pin_clip(db_session, clips[1].id, test_user, True)
+        clip_service.pin_clip(db_session, clips[1].id, test_user, False)
+
+        assert test_user.clip_count == 3
+        assert test_user.pinned_count == 1
+
+        clip_service.delete_clip(db_session, clips[0].id, test_user)
+        assert test_user.clip_count == 2
+        assert test_user.pinned_count == 0
+
+        lru_service.evict_clips(db_session, [clips[1].id])
+        assert test_user.clip_count == 1
+
+    def test_counters_follow_files(self, client, auth_headers, db_session, test_user):
+        """Test that storage_used follows file uploads and deletes"""
+        response = client.post(
+            "/api/files/upload",
+            headers=auth_headers,
+            files={"file": ("counter.txt", b"12345", "text/plain")}
+        )
+        assert response.status_code == 201
+        db_session.refresh(test_user)
+        assert test_user.storage_used == 5
+
+        client.delete(f"/api/files/{response.json()['file']['id']}", headers=auth_headers)
+        db_session.refresh(test_user)
+        assert test_user.storage_used == 0
+
+    def test_reconcile_user_counters(self, db_session, test_user):
+        """Test that reconciliation repairs drifted counters"""
+        db_session.add(Clip(title="Clip", content="Content", owner_id=test_user.id, is_pinned=True))
+        db_session.commit()
+
+        test_user.clip_count = 42
+        test_user.pinned_count = 0
+        test_user.storage_used = 7
+        db_session.commit()
+
+        assert lru_service.reconcile_user_counters(db_session) == 1
+        assert test_user.clip_count == 1
+        assert test_user.pinned_count == 1
+        assert test_user.storage_used == 0
+
+        assert lru_service.reconcile_user_counters(db_session) == 0
+
+    def test_reconcile_runs_in_batches_until_deadline(self, db_session, monkeypatch):
+        """Test that reconciliation commits per user range and resumes after a deadline"""
+        from types import SimpleNamespace
+        from app.config import settings
+        from app.models.user import User
+
+        monkeypatch.setattr(settings, "purge_batch_size", 2)
+        monkeypatch.setattr(settings, "purge_batch_sleep", 0)
+        users = [User(username=f"user{i}", clip_count=9) for i in range(5)]
+        db_session.add_all(users)
+        db_session.commit()
+        ids = [user.id for user in users]
+
+        ranges = []
+        clock = SimpleNamespace(now=0.0)
+        reconcile_range = lru_service._reconcile_user_range
+
+        def out_of_time_after_range(db, first_id, last_id):
+            ranges.append((first_id, last_id))
+            clock.now = 10.0
+            return reconcile_range(db, first_id, last_id)
+
+        monkeypatch.setattr("app.services.lru.time", SimpleNamespace(monotonic=lambda: clock.now, sleep=lambda _: None))
+        monkeypatch.setattr(lru_service, "_reconcile_user_range", out_of_time_after_range)
+        assert lru_service.reconcile_user_counters(db_session, deadline=5.0) == 2
+        assert ranges == [(ids[0], ids[1])]
+
+        monkeypatch.setattr(lru_service, "_reconcile_user_range", reconcile_range)
+        assert lru_service.reconcile_user_counters(db_session) == 3
+        assert [user.clip_count for user in db_session.query(User).order_by(User.id)] == [0] * 5
+
+    def test_reconcile_backfills_content_size_in_bytes(self, db_session, test_user):
+        """Test that a missing content_size is filled with the UTF-8 byte length"""
+        clip = Clip(title="Clip", content="héllo wörld", owner_id=test_user.id)
+        db_session.add(clip)
+        db_session.commit()
+        db_session.query(Clip).filter(Clip.id == clip.id).update(
+            {Clip.content_size: None}, synchronize_session=False
+        )
+        db_session.commit()
+
+        lru_service.reconcile_user_counters(db_session)
+        db_session.refresh(clip)
+        db_session.refresh(test_user)
+        assert clip.content_size == len("héllo wörld".encode("utf-8")) == 13
+        assert test_user.content_used == 13
+
+
+class TestEvictionPolicies:
+    """Test pluggable eviction policies"""
+
+    def _add_clip(self, db_session, user, title, content="x", access_count=0, hours_ago=0):
+        clip = Clip(
+            title=title,
+            content=content,
+            owner_id=user.id,
+            access_count=access_count,
+            created_at=datetime.now(timezone.utc) - timedelta(hours=48),
+            last_accessed=datetime.now(timezone.utc) - timedelta(hours=hours_ago)
+        )
+        db_session.add(clip)
+        db_session.commit()
+        return clip
+
+    def _victim_titles(self, db_session, user):
+        return [clip.title for clip in lru_service.get_clips_for_cleanup(db_session, user)]
+
+    def test_lfu_policy(self, db_session, test_user):
+        """Test that LFU evicts the least frequently used clip"""
+        test_user.max_clips = 1
+        test_user.eviction_policy = "lfu"
+        db_session.commit()
+
+        self._add_clip(db_session, test_user, "old but popular", access_count=10, hours_ago=10)
+        self._add_clip(db_session, test_user, "recent but unused", access_count=0, hours_ago=1)
+
+        assert self._victim_titles(db_session, test_user) == ["recent but unused"]
+
+    def test_2q_policy_is_scan_resistant(self, db_session, test_user):
+        """Test that 2Q evicts read-once clips before reused ones"""
+        test_user.max_clips = 2
+        test_user.eviction_policy = "2q"
+        db_session.commit()
+
+        self._add_clip(db_session, test_user, "snippet", access_count=5, hours_ago=10)
+        self._add_clip(db_session, test_user, "log 1", access_count=1, hours_ago=2)
+        self._add_clip(db_session, test_user, "log 2", access_count=1, hours_ago=1)
+
+        assert self._victim_titles(db_session, test_user) == ["log 1"]
+
+    def test_gdsf_policy_prefers_evicting_large_clips(self, db_session, test_user):
+        """Test that GDSF evicts a large clip before an equally used small one"""
+        test_user.max_clips = 1
+        test_user.eviction_policy = "gdsf"
+        db_session.commit()
+
+        self._add_clip(db_session, test_user, "small", content="x" * 100, access_count=1, hours_ago=2)
+        self._add_clip(db_session, test_user, "large", content="x" * 200_000, access_count=1, hours_ago=1)
+
+        assert self._victim_titles(db_session, test_user) == ["large"]
+
+    def test_global_policy_setting(self, db_session, test_user, monkeypatch):
+        """Test that the global setting applies to users without their own policy"""
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "lru_eviction_policy", "lfu")
+        test_user.max_clips = 1
+        db_session.commit()
+
+        self._add_clip(db_session, test_user, "popular", access_count=10, hours_ago=10)
+        self._add_clip(db_session, test_user, "unused", access_count=0, hours_ago=1)
+
+        assert self._victim_titles(db_session, test_user) == ["unused"]
+
+    def test_offline_priority_matches_sql_order(self, db_session, test_user):
+        """Test that each policy's offline priority orders clips like its SQL"""
+        from app.services.eviction import POLICIES
+
+        for i, (access_count, hours_ago, size) in enumerate(
+            [(0, 5, 100), (3, 1, 50_000), (1, 30, 10), (7, 12, 2_000), (1, 2, 300_000)]
+        ):
+            self._add_clip(db_session, test_user, f"clip {i}", content="x" * size,
+                           access_count=access_count, hours_ago=hours_ago)
+        clips = db_session.query(Clip).all()
+
+        for policy in POLICIES.values():
+            sql_order = [clip_id for clip_id, _ in policy.select_victims(
+                db_session, test_user, len(clips), datetime.now(timezone.utc)
+            )]
+            offline_order = [clip.id for clip in sorted(clips, key=lambda clip: policy.priority(
+                clip.id,
+                clip.last_accessed.replace(tzinfo=timezone.utc).timestamp(),
+                clip.access_count,
+                clip.content_size
+            ))]
+            assert offline_order == sql_order, policy.name
+
+    def test_unknown_policy_falls_back_to_lru(self):
+        """Test that unknown policy names fall back to LRU"""
+        from app.services.eviction import get_policy
+
+        assert get_policy("bogus").name == "lru"
+        assert get_policy(None).name == "lru"
+
+
+class TestReplaySimulator:
+    """Test the offline trace-replay simulator in scripts/simulate_lru.py"""
+
+    # Clip 1 is read more often, clip 2 more recently, when clip 3 needs room
+    TRACE = [
+        (0.0, "create", 1, 1, 100),
+        (1.0, "create", 1, 2, 100),
+        (2.0, "read", 1, 1, 0),
+        (3.0, "read", 1, 1, 0),
+        (4.0, "read", 1, 2, 0),
+        (5.0, "create", 1, 3, 100),
+        (6.0, "read", 1, 1, 0),
+        (7.0, "read", 1, 2, 0),
+        (8.0, "read", 1, 1, 0),
+        (9.0, "create", 1, 4, 100),
+        (10.0, "read", 1, 3, 0),
+        (11.0, "read", 1, 4, 0),
+    ]
+
+    def _replay(self, policy_name):
+        """Replay the trace event by event; returns the report and clip ids in eviction order"""
+        from scripts.simulate_lru import LIVE, ReplaySimulator
+
+        simulator = ReplaySimulator(policy_name, max_clips=2, on_limit="evict", sweep_interval=3600.0, min_age=0.0)
+        evicted = []
+        for event in self.TRACE:
+            simulator.replay([event])
+            for clip_id, number in simulator.clip_numbers.items():
+                if not simulator.flags[number] & LIVE and clip_id not in evicted:
+                    evicted.append(clip_id)
+        return simulator.get_report(), evicted
+
+    def test_lru_vs_lfu(self):
+        """Test hit ratio and eviction order of LRU and LFU on a known trace"""
+        lru_report, lru_evicted = self._replay("lru")
+        lfu_report, lfu_evicted = self._replay("lfu")
+
+        # LRU drops clip 1 (read at 3s) for clip 3, then clip 3 (never read) for clip 4
+        assert lru_evicted == [1, 3]
+        assert (lru_report["reads"], lru_report["hit_ratio"]) == (8, 0.625)
+        # LFU drops clip 2 (read once) for clip 3, then clip 3 for clip 4
+        assert lfu_evicted == [2, 3]
+        assert (lfu_report["reads"], lfu_report["hit_ratio"]) == (8, 0.75)
+
+        for report in (lru_report, lfu_report):
+            assert report["evictions"] == 2
+            assert report["creates_rejected"] == 0
+            assert report["clips_retained"] == 2
+            assert report["bytes_retained"] == 200
+
+
+class TestByteBudgetEviction:
+    """Test eviction that keeps users within their storage quota"""
+
+    def _add_clip(self, db_session, user, title, size, hours_ago):
+        clip = Clip(
+            title=title,
+            content="x" * size,
+            owner_id=user.id,
+            created_at=datetime.now(timezone.utc) - timedelta(hours=48),
+            last_accessed=datetime.now(timezone.utc) - timedelta(hours=hours_ago)
+        )
+        db_session.add(clip)
+        db_session.commit()
+        return clip
+
+    def _enable(self, monkeypatch, high=1.0, low=0.5):
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "lru_byte_budget_enabled", True)
+        monkeypatch.setattr(settings, "lru_quota_high_watermark", high)
+        monkeypatch.setattr(settings, "lru_quota_low_watermark", low)
+
+    def test_content_used_counter(self, db_session, test_user):
+        """Test that content_used follows clip content bytes"""
+        clip = self._add_clip(db_session, test_user, "clip", 100, hours_ago=1)
+        assert test_user.content_used == 100
+
+        clip.content = "é" * 10  # 2 bytes each in UTF-8
+        db_session.commit()
+        assert test_user.content_used == 20
+
+        lru_service.evict_clips(db_session, [clip.id])
+        assert test_user.content_used == 0
+
+    def test_evicts_down_to_low_watermark(self, db_session, test_user, monkeypatch):
+        """Test that crossing the high watermark evicts down to the low watermark"""
+        self._enable(monkeypatch)
+        test_user.storage_quota = 1000
+        db_session.commit()
+
+        for i in range(5):
+            self._add_clip(db_session, test_user, f"clip {i}", 250, hours_ago=10 - i)
+
+        assert lru_service.get_bytes_over_budget(test_user) == 750
+        assert lru_service.cleanup_user_clips(db_session, test_user) == 3
+
+        remaining = [clip.title for clip in db_session.query(Clip).order_by(Clip.id)]
+        assert remaining == ["clip 3", "clip 4"]
+        assert test_user.content_used == 500
+
+    def test_files_count_against_quota(self, db_session, test_user, monkeypatch, tmp_path):
+        """Test that owned files count against the quota"""
+        from app.models.file import File
+
+        self._enable(monkeypatch, high=0.9, low=0.85)
+        test_user.storage_quota = 1000
+        db_session.commit()
+
+        old = self._add_clip(db_session, test_user, "old", 100, hours_ago=2)
+        self._add_clip(db_session, test_user, "new", 100, hours_ago=1)
+        assert lru_service.get_clips_for_cleanup(db_session, test_user) == []
+
+        path = tmp_path / "standalone.bin"
+        path.write_bytes(b"0" * 750)
+        db_session.add(File(
+            filename=path.name,
+            original_filename=path.name,
+            file_path=str(path),
+            file_size=750,
+            mime_type="application/octet-stream",
+            file_hash="c" * 64,
+            owner_id=test_user.id
+        ))
+        db_session.commit()
+
+        # 950 bytes used: freeing the oldest clip reaches the 850 byte low watermark
+        assert [clip.id for clip in lru_service.get_clips_for_cleanup(db_session, test_user)] == [old.id]
+        assert lru_service.find_users_over_limit(db_session) == [test_user.id]
+
+    def test_disabled_by_default(self, db_session, test_user):
+        """Test that quotas are not enforced unless enabled"""
+        test_user.storage_quota = 100
+        db_session.commit()
+
+        self._add_clip(db_session, test_user, "big", 500, hours_ago=1)
+
+        assert lru_service.get_bytes_over_budget(test_user) == 0
+        assert lru_service.cleanup_user_clips(db_session, test_user) == 0
+
+
+class TestExpiryQueue:
+    """Test the expiry queue that deletes clips at their deadline"""
+
+    def _create_clip(self, db_session, user, expires_at):
+        from app.schemas.clip import ClipCreate
+        from app.services.clip import clip_service
+
+        return clip_service.create_clip(
+            db_session, ClipCreate(title="Clip", content="Content", expires_at=expires_at), user
+        )
+
+    def test_seed_and_expire(self, db_session, test_user):
+        """Test that clips already past their deadline are deleted on the first run"""
+        db_session.add_all([
+            Clip(title="Expired", content="x", owner_id=test_user.id,
+                 expires_at=datetime.now(timezone.utc) - timedelta(minutes=1)),
+            Clip(title="Later", content="x", owner_id=test_user.id,
+                 expires_at=datetime.now(timezone.utc) + timedelta(hours=1)),
+            Clip(title="Never", content="x", owner_id=test_user.id),
+        ])
+        db_session.commit()
+
+        assert lru_service.expire_due_clips(db_session) == 1
+
+        remaining = {clip.title for clip in db_session.query(Clip)}
+        assert remaining == {"Later", "Never"}
+        assert test_user.clip_count == 2
+
+    def test_new_clips_are_queued(self, db_session, test_user, monkeypatch):
+        """Test that clips created after seeding are deleted at their deadline"""
+        from app.services import lru as lru_module
+
+        assert lru_service.expire_due_clips(db_session) == 0  # Seeds an empty window
+        clip_id = self._create_clip(db_session, test_user, datetime.now(timezone.utc) + timedelta(seconds=30)).id
+
+        assert lru_service.expire_due_clips(db_session) == 0
+
+        later = datetime.now(timezone.utc) + timedelta(seconds=60)
+        monkeypatch.setattr(lru_module, "datetime", type("FrozenDatetime", (datetime,), {
+            "now": classmethod(lambda cls, tz=None: later)
+        }))
+        assert lru_service.expire_due_clips(db_session) == 1
+        assert db_session.query(Clip).filter(Clip.id == clip_id).count() == 0
+
+    def test_update_reschedules(self, db_session, test_user):
+        """Test that clearing expires_at cancels the queued deadline"""
+        from app.schemas.clip import ClipUpdate
+        from app.services.clip import clip_service
+        from app.services.expiry import expiry_queue
+
+        lru_service.expire_due_clips(db_session)
+        clip = self._create_clip(db_session, test_user, datetime.now(timezone.utc) + timedelta(seconds=30))
+        clip_service.update_clip(db_session, clip.id, ClipUpdate(expires_at=None), test_user)
+
+        assert len(expiry_queue) == 0
+        assert expiry_queue.pop_due(datetime.now(timezone.utc) + timedelta(minutes=5), 10) == []
+
+    def test_pop_due_respects_batch_size(self, db_session, test_user):
+        """Test that due clips are handed out in batches, earliest first"""
+        from app.services.expiry import expiry_queue
+
+        now = datetime.now(timezone.utc)
+        expiry_queue.seed(db_session, now)
+        for clip_id, seconds in [(1, 30), (2, 10), (3, 20)]:
+            expiry_queue.schedule(clip_id, now + timedelta(seconds=seconds))
+
+        later = now + timedelta(minutes=1)
+        assert expiry_queue.pop_due(later, 2) == [2, 3]
+        assert expiry_queue.pop_due(later, 2) == [1]
+
+
+class TestBatchedPurge:
+    """Test keyset-batched purge jobs"""
+
+    def _add_expired_clips(self, db_session, user, count):
+        for i in range(count):
+            db_session.add(Clip(
+                title=f"Expired {i}",
+                content="x",
+                owner_id=user.id,
+                expires_at=datetime.now(timezone.utc) - timedelta(hours=1)
+            ))
+        db_session.commit()
+
+    def test_expired_purge_runs_in_batches(self, db_session, test_user, monkeypatch):
+        """Test that expired clips are deleted in batches of purge_batch_size"""
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "purge_batch_size", 2)
+        monkeypatch.setattr(settings, "purge_batch_sleep", 0)
+        self._add_expired_clips(db_session, test_user, 5)
+
+        batches = []
+        evict_clips = lru_service.evict_clips
+        monkeypatch.setattr(lru_service, "evict_clips", lambda db, ids: batches.append(ids) or evict_clips(db, ids))
+
+        assert lru_service.cleanup_expired_clips(db_session) == 5
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        assert db_session.query(JobCheckpoint).count() == 0
+
+    def test_interrupted_purge_resumes_from_checkpoint(self, db_session, test_user, monkeypatch):
+        """Test that a purge stopped by an error resumes after the last batch"""
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "purge_batch_size", 2)
+        monkeypatch.setattr(settings, "purge_batch_sleep", 0)
+        self._add_expired_clips(db_session, test_user, 5)
+
+        calls = []
+
+        def flaky_purge(ids):
+            calls.append(ids)
+            if len(calls) == 2:
+                raise RuntimeError("connection lost")
+            return lru_service.evict_clips(db_session, ids)
+
+        query = db_session.query(Clip.id).filter(Clip.expires_at.isnot(None))
+        with pytest.raises(RuntimeError):
+            lru_service.purge_in_batches(db_session, "test", query, Clip.id, flaky_purge)
+        db_session.rollback()
+        # Kept in the database, so a restarted process resumes too
+        assert db_session.get(JobCheckpoint, "test").last_id == calls[0][-1]
+
+        assert lru_service.purge_in_batches(db_session, "test", query, Clip.id, flaky_purge) == 3
+        assert calls[2][0] == calls[1][0]  # Retried the failed batch
+        assert db_session.query(Clip).count() == 0
+        assert db_session.get(JobCheckpoint, "test") is None
+
+    def test_delete_users_evicts_clips_in_batches(self, db_session, test_user, monkeypatch):
+        """Test that a user's clips are evicted in committed batches of purge_batch_size"""
+        from app.config import settings
+        from app.models.user import User
+        from app.services.auth import auth_service
+
+        monkeypatch.setattr(settings, "purge_batch_size", 2)
+        self._add_expired_clips(db_session, test_user, 5)
+
+        batches = []
+        evict_clips = lru_service.evict_clips
+        monkeypatch.setattr(lru_service, "evict_clips", lambda db, ids: batches.append(ids) or evict_clips(db, ids))
+
+        assert auth_service.delete_users(db_session, [test_user.id]) == 1
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        assert db_session.query(Clip).count() == 0
+        assert db_session.query(User).count() == 0
+
+    def test_failed_user_delete_is_retried(self, db_session, test_user):
+        """Test that a failure deleting the users leaves them for the next run"""
+        from sqlalchemy import event
+        from app.models.user import User
+        from app.services.auth import auth_service
+
+        db_session.add(Clip(title="Evicted", content="x", owner_id=test_user.id))
+        db_session.commit()
+
+        def fail_user_delete(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("DELETE FROM users"):
+                raise RuntimeError("lock timeout")
+
+        bind = db_session.get_bind()
+        event.listen(bind, "before_cursor_execute", fail_user_delete)
+        try:
+            with pytest.raises(RuntimeError):
+                auth_service.delete_users(db_session, [test_user.id])
+        finally:
+            event.remove(bind, "before_cursor_execute", fail_user_delete)
+        db_session.rollback()
+
+        # The clip batch was committed; the user and its counters are consistent
+        user = db_session.get(User, test_user.id)
+        assert db_session.query(Clip).count() == 0
+        assert user.clip_count == 0
+
+        assert auth_service.delete_users(db_session, [user.id]) == 1
+        assert db_session.query(User).count() == 0
+
+    def test_delete_users_unlinks_unattached_files(self, db_session, test_user, tmp_path):
+        """Test that files not attached to a clip are removed with their owner"""
+        from app.models.file import File
+        from app.services.auth import auth_service
+
+        path = tmp_path / "standalone.bin"
+        path.write_bytes(b"0" * 10)
+        db_session.add(File(
+            filename=path.name,
+            original_filename=path.name,
+            file_path=str(path),
+            file_size=10,
+            mime_type="application/octet-stream",
+            file_hash="e" * 64,
+            owner_id=test_user.id
+        ))
+        db_session.commit()
+
+        assert auth_service.delete_users(db_session, [test_user.id]) == 1
+        assert db_session.query(File).count() == 0
+        assert not path.exists()
+
+    def test_anonymous_users_purged_with_clips(self, db_session):
+        """Test that expired anonymous users are deleted along with their clips"""
+        from app.models.user import User
+        from app.services.auth import auth_service
+
+        old = datetime.now(timezone.utc) - timedelta(days=7)
+        users = [User(is_anonymous=True, session_id=f"session-{i}", created_at=old) for i in range(3)]
+        db_session.add_all(users)
+        db_session.commit()
+        self._add_expired_clips(db_session, users[0], 2)
+
+        assert auth_service.cleanup_expired_anonymous_users(db_session) == 3
+        assert db_session.query(User).count() == 0
+        assert db_session.query(Clip).count() == 0
+
+
+class TestAccessBuffer:
+    """Test write-behind clip access and file download tracking"""
+
+    def _db_value(self, db_session, column, row_id):
+        from sqlalchemy import select
+
+        table = column.class_.__table__
+        return db_session.execute(select(table.c[column.key]).where(table.c.id == row_id)).scalar()
+
+    def test_clip_reads_are_coalesced(self, db_session, test_user, monkeypatch):
+        """Test that clip reads don't write until the buffer is flushed"""
+        from app.config import settings
+        from app.services.access_buffer import access_buffer
+        from app.services.clip import clip_service
+
+        monkeypatch.setattr(settings, "access_buffer_enabled", True)
+        clip = Clip(title="Clip", content="Content", owner_id=test_user.id, access_count=0)
+        db_session.add(clip)
+        db_session.commit()
+
+        for _ in range(3):
+            read = clip_service.get_clip_by_id(db_session, clip.id, test_user)
+        assert read.access_count == 3  # Responses still see the access
+        assert not db_session.dirty
+        assert self._db_value(db_session, Clip.access_count, clip.id) == 0
+
+        assert access_buffer.flush(db_session) == 1
+        assert self._db_value(db_session, Clip.access_count, clip.id) == 3
+        assert access_buffer.pending() == 0
+
+    def test_file_downloads_are_coalesced(self, db_session, test_user, monkeypatch, tmp_path):
+        """Test that file downloads are counted in one batched update"""
+        from app.config import settings
+        from app.models.file import File
+        from app.services.access_buffer import access_buffer
+        from app.services.file import file_service
+
+        monkeypatch.setattr(settings, "access_buffer_enabled", True)
+        path = tmp_path / "file.txt"
+        path.write_text("file")
+        file_obj = File(
+            filename=path.name, original_filename=path.name, file_path=str(path), file_size=4,
+            mime_type="text/plain", file_hash="d" * 64, owner_id=test_user.id, download_count=0
+        )
+        db_session.add(file_obj)
+        db_session.commit()
+
+        file_service.get_file_for_download(db_session, file_obj.id, test_user)
+        file_service.get_file_for_download(db_session, file_obj.id, test_user)
+        assert self._db_value(db_session, File.download_count, file_obj.id) == 0
+
+        access_buffer.flush(db_session)
+        assert self._db_value(db_session, File.download_count, file_obj.id) == 2
+        assert self._db_value(db_session, File.last_downloaded, file_obj.id) is not None
+
+    def test_stop_drains_pending_updates(self, db_session, test_user, monkeypatch):
+        """Test that stopping the buffer flushes what is still pending"""
+        from app.config import settings
+        from app.services.access_buffer import AccessBuffer
+        from tests.conftest import TestingSessionLocal
+
+        monkeypatch.setattr(settings, "access_buffer_enabled", True)
+        monkeypatch.setattr(settings, "access_buffer_flush_interval", 60_000)
+        clip = Clip(title="Clip", content="Content", owner_id=test_user.id, access_count=0)
+        db_session.add(clip)
+        db_session.commit()
+
+        buffer = AccessBuffer(session_factory=TestingSessionLocal)
+        buffer.start()
+        buffer.track_clip_access(db_session, clip)
+        buffer.stop()
+
+        assert not buffer.running
+        assert self._db_value(db_session, Clip.access_count, clip.id) == 1
@@ -0,0 +1,101 @@
+"""
+Tests for database migrations
+"""
+
+import pytest
+from alembic import command
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+
+from app.database import Base, create_tables, migration_config
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/upgrade.db")
+    yield engine
+    engine.dispose()
+
+
+def _head():
+    return ScriptDirectory.from_config(migration_config()).get_current_head()
+
+
+def _revision(engine):
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+
+def _assert_schema_matches_models(engine):
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        assert columns == set(table.columns.keys()), table.name
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        assert {index.name for index in table.indexes} <= indexes, table.name
+
+
+class TestMigrations:
+    """Test creating and upgrading databases"""
+
+    def test_new_database_is_created_at_head(self, engine):
+        """Test that a new database gets every table and is stamped at the latest revision"""
+        create_tables(engine)
+
+        assert _revision(engine) == _head()
+        _assert_schema_matches_models(engine)
+
+    def test_migrations_build_the_model_schema(self, engine):
+        """Test that running every revision yields the same schema as the models"""
+        with engine.begin() as connection:
+            command.upgrade(migration_config(connection), "head")
+
+        _assert_schema_matches_models(engine)
+
+    def test_upgrade_from_baseline_schema(self, engine):
+        """Test upgrading a database create_all built before migrations existed"""
+        from sqlalchemy.orm import Session
+        from app.models.clip import Clip
+        from app.models.user import User
+
+        with engine.begin() as connection:
+            command.upgrade(migration_config(connection), "0001")
+            connection.execute(text("DROP TABLE alembic_version"))
+            connection.execute(text(
+                "INSERT INTO users (id, username, is_anonymous, max_clips) VALUES (1, 'old', 0, 1000)"
+            ))
+            connection.execute(text(
+                "INSERT INTO clips (id, title, content, clip_type, access_level, owner_id, is_pinned) "
+                "VALUES (1, 'Old clip', 'héllo wörld', 'TEXT', 'PRIVATE', 1, 1), "
+                "(2, 'Empty', NULL, 'TEXT', 'PUBLIC', 1, 0)"
+            ))
+            connection.execute(text(
+                "INSERT INTO files (filename, original_filename, file_path, file_size, mime_type, file_hash, owner_id) "
+                "VALUES ('a', 'a.txt', '/tmp/a', 42, 'text/plain', 'abc', 1)"
+            ))
+
+        create_tables(engine)
+
+        assert _revision(engine) == _head()
+        _assert_schema_matches_models(engine)
+
+        with Session(engine) as db:
+            user = db.get(User, 1)
+            assert (user.clip_count, user.pinned_count, user.storage_used) == (2, 1, 42)
+            clip = db.get(Clip, 1)
+            # UTF-8 bytes, not characters
+            assert clip.content_size == len("héllo wörld".encode("utf-8")) == user.content_used
+            assert clip.preview == "héllo wörld"
+            assert clip.content_text == "héllo wörld"
+
+        # The index was built from the clips table
+        with engine.connect() as connection:
+            hits = connection.execute(text("SELECT rowid FROM clips_fts WHERE clips_fts MATCH 'hello'")).all()
+            assert hits == [(1,)]
+            # CURRENT_TIMESTAMP text gained the fraction the app writes, so keyset paging compares in time order
+            lengths = connection.execute(text("SELECT DISTINCT length(last_accessed) FROM clips")).scalars().all()
+            assert lengths == [26]
+
+        # Running again is a no-op
+        create_tables(engine)
+        assert _revision(engine) == _head()
@@ -0,0 +1,85 @@
+"""
+Tests for the background cleanup scheduler
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+from app.models.clip import Clip
+from app.services.scheduler import CleanupScheduler, ScheduledJob
+from tests.conftest import TestingSessionLocal
+
+
+class TestCleanupScheduler:
+    """Test cleanup scheduler functionality"""
+
+    def test_job_interval_jitter(self):
+        """Test that job delays stay within the jitter range"""
+        job = ScheduledJob("test", lambda db, deadline: None, 100, 10, jitter=0.1)
+
+        for _ in range(50):
+            assert 90 <= job.next_delay() <= 110
+
+    def test_run_job_records_stats(self, db_session, test_user):
+        """Test that running a job records its result and duration"""
+        from app.services.lru import lru_service
+
+        db_session.add(Clip(
+            title="Expired",
+            content="Expired content",
+            owner_id=test_user.id,
+            expires_at=datetime.now(timezone.utc) - timedelta(hours=1)
+        ))
+        db_session.commit()
+
+        scheduler = CleanupScheduler(session_factory=TestingSessionLocal)
+        job = scheduler.add_job(ScheduledJob(
+            "expired", lambda db, deadline: lru_service.cleanup_expired_clips(db), 600, 10
+        ))
+
+        scheduler.run_job(job)
+
+        stats = job.get_stats()
+        assert stats["runs"] == 1
+        assert stats["failures"] == 0
+        assert stats["last_result"] == 1
+        assert stats["last_error"] is None
+        assert stats["last_overran"] is False
+        assert db_session.query(Clip).count() == 0
+
+    def test_run_job_records_failure(self, db_session):
+        """Test that a failing job is recorded and doesn't raise"""
+        def failing_job(db, deadline):
+            raise RuntimeError("boom")
+
+        scheduler = CleanupScheduler(session_factory=TestingSessionLocal)
+        job = scheduler.add_job(ScheduledJob("failing", failing_job, 600, 10))
+
+        scheduler.run_job(job)
+
+        assert job.failures == 1
+        assert job.last_error == "boom"
+
+    def test_start_and_stop(self, monkeypatch):
+        """Test that the worker thread starts and stops promptly"""
+        scheduler = CleanupScheduler(session_factory=TestingSessionLocal)
+        monkeypatch.setattr(scheduler, "_default_jobs", lambda: [])
+
+        scheduler.start()
+        assert scheduler.running
+
+        started = time.monotonic()
+        scheduler.stop()
+        assert not scheduler.running
+        assert time.monotonic() - started < 5
+
+    def test_admin_scheduler_stats(self, client: TestClient, admin_auth_headers):
+        """Test the admin scheduler statistics endpoint"""
+        response = client.get("/api/admin/cleanup/scheduler", headers=admin_auth_headers)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert "running" in data
+        assert "jobs" in data
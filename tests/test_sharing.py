@@ -233,3 +233,206 @@ class TestClipSharing:
         assert response.status_code == 201
         clip = response.json()
         assert len(clip["files"]) == 0
+
+
+class TestShareCache:
+    """Test the in-process cache of shared clips"""
+
+    def _share(self, client: TestClient, auth_headers, **fields):
+        response = client.post("/api/clips/", headers=auth_headers, json={
+            "title": "Viral",
+            "content": "Shared with everyone",
+            "access_level": "public",
+            **fields
+        })
+        return response.json()
+
+    def test_hot_and_unknown_tokens_skip_the_database(
+        self, client: TestClient, auth_headers, count_queries, monkeypatch
+    ):
+        """Test that repeated lookups are answered from the cache"""
+        from app.config import settings
+        from app.services.access_buffer import access_buffer
+
+        monkeypatch.setattr(settings, "share_cache_enabled", True)
+        monkeypatch.setattr(settings, "access_buffer_enabled", True)
+        token = self._share(client, auth_headers)["share_token"]
+
+        assert client.get(f"/api/clips/shared/{token}").json()["title"] == "Viral"
+        assert client.get("/api/clips/shared/bogus").status_code == 404
+        with count_queries(0):
+            for _ in range(3):
+                assert client.get(f"/api/clips/shared/{token}").json()["title"] == "Viral"
+                assert client.get("/api/clips/shared/bogus").status_code == 404
+
+        # Accesses served from the cache are still counted
+        assert access_buffer.pending() == 1
+        assert access_buffer._clips[next(iter(access_buffer._clips))][0] == 4
+
+    def test_changes_invalidate_cached_tokens(self, client: TestClient, auth_headers, monkeypatch):
+        """Test that updates, unsharing, expiry and deletes are seen immediately"""
+        from datetime import datetime, timedelta, timezone
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "share_cache_enabled", True)
+        clip = self._share(client, auth_headers)
+        token = clip["share_token"]
+        assert client.get(f"/api/clips/shared/{token}").status_code == 200
+
+        client.put(f"/api/clips/{clip['id']}", headers=auth_headers, json={"title": "Edited"})
+        assert client.get(f"/api/clips/shared/{token}").json()["title"] == "Edited"
+
+        client.post(f"/api/clips/{clip['id']}/pin", headers=auth_headers)
+        assert client.get(f"/api/clips/shared/{token}").json()["is_pinned"] is True
+
+        past = (datetime.now(timezone.utc) - timedelta(minutes=1)).isoformat()
+        client.put(f"/api/clips/{clip['id']}", headers=auth_headers, json={"expires_at": past})
+        assert client.get(f"/api/clips/shared/{token}").status_code == 404
+        client.put(f"/api/clips/{clip['id']}", headers=auth_headers, json={"expires_at": None})
+        assert client.get(f"/api/clips/shared/{token}").status_code == 200
+
+        client.put(f"/api/clips/{clip['id']}", headers=auth_headers, json={"access_level": "private"})
+        assert client.get(f"/api/clips/shared/{token}").status_code == 404
+        token = client.put(
+            f"/api/clips/{clip['id']}", headers=auth_headers, json={"access_level": "public"}
+        ).json()["share_token"]
+        assert client.get(f"/api/clips/shared/{token}").status_code == 200
+
+        client.delete(f"/api/clips/{clip['id']}", headers=auth_headers)
+        assert client.get(f"/api/clips/shared/{token}").status_code == 404
+
+
+    def test_cache_is_bounded_by_content_bytes(self, client: TestClient, auth_headers, count_queries, monkeypatch):
+        """Test that large bodies aren't cached and the least recent entries go once the byte budget is spent"""
+        from app.config import settings
+        from app.services.share_cache import share_cache
+
+        monkeypatch.setattr(settings, "share_cache_enabled", True)
+        monkeypatch.setattr(settings, "access_buffer_enabled", True)
+        monkeypatch.setattr(settings, "share_cache_max_bytes", 250)
+        monkeypatch.setattr(settings, "share_cache_max_entry_bytes", 200)
+        tokens = [self._share(client, auth_headers, content=f"{i}" * 100)["share_token"] for i in range(3)]
+        large = self._share(client, auth_headers, content="x" * 200)["share_token"]
+
+        for token in tokens + [large]:
+            assert client.get(f"/api/clips/shared/{token}").status_code == 200
+        stats = share_cache.get_stats()
+        assert (stats["entries"], stats["bytes"]) == (2, 200)
+
+        with count_queries(0):
+            for token in tokens[1:]:
+                assert client.get(f"/api/clips/shared/{token}").status_code == 200
+        with count_queries() as counter:
+            assert client.get(f"/api/clips/shared/{tokens[0]}").status_code == 200
+        assert counter.count > 0
+        with count_queries() as counter:
+            assert client.get(f"/api/clips/shared/{large}").json()["content"] == "x" * 200
+        assert counter.count > 0
+
+
+class TestLookupCoalescing:
+    """Test that concurrent lookups of the same shared clip or file share one fetch"""
+
+    def _run_concurrently(self, monkeypatch, target, name, lookup, callers=5):
+        """Call `lookup(db)` from several threads while the first fetch is held open"""
+        import threading
+        import time
+        from app.utils.singleflight import lookups
+        from tests.conftest import TestingSessionLocal
+
+        loads = []
+        release = threading.Event()
+        original = getattr(target, name)
+
+        def slow_load(db, key):
+            loads.append(key)
+            release.wait(5)
+            return original(db, key)
+
+        monkeypatch.setattr(target, name, slow_load)
+
+        results = []
+
+        def run():
+            db = TestingSessionLocal()
+            try:
+                results.append(lookup(db))
+            finally:
+                db.close()
+
+        coalesced = lookups.coalesced
+        threads = [threading.Thread(target=run) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while lookups.coalesced - coalesced < callers - 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        return loads, results
+
+    def test_shared_clip_herd_runs_one_fetch(self, client: TestClient, auth_headers, monkeypatch):
+        """Test that a burst of lookups of one token loads the clip once and counts every access"""
+        from app.services.clip import clip_service
+
+        clip = client.post("/api/clips/", headers=auth_headers, json={
+            "title": "Viral", "content": "Posted in a big chat", "access_level": "public"
+        }).json()
+        token = clip["share_token"]
+
+        def serve(db):
+            shared = clip_service.get_shared_clip(db, token)
+            clip_service.track_shared_access(db, shared)
+            return shared
+
+        loads, results = self._run_concurrently(monkeypatch, clip_service, "_load_shared_clip", serve)
+
+        assert loads == [token]
+        assert [shared.response.title for shared in results] == ["Viral"] * 5
+        assert client.get(f"/api/clips/{clip['id']}", headers=auth_headers).json()["access_count"] == 6
+
+    def test_shared_file_herd_runs_one_fetch(self, client: TestClient, auth_headers, monkeypatch):
+        """Test that a burst of downloads of one shared file loads it once"""
+        from app.services.file import file_service
+
+        file_id = client.post(
+            "/api/files/upload", headers=auth_headers,
+            files={"file": ("notes.txt", io.BytesIO(b"release notes"), "text/plain")}
+        ).json()["file"]["id"]
+        client.post("/api/clips/", headers=auth_headers, json={
+            "title": "Notes", "content": "See attachment", "access_level": "public", "file_ids": [file_id]
+        })
+
+        loads, results = self._run_concurrently(
+            monkeypatch, file_service, "_load_shared_file",
+            lambda db: file_service.get_file_for_download(db, file_id)
+        )
+
+        assert loads == [file_id]
+        assert [file_obj.original_filename for file_obj in results] == ["notes.txt"] * 5
+        # Plus one for the owner's lookup below
+        assert client.get(f"/api/files/{file_id}", headers=auth_headers).json()["download_count"] == 6
+
+    def test_event_loop_callers_await_the_leader(self):
+        """Test that callers in greenlets on one event loop (as async sessions run) coalesce without blocking it"""
+        import asyncio
+        from sqlalchemy.util import await_only, greenlet_spawn
+        from app.utils.singleflight import SingleFlight
+
+        flight = SingleFlight()
+        loads = []
+
+        def load():
+            loads.append(1)
+            await_only(asyncio.sleep(0.05))  # Statement awaited on the loop
+            return "clip"
+
+        async def main():
+            return await asyncio.wait_for(asyncio.gather(*[
+                greenlet_spawn(flight.do, "clip:token", load) for _ in range(5)
+            ]), 5)
+
+        results = asyncio.run(main())
+        assert loads == [1]
+        assert sorted(results, key=lambda r: not r[1]) == [("clip", True)] + [("clip", False)] * 4